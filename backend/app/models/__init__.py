@@ -1,7 +1,12 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from typing import Optional, Literal, Union
 from datetime import datetime
 
+class LLMFallback(BaseModel):
+    provider: Literal['ollama', 'openai', 'anthropic', 'custom']
+    modelName: str
+    baseUrl: Optional[str] = None
+
 class AgentBase(BaseModel):
     name: str
     role: str
@@ -11,6 +16,14 @@ class AgentBase(BaseModel):
     systemPrompt: str = ""
     temperature: float = 0.7
     maxTokens: int = 2000
+    # None caches responses only when temperature is 0
+    cacheResponses: Optional[bool] = None
+    # Prompt plus completion tokens; None uses the model's known window
+    contextWindow: Optional[int] = Field(None, gt=0)
+    # How input over the context budget is shrunk; None uses PROMPT_OVERFLOW_STRATEGY
+    overflowStrategy: Optional[Literal['head', 'tail', 'head_tail', 'chunk', 'summarize']] = None
+    # Tried in order when the provider is down or keeps failing
+    fallbacks: list[LLMFallback] = []
 
 class AgentCreate(AgentBase):
     pass
@@ -47,6 +60,8 @@ class WorkflowBase(BaseModel):
     description: str
     nodes: list[WorkflowNode] = []
     edges: list[WorkflowEdge] = []
+    # Runs of this workflow at once; None uses EXECUTION_MAX_PER_WORKFLOW
+    maxConcurrentRuns: Optional[int] = Field(None, gt=0)
 
 class WorkflowCreate(WorkflowBase):
     pass
@@ -77,15 +92,36 @@ class Team(TeamBase):
     class Config:
         from_attributes = True
 
+class BatchInput(BaseModel):
+    id: Optional[str] = None
+    input: str
+
 class ExecutionLog(BaseModel):
     id: str
     workflowId: str
+    executionId: Optional[str] = None
     agentId: Optional[str] = None
     timestamp: datetime
     level: Literal['debug', 'info', 'warning', 'error']
     message: str
     metadata: Optional[dict] = None
 
+class ExecutionJob(BaseModel):
+    id: str
+    workflowId: str
+    status: Literal['queued', 'running', 'completed', 'error']
+    initialInput: str
+    incremental: bool
+    priority: Literal['interactive', 'batch'] = 'interactive'
+    attempts: int = 0
+    workerId: Optional[str] = None
+    leaseExpiresAt: Optional[datetime] = None
+    createdAt: datetime
+    startedAt: Optional[datetime] = None
+    finishedAt: Optional[datetime] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+
 class LLMConfig(BaseModel):
     provider: Literal['ollama', 'openai', 'anthropic', 'custom']
     apiKey: Optional[str] = None
@@ -93,3 +129,14 @@ class LLMConfig(BaseModel):
     modelName: str
     temperature: Optional[float] = 0.7
     maxTokens: Optional[int] = 2000
+    contextWindow: Optional[int] = None
+    # Ollama keep_alive: a duration like "10m", seconds, or -1 to stay loaded
+    keepAlive: Optional[Union[int, str]] = None
+    fallbacks: list[LLMFallback] = []
+
+class OllamaWarmRequest(BaseModel):
+    models: list[str] = Field(..., min_length=1)
+    baseUrl: Optional[str] = None
+    contextWindow: Optional[int] = None
+    # Defaults to OLLAMA_KEEP_ALIVE
+    keepAlive: Optional[Union[int, str]] = None
@@ -1,25 +1,24 @@
 from fastapi import APIRouter, HTTPException
 from app.models import Agent, AgentCreate
+from app.services.repository import get_agent_repository
 from typing import List
 from datetime import datetime
 import uuid
 
 router = APIRouter()
 
-# In-memory storage (replace with database in production)
-agents_db: dict[str, Agent] = {}
-
 @router.get("/", response_model=List[Agent])
 async def list_agents():
     """List all agents"""
-    return list(agents_db.values())
+    return await get_agent_repository().list()
 
 @router.get("/{agent_id}", response_model=Agent)
 async def get_agent(agent_id: str):
     """Get a specific agent by ID"""
-    if agent_id not in agents_db:
+    agent = await get_agent_repository().get(agent_id)
+    if agent is None:
         raise HTTPException(status_code=404, detail="Agent not found")
-    return agents_db[agent_id]
+    return agent
 
 @router.post("/", response_model=Agent)
 async def create_agent(agent: AgentCreate):
@@ -35,16 +34,17 @@ async def create_agent(agent: AgentCreate):
         updatedAt=now
     )
     
-    agents_db[agent_id] = new_agent
+    await get_agent_repository().save(new_agent)
     return new_agent
 
 @router.put("/{agent_id}", response_model=Agent)
 async def update_agent(agent_id: str, agent_update: AgentCreate):
     """Update an existing agent"""
-    if agent_id not in agents_db:
+    repository = get_agent_repository()
+    existing_agent = await repository.get(agent_id)
+    if existing_agent is None:
         raise HTTPException(status_code=404, detail="Agent not found")
     
-    existing_agent = agents_db[agent_id]
     updated_agent = Agent(
         id=agent_id,
         **agent_update.model_dump(),
@@ -53,14 +53,15 @@ async def update_agent(agent_id: str, agent_update: AgentCreate):
         updatedAt=datetime.now()
     )
     
-    agents_db[agent_id] = updated_agent
+    await repository.save(updated_agent)
     return updated_agent
 
 @router.delete("/{agent_id}")
 async def delete_agent(agent_id: str):
     """Delete an agent"""
-    if agent_id not in agents_db:
+    repository = get_agent_repository()
+    if await repository.get(agent_id) is None:
         raise HTTPException(status_code=404, detail="Agent not found")
     
-    del agents_db[agent_id]
+    await repository.delete(agent_id)
     return {"message": "Agent deleted successfully"}
@@ -0,0 +1,75 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from app.services.blob_store import get_blob_store
+from typing import Optional, Tuple
+import re
+
+router = APIRouter()
+
+_BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+@router.get("/{digest}")
+async def get_blob(digest: str, range_header: Optional[str] = Header(None, alias="Range")):
+    """
+    Download a stored node output by the hash in its result reference.
+    
+    A single `Range: bytes=start-end` (or `start-`, or `-suffix`) returns
+    206 with just those bytes of the uncompressed content.
+    """
+    store = get_blob_store()
+    size = await store.stat(digest)
+    if size is None:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{digest}"',
+        # Content never changes under a given hash
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    byte_range = _parse_range(range_header, size)
+    if byte_range is None:
+        start, end, status_code = 0, size, 200
+    else:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+    headers["Content-Length"] = str(end - start)
+    
+    return StreamingResponse(
+        store.read(digest, start, end),
+        status_code=status_code,
+        media_type="text/plain; charset=utf-8",
+        headers=headers
+    )
+
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    The [start, end) bytes a Range header asks for, or None to send everything.
+    
+    Malformed and multi-range headers are ignored, as HTTP allows.
+    
+    Raises:
+        HTTPException: 416 if the range starts past the end of the blob
+    """
+    match = _BYTE_RANGE.match(header.strip()) if header else None
+    if match is None or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        start, end = max(0, size - int(last)), size
+        satisfiable = int(last) > 0 and size > 0
+    else:
+        start = int(first)
+        if last != "" and int(last) < start:
+            return None
+        end = size if last == "" else min(int(last) + 1, size)
+        satisfiable = start < size
+    if not satisfiable:
+        raise HTTPException(
+            status_code=416,
+            detail="Range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
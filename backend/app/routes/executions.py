@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Query, HTTPException
+from app.models import ExecutionJob
+from app.services.job_queue import get_job_queue
+from app.services.tracing import get_tracer
+from app.services.workflow_executor import get_workflow_executor
+from typing import Any, Dict, List, Literal, Optional
+
+router = APIRouter()
+
+@router.get("/scheduler")
+async def get_scheduler_state() -> Dict[str, Any]:
+    """Executor concurrency slots, waiting nodes, and the model each local endpoint is serving"""
+    return get_workflow_executor().scheduler.snapshot()
+
+@router.get("/queue")
+async def get_execution_queue() -> Dict[str, Any]:
+    """Running executions and the admission queue, in the order waiting runs will start"""
+    return get_workflow_executor().admission.snapshot()
+
+@router.post("/{execution_id}/cancel")
+async def cancel_execution(execution_id: str):
+    """
+    Cancel a queued or running execution.
+    
+    In-process runs stop at once, cancelling their in-flight LLM and
+    sandbox calls. Runs queued for a worker (EXECUTION_MODE=queue) are
+    failed in the job queue; a worker running one stops it at its next
+    heartbeat.
+    """
+    executor = get_workflow_executor()
+    if execution_id in executor.active_executions:
+        cancelled = executor.cancel(execution_id)
+    else:
+        queue = get_job_queue()
+        cancelled = await queue.cancel(execution_id)
+        if not cancelled and await queue.get(execution_id) is None:
+            raise HTTPException(status_code=404, detail="Execution not found")
+    if not cancelled:
+        raise HTTPException(status_code=409, detail="Execution already finished")
+    return {"message": "Execution cancelled", "executionId": execution_id}
+
+@router.get("/jobs", response_model=List[ExecutionJob])
+async def list_jobs(
+    workflowId: Optional[str] = None,
+    status: Optional[Literal['queued', 'running', 'completed', 'error']] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Queued executions (EXECUTION_MODE=queue), most recent first"""
+    return await get_job_queue().list(workflow_id=workflowId, status=status, limit=limit)
+
+@router.get("/jobs/{job_id}", response_model=ExecutionJob)
+async def get_job(job_id: str):
+    """Status of a queued execution, with its result once a worker has finished it"""
+    job = await get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/{execution_id}/trace")
+async def get_execution_trace(
+    execution_id: str,
+    format: Literal['chrome', 'otlp'] = Query('chrome')
+) -> Dict[str, Any]:
+    """
+    Get the spans recorded for an execution.
+    
+    The default Chrome trace-event JSON opens in Perfetto
+    (ui.perfetto.dev) or chrome://tracing; `otherData.critical_path` lists
+    the chain of nodes that determined the run's duration. `format=otlp`
+    returns the same spans as OTLP-JSON.
+    
+    Traces are held by the process that ran the execution, so a run
+    handled by a queue worker is reported as not found here; set
+    TRACE_OTLP_DIR on the workers to keep their traces as files.
+    """
+    trace = get_tracer().get(execution_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    if format == 'otlp':
+        return trace.to_otlp()
+    return trace.to_chrome()
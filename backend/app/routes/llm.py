@@ -1,36 +1,52 @@
 from fastapi import APIRouter, HTTPException
-from app.models import LLMConfig
+from app.models import LLMConfig, OllamaWarmRequest
+from app.services import llm_service
+from app.services.llm_cache import get_llm_cache
+from app.services.ollama_models import get_ollama_models
+from app.services.provider_health import get_provider_health
+from app.services.rate_limiter import get_rate_limiter_registry
+from app.services.request_coalescer import get_request_coalescer
 from typing import List
-import httpx
 
 router = APIRouter()
 
 @router.get("/ollama/models")
 async def list_ollama_models():
-    """List available Ollama models"""
+    """List available Ollama models, as of the last health check"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get("http://localhost:11434/api/tags")
-            if response.status_code == 200:
-                data = response.json()
-                return data.get("models", [])
-            else:
-                raise HTTPException(status_code=500, detail="Failed to fetch Ollama models")
+        return await get_provider_health().ollama_models(llm_service.OLLAMA_BASE_URL)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ollama connection error: {str(e)}")
 
+@router.post("/ollama/warm")
+async def warm_ollama_models(request: OllamaWarmRequest):
+    """Load Ollama models ahead of use, concurrently, and report each load time"""
+    configs = [
+        LLMConfig(
+            provider="ollama",
+            modelName=model,
+            baseUrl=request.baseUrl,
+            contextWindow=request.contextWindow
+        )
+        for model in request.models
+    ]
+    results = await get_ollama_models().warm(configs, request.keepAlive)
+    return {
+        "models": results,
+        "pinned": get_ollama_models().pinned_models()
+    }
+
 @router.post("/test")
 async def test_llm_connection(config: LLMConfig):
     """Test LLM provider connection"""
     try:
         if config.provider == "ollama":
-            base_url = config.baseUrl or "http://localhost:11434"
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{base_url}/api/tags")
-                if response.status_code == 200:
-                    return {"success": True, "message": "Ollama connection successful"}
-                else:
-                    return {"success": False, "message": "Failed to connect to Ollama"}
+            registry = get_provider_health()
+            endpoint = registry.get("ollama", config.baseUrl or llm_service.OLLAMA_BASE_URL)
+            if await registry.check(endpoint):
+                return {"success": True, "message": "Ollama connection successful"}
+            else:
+                return {"success": False, "message": "Failed to connect to Ollama"}
         
         elif config.provider == "openai":
             if not config.apiKey:
@@ -49,3 +65,24 @@ async def test_llm_connection(config: LLMConfig):
             
     except Exception as e:
         return {"success": False, "message": f"Connection error: {str(e)}"}
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """LLM response cache hit/miss counters"""
+    return get_llm_cache().stats
+
+@router.get("/coalescing/stats")
+async def get_coalescing_stats():
+    """Counts of LLM requests sent versus requests that joined one in flight"""
+    coalescer = get_request_coalescer()
+    return {**coalescer.stats, "in_flight": coalescer.in_flight()}
+
+@router.get("/health")
+async def get_provider_health_state():
+    """Last health check and circuit breaker state of every provider endpoint in use"""
+    return get_provider_health().snapshot()
+
+@router.get("/limits")
+async def get_rate_limits():
+    """Per-provider concurrency, throttling and queue-wait metrics"""
+    return get_rate_limiter_registry().snapshot()
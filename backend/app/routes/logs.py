@@ -1,17 +1,58 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Query, Header, Request, Response, HTTPException
+from fastapi.responses import StreamingResponse
 from app.models import ExecutionLog
 from app.services.workflow_executor import get_workflow_executor
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
+import asyncio
+import os
 import uuid
 
 router = APIRouter()
 
+# Seconds of silence before a keep-alive comment is sent
+LOG_STREAM_HEARTBEAT_SECONDS = float(os.getenv("LOG_STREAM_HEARTBEAT_SECONDS", "15"))
+
 @router.get("/", response_model=List[ExecutionLog])
-async def list_logs(workflowId: Optional[str] = Query(None)):
-    """List execution logs, optionally filtered by workflow"""
+async def list_logs(
+    response: Response,
+    workflowId: Optional[str] = Query(None),
+    executionId: Optional[str] = Query(None),
+    level: Optional[List[Literal['debug', 'info', 'warning', 'error']]] = Query(None),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(1000, ge=1, le=10000)
+):
+    """
+    List execution logs, optionally filtered.
+    
+    Without a cursor the newest `limit` matching logs are returned. Pass
+    the X-Next-Cursor response header back as `cursor` to poll for entries
+    logged since, or pass cursor=0 to page through the history from the
+    oldest entry. Pages are ordered oldest first either way.
+    
+    Logs are kept by the process that ran the execution, so runs handled
+    by worker.py (EXECUTION_MODE=queue) don't appear here.
+    """
     executor = get_workflow_executor()
-    return executor.get_logs(workflowId)
+    try:
+        logs, next_cursor = executor.get_logs(
+            workflow_id=workflowId,
+            execution_id=executionId,
+            levels=level,
+            since=since,
+            until=until,
+            cursor=cursor,
+            limit=limit,
+            newest=cursor is None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return logs
 
 @router.get("/active-executions")
 async def get_active_executions():
@@ -20,7 +61,49 @@ async def get_active_executions():
     return executor.get_active_executions()
 
 @router.get("/stream/{workflow_id}")
-async def stream_logs(workflow_id: str):
-    """Stream logs for a specific workflow (SSE endpoint)"""
-    # TODO: Implement Server-Sent Events for real-time log streaming
-    return {"message": "Log streaming endpoint", "workflowId": workflow_id}
+async def stream_logs(
+    workflow_id: str,
+    request: Request,
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Stream logs for a specific workflow (SSE endpoint).
+    
+    Only executions run by this API process are streamed; queued runs
+    log inside their worker.
+    """
+    broker = get_workflow_executor().log_broker
+    try:
+        resume_from = int(last_event_id) if last_event_id else None
+    except ValueError:
+        resume_from = None
+    
+    async def event_stream():
+        subscription = broker.subscribe(workflow_id, resume_from)
+        try:
+            yield "retry: 3000\n\n"
+            dropped = 0
+            while True:
+                try:
+                    event_id, log = await asyncio.wait_for(
+                        subscription.get(),
+                        timeout=LOG_STREAM_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": heartbeat\n\n"
+                    continue
+                
+                if subscription.dropped != dropped:
+                    yield f": dropped {subscription.dropped - dropped} events\n\n"
+                    dropped = subscription.dropped
+                yield f"id: {event_id}\ndata: {log.model_dump_json()}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,50 @@
+from collections import defaultdict
+from typing import Dict, Tuple
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.services.metrics import get_metrics
+from app.services.rate_limiter import get_rate_limiter_registry
+from app.services.sandbox_pool import get_sandbox_pool
+from app.services.workflow_executor import get_workflow_executor
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus metrics in the text exposition format.
+    
+    These describe this process only. Worker processes (EXECUTION_MODE=queue)
+    keep their own execution, LLM and sandbox counters, which aren't exported.
+    """
+    metrics = get_metrics()
+    executor = get_workflow_executor()
+    
+    running = [
+        execution for execution in executor.active_executions.values()
+        if execution["status"] == "running"
+    ]
+    metrics.active_executions.set(len(running))
+    metrics.executions_queued.set(executor.admission.queued)
+    metrics.nodes_waiting.set(executor.nodes_waiting)
+    metrics.log_store_entries.set(len(executor.log_store))
+    metrics.log_stream_subscribers.set(executor.log_broker.subscriber_count())
+    
+    # Endpoints serving the same provider and model are reported together
+    queued: Dict[Tuple[str, str], int] = defaultdict(int)
+    in_flight: Dict[Tuple[str, str], int] = defaultdict(int)
+    for (provider, _, model), limiter in get_rate_limiter_registry().limiters().items():
+        queued[(provider, model)] += limiter.queued
+        in_flight[(provider, model)] += limiter.semaphore.active
+    metrics.llm_queued.clear()
+    metrics.llm_in_flight.clear()
+    for (provider, model), count in queued.items():
+        metrics.llm_queued.set(count, provider=provider, model=model)
+        metrics.llm_in_flight.set(in_flight[(provider, model)], provider=provider, model=model)
+    
+    pool = get_sandbox_pool().snapshot()
+    metrics.sandbox_workers.set(pool["idle"], state="idle")
+    metrics.sandbox_workers.set(pool["busy"], state="busy")
+    metrics.sandbox_queued.set(pool["queued"])
+    
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,25 +1,24 @@
 from fastapi import APIRouter, HTTPException
 from app.models import Team, TeamCreate
+from app.services.repository import get_team_repository
 from typing import List
 from datetime import datetime
 import uuid
 
 router = APIRouter()
 
-# In-memory storage
-teams_db: dict[str, Team] = {}
-
 @router.get("/", response_model=List[Team])
 async def list_teams():
     """List all teams"""
-    return list(teams_db.values())
+    return await get_team_repository().list()
 
 @router.get("/{team_id}", response_model=Team)
 async def get_team(team_id: str):
     """Get a specific team by ID"""
-    if team_id not in teams_db:
+    team = await get_team_repository().get(team_id)
+    if team is None:
         raise HTTPException(status_code=404, detail="Team not found")
-    return teams_db[team_id]
+    return team
 
 @router.post("/", response_model=Team)
 async def create_team(team: TeamCreate):
@@ -36,16 +35,17 @@ async def create_team(team: TeamCreate):
         updatedAt=now
     )
     
-    teams_db[team_id] = new_team
+    await get_team_repository().save(new_team)
     return new_team
 
 @router.put("/{team_id}", response_model=Team)
 async def update_team(team_id: str, team_update: TeamCreate):
     """Update an existing team"""
-    if team_id not in teams_db:
+    repository = get_team_repository()
+    existing_team = await repository.get(team_id)
+    if existing_team is None:
         raise HTTPException(status_code=404, detail="Team not found")
     
-    existing_team = teams_db[team_id]
     updated_team = Team(
         id=team_id,
         name=team_update.name,
@@ -56,14 +56,15 @@ async def update_team(team_id: str, team_update: TeamCreate):
         updatedAt=datetime.now()
     )
     
-    teams_db[team_id] = updated_team
+    await repository.save(updated_team)
     return updated_team
 
 @router.delete("/{team_id}")
 async def delete_team(team_id: str):
     """Delete a team"""
-    if team_id not in teams_db:
+    repository = get_team_repository()
+    if await repository.get(team_id) is None:
         raise HTTPException(status_code=404, detail="Team not found")
     
-    del teams_db[team_id]
+    await repository.delete(team_id)
     return {"message": "Team deleted successfully"}
@@ -1,29 +1,33 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from app.models import Workflow, WorkflowCreate
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from app.models import BatchInput, Workflow, WorkflowCreate
+from app.services import job_queue
+from app.services.admission import AdmissionRejected, Priority
+from app.services.checkpoint_store import get_checkpoint_store
+from app.services.job_queue import get_job_queue
+from app.services.job_worker import execute_and_record
+from app.services.repository import get_agent_repository, get_workflow_repository
 from app.services.workflow_executor import get_workflow_executor
-from typing import List
+from typing import List, Literal, Optional
 from datetime import datetime
+import json
 import uuid
 
 router = APIRouter()
 
-# In-memory storage
-workflows_db: dict[str, Workflow] = {}
-
-# Import agents_db from agents route (for workflow execution)
-from app.routes.agents import agents_db
-
 @router.get("/", response_model=List[Workflow])
 async def list_workflows():
     """List all workflows"""
-    return list(workflows_db.values())
+    return await get_workflow_repository().list()
 
 @router.get("/{workflow_id}", response_model=Workflow)
 async def get_workflow(workflow_id: str):
     """Get a specific workflow by ID"""
-    if workflow_id not in workflows_db:
+    workflow = await get_workflow_repository().get(workflow_id)
+    if workflow is None:
         raise HTTPException(status_code=404, detail="Workflow not found")
-    return workflows_db[workflow_id]
+    return workflow
 
 @router.post("/", response_model=Workflow)
 async def create_workflow(workflow: WorkflowCreate):
@@ -39,16 +43,17 @@ async def create_workflow(workflow: WorkflowCreate):
         updatedAt=now
     )
     
-    workflows_db[workflow_id] = new_workflow
+    await get_workflow_repository().save(new_workflow)
     return new_workflow
 
 @router.put("/{workflow_id}", response_model=Workflow)
 async def update_workflow(workflow_id: str, workflow_update: WorkflowCreate):
     """Update an existing workflow"""
-    if workflow_id not in workflows_db:
+    repository = get_workflow_repository()
+    existing_workflow = await repository.get(workflow_id)
+    if existing_workflow is None:
         raise HTTPException(status_code=404, detail="Workflow not found")
     
-    existing_workflow = workflows_db[workflow_id]
     updated_workflow = Workflow(
         id=workflow_id,
         **workflow_update.model_dump(),
@@ -57,46 +62,191 @@ async def update_workflow(workflow_id: str, workflow_update: WorkflowCreate):
         updatedAt=datetime.now()
     )
     
-    workflows_db[workflow_id] = updated_workflow
+    await repository.save(updated_workflow)
     return updated_workflow
 
 @router.delete("/{workflow_id}")
 async def delete_workflow(workflow_id: str):
     """Delete a workflow"""
-    if workflow_id not in workflows_db:
+    repository = get_workflow_repository()
+    if await repository.get(workflow_id) is None:
         raise HTTPException(status_code=404, detail="Workflow not found")
     
-    del workflows_db[workflow_id]
+    await repository.delete(workflow_id)
+    await get_checkpoint_store().delete_workflow(workflow_id)
     return {"message": "Workflow deleted successfully"}
 
 @router.post("/{workflow_id}/execute")
-async def execute_workflow(workflow_id: str, background_tasks: BackgroundTasks, initial_input: str = ""):
-    """Execute a workflow"""
-    if workflow_id not in workflows_db:
+async def execute_workflow(
+    workflow_id: str,
+    background_tasks: BackgroundTasks,
+    initial_input: str = "",
+    incremental: bool = False,
+    priority: Literal['interactive', 'batch'] = 'interactive'
+):
+    """
+    Execute a workflow.
+    
+    Pass incremental=true to reuse checkpointed outputs of nodes whose agent
+    and input haven't changed; by default every node is recomputed, since
+    agents sampling above temperature 0 shouldn't silently repeat themselves.
+    Runs past EXECUTION_MAX_RUNNING wait their turn, interactive before
+    batch; once EXECUTION_MAX_QUEUED are waiting the request gets a 429
+    with Retry-After.
+    """
+    return await _start_execution(
+        workflow_id,
+        background_tasks,
+        initial_input or "Execute the workflow tasks.",
+        incremental,
+        priority
+    )
+
+@router.post("/{workflow_id}/executions/{execution_id}/resume")
+async def resume_execution(workflow_id: str, execution_id: str, background_tasks: BackgroundTasks):
+    """Rerun a failed or cancelled execution with the same input, continuing from its last good nodes"""
+    execution = get_workflow_executor().active_executions.get(execution_id)
+    if execution is None:
+        # Queued executions run in a worker; their job has what's needed
+        job = await get_job_queue().get(execution_id)
+        if job is not None:
+            execution = {
+                "workflow_id": job.workflowId,
+                "status": job.status,
+                "initial_input": job.initialInput
+            }
+    if execution is None or execution["workflow_id"] != workflow_id:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    if execution["status"] not in ("error", "cancelled"):
+        raise HTTPException(status_code=409, detail="Only failed or cancelled executions can be resumed")
+    
+    return await _start_execution(
+        workflow_id, background_tasks, execution["initial_input"], incremental=True
+    )
+
+async def _start_execution(
+    workflow_id: str,
+    background_tasks: BackgroundTasks,
+    initial_input: str,
+    incremental: bool,
+    priority: Priority = 'interactive'
+) -> dict:
+    """Mark a workflow active and run it in the background, or queue it for a worker"""
+    repository = get_workflow_repository()
+    workflow = await repository.get(workflow_id)
+    if workflow is None:
         raise HTTPException(status_code=404, detail="Workflow not found")
     
-    workflow = workflows_db[workflow_id]
-    workflow.status = 'active'
-    workflow.updatedAt = datetime.now()
+    if job_queue.EXECUTION_MODE == "queue":
+        try:
+            job = await get_job_queue().enqueue(workflow_id, initial_input, incremental, priority)
+        except AdmissionRejected as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        await _mark_active(workflow)
+        return {"message": "Workflow execution queued", "workflowId": workflow_id, "jobId": job.id}
+    
+    # Load only the agents this workflow references
+    agent_ids = [node.data.agentId for node in workflow.nodes if node.data.agentId]
+    agents = await get_agent_repository().get_many(agent_ids)
     
     # Get workflow executor
     executor = get_workflow_executor()
+    try:
+        execution_id = executor.admit(workflow, initial_input, priority)
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    await _mark_active(workflow)
     
     # Execute workflow in background
-    async def run_workflow():
-        result = await executor.execute_workflow(
-            workflow=workflow,
-            agents=agents_db,
-            initial_input=initial_input or "Execute the workflow tasks."
-        )
-        
-        # Update workflow status based on result
-        if result["status"] == "completed":
-            workflow.status = 'completed'
-        else:
-            workflow.status = 'error'
-        workflow.updatedAt = datetime.now()
+    background_tasks.add_task(
+        execute_and_record,
+        executor,
+        workflow,
+        agents,
+        initial_input,
+        incremental,
+        repository,
+        execution_id=execution_id
+    )
     
-    background_tasks.add_task(run_workflow)
+    response = {"message": "Workflow execution started", "workflowId": workflow_id, "executionId": execution_id}
+    position = executor.queue_position(execution_id)
+    if position is not None:
+        response.update(message="Workflow execution queued", position=position)
+    return response
+
+async def _mark_active(workflow: Workflow):
+    """Show the workflow as running in the UI"""
+    workflow.status = 'active'
+    workflow.updatedAt = datetime.now()
+    await get_workflow_repository().save(workflow)
+
+@router.post("/{workflow_id}/execute-batch")
+async def execute_workflow_batch(
+    workflow_id: str,
+    request: Request,
+    concurrency: Optional[int] = Query(None, ge=1, le=256)
+):
+    """
+    Execute a workflow once per input and stream results as NDJSON.
+    
+    Inputs are either a JSON array in the request body or a JSONL file
+    uploaded as multipart field `file`. Each input is a string or an
+    object with `input` and an optional `id`. One line is streamed per
+    input as executions finish.
+    """
+    repository = get_workflow_repository()
+    workflow = await repository.get(workflow_id)
+    if workflow is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    
+    inputs = await _read_batch_inputs(request)
+    if not inputs:
+        raise HTTPException(status_code=400, detail="No inputs provided")
     
-    return {"message": "Workflow execution started", "workflowId": workflow_id}
+    agent_ids = [node.data.agentId for node in workflow.nodes if node.data.agentId]
+    agents = await get_agent_repository().get_many(agent_ids)
+    executor = get_workflow_executor()
+    # Admitted as a whole; its runs then queue behind interactive ones
+    try:
+        executor.admission.check()
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    
+    async def stream_results():
+        async for line in executor.execute_batch(workflow, agents, inputs, concurrency):
+            yield json.dumps(line) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+async def _read_batch_inputs(request: Request) -> List[BatchInput]:
+    """Parse batch inputs from a JSON array body or an uploaded JSONL file"""
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Missing JSONL file field 'file'")
+            raw_items = []
+            for line_number, line in enumerate((await upload.read()).splitlines(), start=1):
+                if not line.strip():
+                    continue
+                try:
+                    raw_items.append(json.loads(line))
+                except ValueError:
+                    raise HTTPException(status_code=400, detail=f"Invalid JSON on line {line_number}")
+        else:
+            try:
+                raw_items = await request.json()
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Request body must be a JSON array")
+            if not isinstance(raw_items, list):
+                raise HTTPException(status_code=400, detail="Request body must be a JSON array")
+        
+        return [
+            BatchInput(input=item) if isinstance(item, str) else BatchInput.model_validate(item)
+            for item in raw_items
+        ]
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch input: {e.errors()[0]['msg']}")
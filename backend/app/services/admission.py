@@ -0,0 +1,201 @@
+"""
+Admission control for workflow executions.
+Runs beyond the running limit wait in a bounded queue, interactive ahead of
+batch; once the queue is full new runs are turned away rather than slowing all.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Literal, Optional
+
+from app.services.metrics import get_metrics
+
+# Executions running at once per process
+EXECUTION_MAX_RUNNING = int(os.getenv("EXECUTION_MAX_RUNNING", "16"))
+# Executions waiting for a slot before new ones get a 429
+EXECUTION_MAX_QUEUED = int(os.getenv("EXECUTION_MAX_QUEUED", "64"))
+# Runs of one workflow at once, unless it sets maxConcurrentRuns; 0 = no limit
+EXECUTION_MAX_PER_WORKFLOW = int(os.getenv("EXECUTION_MAX_PER_WORKFLOW", "0"))
+
+Priority = Literal["interactive", "batch"]
+# Highest first
+PRIORITIES = ("interactive", "batch")
+
+class AdmissionRejected(Exception):
+    """The execution queue is full"""
+    
+    def __init__(self, retry_after: int):
+        super().__init__(f"Execution queue is full; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+class AdmissionTicket:
+    """One execution's place in the queue, then its running slot"""
+    __slots__ = ("execution_id", "workflow_id", "priority", "limit", "future", "enqueued", "granted_at")
+    
+    def __init__(
+        self,
+        execution_id: str,
+        workflow_id: str,
+        priority: Priority,
+        limit: int,
+        future: asyncio.Future
+    ):
+        self.execution_id = execution_id
+        self.workflow_id = workflow_id
+        self.priority = priority
+        self.limit = limit
+        self.future = future
+        self.enqueued = time.monotonic()
+        self.granted_at: Optional[float] = None
+
+class ExecutionAdmission:
+    """
+    Running slots for executions, handed out by priority class and then
+    arrival. A run whose workflow is at its concurrency limit is passed
+    over, without holding back runs of other workflows.
+    """
+    
+    def __init__(
+        self,
+        max_running: int = EXECUTION_MAX_RUNNING,
+        max_queued: int = EXECUTION_MAX_QUEUED,
+        per_workflow: int = EXECUTION_MAX_PER_WORKFLOW
+    ):
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.per_workflow = per_workflow
+        self.running = 0
+        self.rejected = 0
+        self._queues: Dict[str, Deque[AdmissionTicket]] = {priority: deque() for priority in PRIORITIES}
+        self._running_by_workflow: Dict[str, int] = {}
+        # Moving average of run time, for Retry-After
+        self._average_seconds = 1.0
+    
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+    
+    def check(self, count: int = 1):
+        """
+        Make sure count more executions would fit.
+        
+        Raises:
+            AdmissionRejected: If they'd have to queue and the queue is full
+        """
+        free = max(0, self.max_running - self.running)
+        if count > free and self.queued + count - free > self.max_queued:
+            self.rejected += 1
+            get_metrics().executions_rejected.inc()
+            raise AdmissionRejected(self.retry_after())
+    
+    def enqueue(
+        self,
+        execution_id: str,
+        workflow_id: str,
+        priority: Priority = "interactive",
+        limit: Optional[int] = None,
+        bounded: bool = True
+    ) -> AdmissionTicket:
+        """
+        Take a place in line; the ticket is granted a slot at once if one is free.
+        
+        Args:
+            limit: Runs of this workflow at once (defaults to EXECUTION_MAX_PER_WORKFLOW)
+            bounded: Reject instead of queueing past max_queued; runs that
+                belong to an already admitted batch pass False
+        
+        Raises:
+            AdmissionRejected: If bounded and the queue is full
+        """
+        if bounded:
+            self.check()
+        ticket = AdmissionTicket(
+            execution_id,
+            workflow_id,
+            priority,
+            limit or self.per_workflow,
+            asyncio.get_running_loop().create_future()
+        )
+        self._queues[priority].append(ticket)
+        self._dispatch()
+        return ticket
+    
+    async def wait(self, ticket: AdmissionTicket):
+        """Wait until the ticket holds a running slot"""
+        await ticket.future
+    
+    def release(self, ticket: AdmissionTicket):
+        """Give up the ticket's slot, or its place in line if it never got one"""
+        if ticket.granted_at is None:
+            queue = self._queues[ticket.priority]
+            if ticket in queue:
+                queue.remove(ticket)
+                ticket.future.cancel()
+            return
+        self.running -= 1
+        self._running_by_workflow[ticket.workflow_id] -= 1
+        if not self._running_by_workflow[ticket.workflow_id]:
+            del self._running_by_workflow[ticket.workflow_id]
+        elapsed = time.monotonic() - ticket.granted_at
+        self._average_seconds = 0.8 * self._average_seconds + 0.2 * elapsed
+        ticket.granted_at = None
+        self._dispatch()
+    
+    def position(self, ticket: AdmissionTicket) -> Optional[int]:
+        """1-based place in line, or None once running"""
+        place = 0
+        for priority in PRIORITIES:
+            for queued in self._queues[priority]:
+                place += 1
+                if queued is ticket:
+                    return place
+        return None
+    
+    def retry_after(self) -> int:
+        """Seconds until the queue has likely drained enough to take another run"""
+        backlog = (self.queued + 1) / max(1, self.max_running)
+        return max(1, math.ceil(backlog * self._average_seconds))
+    
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        place = 0
+        queued = []
+        for priority in PRIORITIES:
+            for ticket in self._queues[priority]:
+                place += 1
+                queued.append({
+                    "execution_id": ticket.execution_id,
+                    "workflow_id": ticket.workflow_id,
+                    "priority": ticket.priority,
+                    "position": place,
+                    "waited_seconds": round(now - ticket.enqueued, 1),
+                })
+        return {
+            "max_running": self.max_running,
+            "max_queued": self.max_queued,
+            "running": self.running,
+            "rejected": self.rejected,
+            "running_by_workflow": dict(self._running_by_workflow),
+            "queued": queued,
+        }
+    
+    def _dispatch(self):
+        while self.running < self.max_running:
+            ticket = self._next()
+            if ticket is None:
+                return
+            self._queues[ticket.priority].remove(ticket)
+            self.running += 1
+            self._running_by_workflow[ticket.workflow_id] = self._running_by_workflow.get(ticket.workflow_id, 0) + 1
+            ticket.granted_at = time.monotonic()
+            ticket.future.set_result(None)
+    
+    def _next(self) -> Optional[AdmissionTicket]:
+        """The oldest ticket of the highest priority whose workflow may run another"""
+        for priority in PRIORITIES:
+            for ticket in self._queues[priority]:
+                if not ticket.limit or self._running_by_workflow.get(ticket.workflow_id, 0) < ticket.limit:
+                    return ticket
+        return None
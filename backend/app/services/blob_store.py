@@ -0,0 +1,234 @@
+"""
+Content-addressed disk store for large node outputs.
+Blobs are named by the SHA-256 of their content, so an output produced twice
+is stored once; they're zstd-compressed when the zstandard package is installed.
+"""
+import asyncio
+import hashlib
+import importlib.util
+import logging
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set, Tuple, Union
+
+from app.services.job_queue import get_job_queue
+
+logger = logging.getLogger(__name__)
+
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "./.blobs")
+# Node outputs at least this many bytes are stored as blobs; 0 keeps all inline
+BLOB_THRESHOLD_BYTES = int(os.getenv("BLOB_THRESHOLD_BYTES", "65536"))
+BLOB_STORE_MAX_MB = float(os.getenv("BLOB_STORE_MAX_MB", "2048"))
+# "zstd" (needs the zstandard package) or "none"
+BLOB_COMPRESSION = os.getenv("BLOB_COMPRESSION", "zstd").lower()
+BLOB_ZSTD_LEVEL = int(os.getenv("BLOB_ZSTD_LEVEL", "3"))
+
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+# Read size when streaming a blob
+_CHUNK_BYTES = 64 * 1024
+
+# A stored output as it appears in execution results
+BlobRef = Dict[str, Any]
+
+class BlobStore:
+    """
+    Write-once blobs on disk, read back whole or by byte range.
+    
+    Past max_bytes the least recently stored blobs are evicted, except
+    those referenced() reports as still handed out in stored results.
+    """
+    
+    def __init__(
+        self,
+        root: str = BLOB_STORE_DIR,
+        threshold: int = BLOB_THRESHOLD_BYTES,
+        max_bytes: int = int(BLOB_STORE_MAX_MB * 1024 * 1024),
+        compression: str = BLOB_COMPRESSION,
+        level: int = BLOB_ZSTD_LEVEL,
+        referenced: Optional[Callable[[], Awaitable[Set[str]]]] = None
+    ):
+        self.root = Path(root)
+        self.referenced = referenced
+        self.threshold = threshold
+        self.max_bytes = max_bytes
+        self.compress = compression == "zstd" and _zstd_available()
+        # Blobs compressed earlier stay readable after compression is turned off
+        self._decompress = importlib.util.find_spec("zstandard") is not None
+        self.level = level
+        self._sizes: Optional[Dict[str, int]] = None
+        self._write_lock = asyncio.Lock()
+        self.stats = {
+            "stored": 0,
+            "deduplicated": 0,
+            "bytes_in": 0,
+            "bytes_written": 0,
+            "evictions": 0,
+        }
+    
+    async def offload(self, text: Union[str, BlobRef]) -> Union[str, BlobRef]:
+        """Move text at or above the threshold into a blob and return its reference"""
+        # UTF-8 takes at least a byte per character, so short text can't qualify
+        if not self.threshold or not isinstance(text, str) or len(text) < self.threshold // 4:
+            return text
+        data = text.encode("utf-8")
+        if len(data) < self.threshold:
+            return text
+        return await self.put(data)
+    
+    async def put(self, data: bytes) -> BlobRef:
+        """Store data unless a blob with the same content exists"""
+        digest = hashlib.sha256(data).hexdigest()
+        async with self._write_lock:
+            over_limit = await asyncio.to_thread(self._write, digest, data)
+            if over_limit:
+                keep = await self.referenced() if self.referenced is not None else set()
+                keep.add(digest)
+                await asyncio.to_thread(self._evict, keep)
+        return {"blob": digest, "size": len(data)}
+    
+    async def get(self, digest: str) -> Optional[bytes]:
+        """A blob's whole content, or None if it isn't stored"""
+        located = await asyncio.to_thread(self._locate, digest)
+        if located is None:
+            return None
+        return b"".join([chunk async for chunk in self.read(digest, 0, located[1])])
+    
+    async def stat(self, digest: str) -> Optional[int]:
+        """A blob's uncompressed size in bytes, or None if it isn't stored"""
+        located = await asyncio.to_thread(self._locate, digest)
+        return located[1] if located is not None else None
+    
+    async def read(self, digest: str, start: int, end: int) -> AsyncIterator[bytes]:
+        """Stream bytes start to end (exclusive) of a blob's uncompressed content"""
+        located = await asyncio.to_thread(self._locate, digest)
+        if located is None:
+            raise FileNotFoundError(digest)
+        path = located[0]
+        reader = await asyncio.to_thread(self._open, path)
+        try:
+            await asyncio.to_thread(reader.seek, start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = await asyncio.to_thread(reader.read, min(_CHUNK_BYTES, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            reader.close()
+    
+    def _path(self, digest: str, compressed: bool) -> Path:
+        return self.root / digest[:2] / (f"{digest}.zst" if compressed else digest)
+    
+    def _locate(self, digest: str) -> Optional[Tuple[Path, int]]:
+        """Where a blob is stored and its uncompressed size"""
+        if not _DIGEST.match(digest):
+            return None
+        path = self._path(digest, False)
+        try:
+            return path, path.stat().st_size
+        except OSError:
+            pass
+        if self._decompress:
+            path = self._path(digest, True)
+            try:
+                with open(path, "rb") as f:
+                    return path, _zstd_content_size(f.read(18))
+            except OSError:
+                pass
+        return None
+    
+    def _open(self, path: Path):
+        f = open(path, "rb")
+        if path.suffix != ".zst":
+            return f
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(f, closefd=True)
+    
+    def _write(self, digest: str, data: bytes) -> bool:
+        """Store a blob; True if the store has grown past max_bytes"""
+        sizes = self._load_sizes()
+        self.stats["bytes_in"] += len(data)
+        located = self._locate(digest)
+        if located is not None:
+            # Touch so eviction is least-recently-stored
+            os.utime(located[0])
+            self.stats["deduplicated"] += 1
+            return False
+        
+        payload = data
+        if self.compress:
+            import zstandard
+            payload = zstandard.ZstdCompressor(level=self.level).compress(data)
+        path = self._path(digest, self.compress)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Unique so another process writing the same blob can't interleave
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, path)
+        sizes[path.name] = len(payload)
+        self.stats["stored"] += 1
+        self.stats["bytes_written"] += len(payload)
+        return sum(sizes.values()) > self.max_bytes
+    
+    def _load_sizes(self) -> Dict[str, int]:
+        """Scan the store once to learn what's already there"""
+        if self._sizes is None:
+            self._sizes = {}
+            if self.root.exists():
+                for path in self.root.glob("*/*"):
+                    if not path.name.startswith("."):
+                        self._sizes[path.name] = path.stat().st_size
+        return self._sizes
+    
+    def _evict(self, keep: Set[str]):
+        sizes = self._load_sizes()
+        total = sum(sizes.values())
+        # Evict down to 90% so referenced blobs aren't looked up on every write
+        target = self.max_bytes * 0.9
+        by_age = []
+        for name in sizes:
+            if name.split(".")[0] in keep:
+                continue
+            path = self.root / name[:2] / name
+            try:
+                by_age.append((path.stat().st_mtime, name))
+            except OSError:
+                by_age.append((0.0, name))
+        by_age.sort()
+        for _, name in by_age:
+            if total <= target:
+                break
+            try:
+                (self.root / name[:2] / name).unlink()
+            except OSError:
+                pass
+            total -= sizes.pop(name)
+            self.stats["evictions"] += 1
+        if total > self.max_bytes:
+            logger.warning(
+                "Blob store holds %d MB of referenced outputs, over BLOB_STORE_MAX_MB",
+                total // (1024 * 1024)
+            )
+
+def _zstd_available() -> bool:
+    if importlib.util.find_spec("zstandard") is None:
+        logger.warning("BLOB_COMPRESSION is zstd but the 'zstandard' package is not installed; storing blobs uncompressed")
+        return False
+    return True
+
+def _zstd_content_size(header: bytes) -> int:
+    import zstandard
+    return zstandard.frame_content_size(header)
+
+# Global blob store instance
+_blob_store: Optional[BlobStore] = None
+
+def get_blob_store() -> BlobStore:
+    """Get or create the global blob store"""
+    global _blob_store
+    if _blob_store is None:
+        _blob_store = BlobStore(referenced=get_job_queue().blob_references)
+    return _blob_store
@@ -0,0 +1,99 @@
+"""
+Persisted per-node outputs for incremental workflow re-execution.
+A node's output is reused while the fingerprint of its agent configuration
+and input is unchanged, so only edited nodes and their dependents rerun.
+"""
+import hashlib
+import json
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+
+from app.models import Agent
+from app.services.database import Database, checkpoints_table, get_database
+
+# Bump when the fingerprint inputs change so stale checkpoints are ignored
+FINGERPRINT_VERSION = 2
+
+def node_fingerprint(agent: Agent, node_input: str) -> str:
+    """Hash everything that determines an agent node's output"""
+    request = {
+        "version": FINGERPRINT_VERSION,
+        "provider": agent.llmProvider,
+        "model": agent.modelName,
+        "system_prompt": agent.systemPrompt,
+        "temperature": agent.temperature,
+        "max_tokens": agent.maxTokens,
+        "context_window": agent.contextWindow,
+        "overflow_strategy": agent.overflowStrategy,
+        "input": node_input,
+    }
+    encoded = json.dumps(request, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+class CheckpointStore:
+    """Keep the latest output of every workflow node"""
+    
+    def __init__(self, database: Database):
+        self.database = database
+    
+    async def load(self, workflow_id: str) -> Dict[str, Tuple[str, str]]:
+        """Get (fingerprint, output) for every checkpointed node of a workflow"""
+        await self.database.init()
+        table = checkpoints_table
+        query = select(table.c.node_id, table.c.fingerprint, table.c.output).where(
+            table.c.workflow_id == workflow_id
+        )
+        async with self.database.engine.connect() as conn:
+            rows = (await conn.execute(query)).all()
+        return {row.node_id: (row.fingerprint, row.output) for row in rows}
+    
+    async def save(
+        self,
+        workflow_id: str,
+        node_id: str,
+        fingerprint: str,
+        output: str,
+        execution_id: str
+    ):
+        """Record a node's output, replacing its previous checkpoint"""
+        await self.database.init()
+        statement = insert(checkpoints_table).values(
+            workflow_id=workflow_id,
+            node_id=node_id,
+            fingerprint=fingerprint,
+            execution_id=execution_id,
+            created_at=datetime.now(),
+            output=output,
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[checkpoints_table.c.workflow_id, checkpoints_table.c.node_id],
+            set_={
+                "fingerprint": statement.excluded.fingerprint,
+                "execution_id": statement.excluded.execution_id,
+                "created_at": statement.excluded.created_at,
+                "output": statement.excluded.output,
+            }
+        )
+        async with self.database.engine.begin() as conn:
+            await conn.execute(statement)
+    
+    async def delete_workflow(self, workflow_id: str):
+        """Forget every checkpoint of a workflow"""
+        await self.database.init()
+        async with self.database.engine.begin() as conn:
+            await conn.execute(
+                delete(checkpoints_table).where(checkpoints_table.c.workflow_id == workflow_id)
+            )
+
+# Global checkpoint store
+_checkpoint_store: Optional[CheckpointStore] = None
+
+def get_checkpoint_store() -> CheckpointStore:
+    """Get or create the global checkpoint store"""
+    global _checkpoint_store
+    if _checkpoint_store is None:
+        _checkpoint_store = CheckpointStore(get_database())
+    return _checkpoint_store
@@ -0,0 +1,117 @@
+"""
+SQLite persistence for agents, workflows, teams, node checkpoints and jobs.
+Uses SQLAlchemy's async engine on top of aiosqlite, with WAL journaling so
+several worker processes can read while one writes.
+"""
+import asyncio
+import os
+from typing import Optional
+
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, MetaData, String, Table, Text, event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./agent_orchestrator.db")
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "5"))
+
+metadata = MetaData()
+
+def _entity_table(name: str) -> Table:
+    """Define a table storing one serialized model per row"""
+    return Table(
+        name,
+        metadata,
+        Column("id", String, primary_key=True),
+        Column("name", String, nullable=False, index=True),
+        Column("created_at", DateTime, nullable=False, index=True),
+        Column("updated_at", DateTime, nullable=False),
+        Column("data", Text, nullable=False),
+    )
+
+agents_table = _entity_table("agents")
+workflows_table = _entity_table("workflows")
+teams_table = _entity_table("teams")
+
+# Latest output of each workflow node, reused while its fingerprint matches
+checkpoints_table = Table(
+    "node_checkpoints",
+    metadata,
+    Column("workflow_id", String, primary_key=True),
+    Column("node_id", String, primary_key=True),
+    Column("fingerprint", String, nullable=False),
+    Column("execution_id", String, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Column("output", Text, nullable=False),
+)
+
+# Queued workflow executions, claimed by worker processes under a lease
+jobs_table = Table(
+    "execution_jobs",
+    metadata,
+    Column("id", String, primary_key=True),
+    Column("workflow_id", String, nullable=False, index=True),
+    Column("status", String, nullable=False),
+    Column("initial_input", Text, nullable=False),
+    Column("incremental", Boolean, nullable=False),
+    # Admission class; interactive jobs are claimed ahead of batch ones
+    Column("priority", String, nullable=False, default="interactive"),
+    Column("attempts", Integer, nullable=False, default=0),
+    Column("worker_id", String),
+    Column("lease_expires_at", DateTime),
+    Column("created_at", DateTime, nullable=False),
+    Column("started_at", DateTime),
+    Column("finished_at", DateTime),
+    # JSON of the executor's result once finished
+    Column("result", Text),
+    Column("error", Text),
+    Index("ix_execution_jobs_claim", "status", "created_at"),
+)
+
+class Database:
+    """Owns the async engine and makes sure the schema exists"""
+    
+    def __init__(self, url: str = DATABASE_URL, pool_size: int = DATABASE_POOL_SIZE):
+        self.url = url
+        self.engine: AsyncEngine = create_async_engine(
+            url,
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=pool_size,
+            max_overflow=0,
+        )
+        event.listen(self.engine.sync_engine, "connect", _configure_sqlite)
+        self._initialized = False
+        self._init_lock = asyncio.Lock()
+    
+    async def init(self):
+        """Create tables and indexes if they don't exist yet"""
+        if self._initialized:
+            return
+        async with self._init_lock:
+            if self._initialized:
+                return
+            async with self.engine.begin() as conn:
+                await conn.run_sync(metadata.create_all)
+            self._initialized = True
+    
+    async def close(self):
+        """Dispose of pooled connections"""
+        await self.engine.dispose()
+        self._initialized = False
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    """Per-connection pragmas: WAL for concurrent readers, bounded lock waits"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+# Global database instance
+_database: Optional[Database] = None
+
+def get_database() -> Database:
+    """Get or create the global database"""
+    global _database
+    if _database is None:
+        _database = Database()
+    return _database
@@ -0,0 +1,90 @@
+"""
+Shared HTTP clients for LLM provider endpoints.
+Keeps one keep-alive connection pool per (provider, base URL) so agent steps
+reuse TCP/TLS connections instead of opening new ones for every call.
+"""
+import asyncio
+import importlib.util
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20"))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "30"))
+LLM_HTTP_CONNECT_TIMEOUT = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "5"))
+LLM_HTTP_READ_TIMEOUT = float(os.getenv("LLM_HTTP_READ_TIMEOUT", "60"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "false").lower() in ("1", "true", "yes")
+
+class HTTPClientPool:
+    """Process-wide httpx clients keyed by provider and base URL"""
+    
+    def __init__(
+        self,
+        max_connections: int = LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive: int = LLM_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry: float = LLM_HTTP_KEEPALIVE_EXPIRY,
+        connect_timeout: float = LLM_HTTP_CONNECT_TIMEOUT,
+        read_timeout: float = LLM_HTTP_READ_TIMEOUT,
+        http2: bool = LLM_HTTP2
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.http2 = http2 and _h2_available()
+        self._clients: Dict[Tuple[str, str], httpx.AsyncClient] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def get(self, provider: str, base_url: str) -> httpx.AsyncClient:
+        """Get the shared client for an endpoint, creating it on first use"""
+        self._check_loop()
+        key = (provider, base_url.rstrip("/"))
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2,
+            )
+            self._clients[key] = client
+        return client
+    
+    async def close(self):
+        """Close every pooled client"""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+    
+    def _check_loop(self):
+        """Connections can't cross event loops, so start over on a new loop"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._loop is not loop:
+            self._clients.clear()
+            self._loop = loop
+
+def _h2_available() -> bool:
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("LLM_HTTP2 is enabled but the 'h2' package is not installed; using HTTP/1.1")
+        return False
+    return True
+
+# Global client pool
+_client_pool: Optional[HTTPClientPool] = None
+
+def get_client_pool() -> HTTPClientPool:
+    """Get or create the global HTTP client pool"""
+    global _client_pool
+    if _client_pool is None:
+        _client_pool = HTTPClientPool()
+    return _client_pool
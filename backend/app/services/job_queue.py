@@ -0,0 +1,293 @@
+"""
+Durable queue of workflow executions, stored in the application database.
+Workers claim jobs under a lease they renew with heartbeats; a job whose
+worker stops heartbeating is handed to another worker once the lease runs out.
+"""
+import json
+import math
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import and_, case, func, insert, or_, select, update
+
+from app.models import ExecutionJob
+from app.services.admission import EXECUTION_MAX_QUEUED, PRIORITIES, AdmissionRejected, Priority
+from app.services.database import Database, get_database, jobs_table
+from app.services.metrics import get_metrics
+
+# "inline" runs executions in the API process; "queue" leaves them to worker.py
+EXECUTION_MODE = os.getenv("EXECUTION_MODE", "inline")
+# Seconds a claimed job stays with its worker without a heartbeat
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# Claims of one job before it is failed rather than handed out again
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+class JobQueue:
+    """Enqueue, claim and settle execution jobs"""
+    
+    def __init__(
+        self,
+        database: Database,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        max_queued: int = EXECUTION_MAX_QUEUED
+    ):
+        self.database = database
+        self.max_attempts = max_attempts
+        self.max_queued = max_queued
+    
+    async def enqueue(
+        self,
+        workflow_id: str,
+        initial_input: str,
+        incremental: bool = False,
+        priority: Priority = "interactive",
+        bounded: bool = True
+    ) -> ExecutionJob:
+        """
+        Add a job; its ID doubles as the execution ID once it runs.
+        
+        Raises:
+            AdmissionRejected: If bounded and max_queued jobs are already waiting
+        """
+        await self.database.init()
+        job = ExecutionJob(
+            id=str(uuid.uuid4()),
+            workflowId=workflow_id,
+            status="queued",
+            initialInput=initial_input,
+            incremental=incremental,
+            priority=priority,
+            createdAt=datetime.now()
+        )
+        async with self.database.engine.begin() as conn:
+            if bounded and self.max_queued:
+                queued = (await conn.execute(
+                    select(func.count()).where(jobs_table.c.status == "queued")
+                )).scalar_one()
+                if queued >= self.max_queued:
+                    get_metrics().executions_rejected.inc()
+                    raise AdmissionRejected(await self._retry_after(conn, queued))
+            await conn.execute(insert(jobs_table).values(
+                id=job.id,
+                workflow_id=job.workflowId,
+                status=job.status,
+                initial_input=job.initialInput,
+                incremental=job.incremental,
+                priority=job.priority,
+                attempts=0,
+                created_at=job.createdAt,
+            ))
+        return job
+    
+    async def claim(self, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> Optional[ExecutionJob]:
+        """
+        Take the oldest job of the highest priority that is queued or whose
+        worker's lease ran out.
+        
+        Claiming is a single UPDATE, so two workers never get the same job.
+        Jobs abandoned max_attempts times are failed instead.
+        
+        Returns:
+            The claimed job, or None if there's nothing to run
+        """
+        await self.database.init()
+        table = jobs_table
+        now = datetime.now()
+        abandoned = and_(table.c.status == "running", table.c.lease_expires_at < now)
+        async with self.database.engine.begin() as conn:
+            await conn.execute(
+                update(table)
+                .where(abandoned, table.c.attempts >= self.max_attempts)
+                .values(
+                    status="error",
+                    worker_id=None,
+                    lease_expires_at=None,
+                    finished_at=now,
+                    error=f"Abandoned by its worker {self.max_attempts} times",
+                )
+            )
+            claimable = or_(table.c.status == "queued", abandoned)
+            oldest = (
+                select(table.c.id)
+                .where(claimable)
+                .order_by(
+                    case({priority: rank for rank, priority in enumerate(PRIORITIES)}, value=table.c.priority),
+                    table.c.created_at
+                )
+                .limit(1)
+                .scalar_subquery()
+            )
+            row = (await conn.execute(
+                update(table)
+                .where(table.c.id == oldest, claimable)
+                .values(
+                    status="running",
+                    worker_id=worker_id,
+                    lease_expires_at=now + timedelta(seconds=lease_seconds),
+                    attempts=table.c.attempts + 1,
+                    started_at=now,
+                )
+                .returning(*table.c)
+            )).first()
+        return _to_job(row) if row is not None else None
+    
+    async def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+        """
+        Extend a claimed job's lease.
+        
+        Returns:
+            False if the worker no longer holds the job, in which case it
+            should stop running it
+        """
+        return await self._update_owned(
+            job_id, worker_id, {"lease_expires_at": datetime.now() + timedelta(seconds=lease_seconds)}
+        )
+    
+    async def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        """Record a finished execution; its status follows the result's"""
+        return await self._update_owned(job_id, worker_id, {
+            "status": "completed" if result.get("status") == "completed" else "error",
+            "lease_expires_at": None,
+            "finished_at": datetime.now(),
+            "result": json.dumps(result, default=str),
+            "error": result.get("error"),
+        })
+    
+    async def release(self, job_id: str, worker_id: str) -> bool:
+        """Put a claimed job back in the queue, e.g. when its worker shuts down"""
+        return await self._update_owned(job_id, worker_id, {
+            "status": "queued",
+            "worker_id": None,
+            "lease_expires_at": None,
+            "attempts": jobs_table.c.attempts - 1,
+        })
+    
+    async def cancel(self, job_id: str) -> bool:
+        """
+        Fail a queued or running job so no worker picks it up. The worker
+        running it finds out at its next heartbeat and stops the execution.
+        
+        Returns:
+            False if the job had already finished or doesn't exist
+        """
+        await self.database.init()
+        table = jobs_table
+        async with self.database.engine.begin() as conn:
+            updated = await conn.execute(
+                update(table)
+                .where(table.c.id == job_id, table.c.status.in_(("queued", "running")))
+                .values(
+                    status="error",
+                    worker_id=None,
+                    lease_expires_at=None,
+                    finished_at=datetime.now(),
+                    error="Cancelled",
+                )
+            )
+        return updated.rowcount == 1
+    
+    async def get(self, job_id: str) -> Optional[ExecutionJob]:
+        await self.database.init()
+        async with self.database.engine.connect() as conn:
+            row = (await conn.execute(select(jobs_table).where(jobs_table.c.id == job_id))).first()
+        return _to_job(row) if row is not None else None
+    
+    async def list(
+        self,
+        workflow_id: Optional[str] = None,
+        status: Optional[str] = None,
+        limit: int = 100
+    ) -> List[ExecutionJob]:
+        """Most recent jobs first"""
+        await self.database.init()
+        query = select(jobs_table).order_by(jobs_table.c.created_at.desc()).limit(limit)
+        if workflow_id is not None:
+            query = query.where(jobs_table.c.workflow_id == workflow_id)
+        if status is not None:
+            query = query.where(jobs_table.c.status == status)
+        async with self.database.engine.connect() as conn:
+            rows = (await conn.execute(query)).all()
+        return [_to_job(row) for row in rows]
+    
+    async def counts(self) -> Dict[str, int]:
+        """Jobs by status"""
+        await self.database.init()
+        query = select(jobs_table.c.status, func.count()).group_by(jobs_table.c.status)
+        async with self.database.engine.connect() as conn:
+            rows = (await conn.execute(query)).all()
+        return {status: count for status, count in rows}
+    
+    async def blob_references(self) -> Set[str]:
+        """Digests of the blobs that stored job results refer to, so they aren't evicted"""
+        await self.database.init()
+        query = select(jobs_table.c.result).where(jobs_table.c.result.like('%"blob"%'))
+        async with self.database.engine.connect() as conn:
+            rows = (await conn.execute(query)).scalars().all()
+        digests = set()
+        for row in rows:
+            result = json.loads(row)
+            outputs = list((result.get("results") or {}).values()) + [result.get("final_output")]
+            digests.update(output["blob"] for output in outputs if isinstance(output, dict) and "blob" in output)
+        return digests
+    
+    async def _retry_after(self, conn, queued: int) -> int:
+        """Seconds until the workers have likely worked through the queued jobs"""
+        table = jobs_table
+        running = (await conn.execute(
+            select(func.count()).where(table.c.status == "running")
+        )).scalar_one()
+        recent = (await conn.execute(
+            select(table.c.started_at, table.c.finished_at)
+            .where(table.c.status == "completed", table.c.started_at.is_not(None))
+            .order_by(table.c.finished_at.desc())
+            .limit(20)
+        )).all()
+        durations = [(finished - started).total_seconds() for started, finished in recent]
+        average = sum(durations) / len(durations) if durations else 1.0
+        return max(1, math.ceil((queued + 1) / max(1, running) * average))
+    
+    async def _update_owned(self, job_id: str, worker_id: str, values: Dict[str, Any]) -> bool:
+        """Update a job only while worker_id still holds it"""
+        await self.database.init()
+        table = jobs_table
+        async with self.database.engine.begin() as conn:
+            updated = await conn.execute(
+                update(table)
+                .where(
+                    table.c.id == job_id,
+                    table.c.worker_id == worker_id,
+                    table.c.status == "running",
+                )
+                .values(values)
+            )
+        return updated.rowcount == 1
+
+def _to_job(row) -> ExecutionJob:
+    return ExecutionJob(
+        id=row.id,
+        workflowId=row.workflow_id,
+        status=row.status,
+        initialInput=row.initial_input,
+        incremental=row.incremental,
+        priority=row.priority,
+        attempts=row.attempts,
+        workerId=row.worker_id,
+        leaseExpiresAt=row.lease_expires_at,
+        createdAt=row.created_at,
+        startedAt=row.started_at,
+        finishedAt=row.finished_at,
+        result=json.loads(row.result) if row.result else None,
+        error=row.error
+    )
+
+# Global job queue
+_job_queue: Optional[JobQueue] = None
+
+def get_job_queue() -> JobQueue:
+    """Get or create the global job queue"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(get_database())
+    return _job_queue
@@ -0,0 +1,179 @@
+"""
+Runs queued workflow executions outside the API process.
+A worker renews the lease on each job it runs and hands its jobs back to
+the queue when it shuts down; a worker that dies simply lets its leases lapse.
+
+Execution logs, traces and metrics stay in the worker process; the API only
+sees a queued run's job status and, once it finishes, its result.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.models import Agent, ExecutionJob, Workflow
+from app.services.admission import Priority
+from app.services.job_queue import JOB_LEASE_SECONDS, JobQueue, get_job_queue
+from app.services.repository import Repository, get_agent_repository, get_workflow_repository
+from app.services.workflow_executor import WorkflowExecutor, get_workflow_executor
+
+logger = logging.getLogger(__name__)
+
+# Jobs one worker process runs at once
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "2"))
+# Seconds between claim attempts while the queue is empty
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "1"))
+
+async def execute_and_record(
+    executor: WorkflowExecutor,
+    workflow: Workflow,
+    agents: Dict[str, Agent],
+    initial_input: str,
+    incremental: bool,
+    repository: Repository[Workflow],
+    execution_id: Optional[str] = None,
+    priority: Priority = "interactive"
+) -> Dict[str, Any]:
+    """Execute a workflow and save the status it ended in"""
+    result = await executor.execute_workflow(
+        workflow=workflow,
+        agents=agents,
+        initial_input=initial_input,
+        incremental=incremental,
+        execution_id=execution_id,
+        priority=priority
+    )
+    
+    # Update workflow status based on result
+    if result["status"] == "completed":
+        workflow.status = 'completed'
+    else:
+        workflow.status = 'error'
+    workflow.updatedAt = datetime.now()
+    await repository.save(workflow)
+    return result
+
+class JobWorker:
+    """Claim jobs from the queue and execute them, up to concurrency at a time"""
+    
+    def __init__(
+        self,
+        queue: Optional[JobQueue] = None,
+        executor: Optional[WorkflowExecutor] = None,
+        worker_id: Optional[str] = None,
+        concurrency: int = WORKER_CONCURRENCY,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+        poll_interval: float = WORKER_POLL_SECONDS,
+        workflows: Optional[Repository[Workflow]] = None,
+        agents: Optional[Repository[Agent]] = None
+    ):
+        self.queue = queue or get_job_queue()
+        self.executor = executor or get_workflow_executor()
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.workflows = workflows or get_workflow_repository()
+        self.agents = agents or get_agent_repository()
+        self.finished = 0
+        self._running: Dict[str, asyncio.Task] = {}
+        self._stopping = asyncio.Event()
+    
+    async def run(self):
+        """Run jobs until stop() is called, then wait for the running ones to hand back"""
+        slots = asyncio.Semaphore(self.concurrency)
+        logger.info("Worker %s started (concurrency %d)", self.worker_id, self.concurrency)
+        try:
+            while not self._stopping.is_set():
+                await slots.acquire()
+                if self._stopping.is_set():
+                    slots.release()
+                    break
+                try:
+                    job = await self.queue.claim(self.worker_id, self.lease_seconds)
+                except Exception:
+                    logger.exception("Claiming a job failed")
+                    job = None
+                if job is None:
+                    slots.release()
+                    await self._idle()
+                    continue
+                
+                task = asyncio.create_task(self._run_job(job))
+                self._running[job.id] = task
+                
+                def done(_, job_id=job.id):
+                    self._running.pop(job_id, None)
+                    slots.release()
+                
+                task.add_done_callback(done)
+        finally:
+            await asyncio.gather(*self._running.values(), return_exceptions=True)
+            logger.info("Worker %s stopped after %d jobs", self.worker_id, self.finished)
+    
+    def stop(self):
+        """Stop claiming jobs and hand the running ones back to the queue"""
+        self._stopping.set()
+        for task in self._running.values():
+            task.cancel()
+    
+    async def _idle(self):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+    
+    async def _run_job(self, job: ExecutionJob):
+        logger.info("Worker %s running job %s (attempt %d)", self.worker_id, job.id, job.attempts)
+        heartbeat = asyncio.create_task(self._heartbeat(job, asyncio.current_task()))
+        try:
+            result = await self._execute(job)
+        except asyncio.CancelledError:
+            if self._stopping.is_set():
+                await self.queue.release(job.id, self.worker_id)
+                logger.info("Returned job %s to the queue", job.id)
+            raise
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            result = {"execution_id": job.id, "status": "error", "error": str(e)}
+        finally:
+            heartbeat.cancel()
+        
+        self.finished += 1
+        if not await self.queue.complete(job.id, self.worker_id, result):
+            logger.warning("Job %s finished after its lease was lost; result dropped", job.id)
+    
+    async def _execute(self, job: ExecutionJob) -> Dict[str, Any]:
+        workflow = await self.workflows.get(job.workflowId)
+        if workflow is None:
+            return {"execution_id": job.id, "status": "error", "error": "Workflow not found"}
+        
+        agent_ids = [node.data.agentId for node in workflow.nodes if node.data.agentId]
+        agents = await self.agents.get_many(agent_ids)
+        return await execute_and_record(
+            self.executor,
+            workflow,
+            agents,
+            job.initialInput,
+            job.incremental,
+            self.workflows,
+            execution_id=job.id,
+            priority=job.priority
+        )
+    
+    async def _heartbeat(self, job: ExecutionJob, task: asyncio.Task):
+        """Renew the job's lease; stop the job if another worker has taken it over"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                held = await self.queue.heartbeat(job.id, self.worker_id, self.lease_seconds)
+            except Exception:
+                logger.exception("Heartbeat for job %s failed", job.id)
+                continue
+            if not held:
+                logger.warning("Lost the lease on job %s; stopping it", job.id)
+                task.cancel()
+                return
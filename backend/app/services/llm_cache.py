@@ -0,0 +1,179 @@
+"""
+Content-addressed cache for LLM responses.
+Identical requests (provider, endpoint, credentials, model, prompts and
+sampling settings) are answered from an in-memory LRU tier backed by a size-bounded disk tier.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", "./.llm_cache")
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+LLM_CACHE_DISK_MAX_MB = float(os.getenv("LLM_CACHE_DISK_MAX_MB", "512"))
+# Seconds before an entry expires; 0 keeps entries until evicted
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+
+class LLMCache:
+    """Two-tier LLM response cache with TTLs and hit/miss counters"""
+    
+    def __init__(
+        self,
+        cache_dir: Optional[str] = LLM_CACHE_DIR,
+        memory_entries: int = LLM_CACHE_MEMORY_ENTRIES,
+        disk_max_bytes: int = int(LLM_CACHE_DISK_MAX_MB * 1024 * 1024),
+        ttl: float = LLM_CACHE_TTL_SECONDS
+    ):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.memory_entries = memory_entries
+        self.disk_max_bytes = disk_max_bytes
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._disk_sizes: Optional[Dict[str, int]] = None
+        self._disk_lock = asyncio.Lock()
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+    
+    @staticmethod
+    def make_key(
+        provider: str,
+        base_url: str,
+        model: str,
+        system_prompt: Optional[str],
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        api_key: Optional[str] = None
+    ) -> str:
+        """Hash a normalized request into a cache key
+        
+        Only a digest of the API key goes into the key, so requests made
+        with different credentials never share a response.
+        """
+        request = {
+            "provider": provider,
+            "base_url": base_url.rstrip("/"),
+            "model": model,
+            "system_prompt": system_prompt or "",
+            "prompt": prompt,
+            "temperature": round(float(temperature), 4),
+            "max_tokens": int(max_tokens),
+            "api_key": hashlib.sha256(api_key.encode("utf-8")).hexdigest() if api_key else "",
+        }
+        encoded = json.dumps(request, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+    
+    async def get(self, key: str) -> Optional[str]:
+        """Look up a response, checking memory before disk"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            if not self._expired(entry[0]):
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry[1]
+            del self._memory[key]
+        
+        if self.cache_dir is not None:
+            entry = await asyncio.to_thread(self._read_disk, key)
+            if entry is not None and not self._expired(entry[0]):
+                self._remember(key, entry)
+                self.stats["disk_hits"] += 1
+                return entry[1]
+        
+        self.stats["misses"] += 1
+        return None
+    
+    async def set(self, key: str, response: str):
+        """Store a response in both tiers"""
+        entry = (time.time(), response)
+        self._remember(key, entry)
+        self.stats["stores"] += 1
+        if self.cache_dir is not None:
+            async with self._disk_lock:
+                await asyncio.to_thread(self._write_disk, key, entry)
+    
+    def _remember(self, key: str, entry: Tuple[float, str]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+    
+    def _expired(self, created: float) -> bool:
+        return self.ttl > 0 and time.time() - created > self.ttl
+    
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+    
+    def _read_disk(self, key: str) -> Optional[Tuple[float, str]]:
+        path = self._path(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            # Touch on read so disk eviction is least-recently-used
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return data["created"], data["response"]
+    
+    def _write_disk(self, key: str, entry: Tuple[float, str]):
+        sizes = self._load_disk_sizes()
+        path = self._path(key)
+        payload = json.dumps({"created": entry[0], "response": entry[1]}).encode("utf-8")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Unique so another process writing the same key can't interleave
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, path)
+        sizes[key] = len(payload)
+        self._evict_disk(sizes)
+    
+    def _load_disk_sizes(self) -> Dict[str, int]:
+        """Scan the cache directory once to learn what's already stored"""
+        if self._disk_sizes is None:
+            self._disk_sizes = {}
+            if self.cache_dir.exists():
+                for path in self.cache_dir.glob("*/*.json"):
+                    self._disk_sizes[path.stem] = path.stat().st_size
+        return self._disk_sizes
+    
+    def _evict_disk(self, sizes: Dict[str, int]):
+        total = sum(sizes.values())
+        if total <= self.disk_max_bytes:
+            return
+        # Evict down to 90% so the directory isn't rescanned on every write
+        target = self.disk_max_bytes * 0.9
+        by_age = []
+        for key in sizes:
+            try:
+                by_age.append((self._path(key).stat().st_mtime, key))
+            except OSError:
+                by_age.append((0.0, key))
+        by_age.sort()
+        for _, key in by_age:
+            if total <= target:
+                break
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+            total -= sizes.pop(key)
+            self.stats["evictions"] += 1
+
+# Global cache instance
+_llm_cache: Optional[LLMCache] = None
+
+def get_llm_cache() -> LLMCache:
+    """Get or create the global LLM response cache"""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMCache()
+    return _llm_cache
@@ -0,0 +1,50 @@
+"""
+Typed errors raised by the LLM service.
+Callers can tell configuration mistakes, transport failures and provider
+error responses apart, and whether retrying might help.
+"""
+from typing import Optional
+
+# Statuses worth retrying: timeouts, conflicts, throttling and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+class LLMError(Exception):
+    """Base class for LLM provider failures"""
+    
+    retryable = False
+    
+    def __init__(self, provider: str, message: str):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+
+class LLMConfigurationError(LLMError):
+    """The provider can't be called with the given configuration"""
+
+class LLMConnectionError(LLMError):
+    """The request failed before a response was received"""
+    
+    retryable = True
+
+class LLMHTTPError(LLMError):
+    """The provider answered with an error status"""
+    
+    def __init__(
+        self,
+        provider: str,
+        status_code: int,
+        detail: str = "",
+        retry_after: Optional[float] = None
+    ):
+        message = f"returned status {status_code}"
+        if detail:
+            message = f"{message}: {detail}"
+        super().__init__(provider, message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.retryable = status_code in RETRYABLE_STATUS_CODES
+
+class LLMResponseError(LLMError):
+    """The provider's response couldn't be understood"""
+
+class LLMUnavailableError(LLMError):
+    """The endpoint's circuit breaker is open, so it wasn't called"""
@@ -2,17 +2,107 @@
 LLM service for communicating with different LLM providers.
 Supports Ollama (local), OpenAI, Anthropic, and custom providers.
 """
+import asyncio
 import httpx
+import json
+import logging
 import os
-from typing import Optional, Dict, Any, List
+import random
+import time
+from collections import deque
+from typing import Optional, Dict, Any, List, AsyncIterator, Awaitable, Callable, Deque, Iterator, Tuple, Union
 from app.models import LLMConfig
+from app.services.http_pool import get_client_pool
+from app.services.llm_cache import LLMCache
+from app.services.llm_errors import (
+    LLMConfigurationError,
+    LLMConnectionError,
+    LLMError,
+    LLMHTTPError,
+    LLMResponseError,
+    LLMUnavailableError,
+)
+from app.services.metrics import get_metrics
+from app.services.provider_health import get_provider_health
+from app.services.rate_limiter import get_rate_limiter_registry, retry_after_seconds
+from app.services.request_coalescer import get_request_coalescer
+from app.services.tokenizer import OLLAMA_NUM_CTX, get_tokenizer
+from app.services.tracing import Span, get_tracer
+
+logger = logging.getLogger(__name__)
+
+# Provider endpoints, unless an LLMConfig sets baseUrl (e.g. a local mock server)
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com")
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com")
+# How long Ollama keeps a model loaded after a request ("5m", "1h", seconds,
+# or -1 for indefinitely); empty leaves Ollama's own default
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "")
+# Loading a large model can take far longer than the usual read timeout
+OLLAMA_PRELOAD_TIMEOUT = float(os.getenv("OLLAMA_PRELOAD_TIMEOUT", "300"))
+# Share one in-flight generation between identical concurrent requests
+LLM_COALESCE_REQUESTS = os.getenv("LLM_COALESCE_REQUESTS", "true").lower() in ("1", "true", "yes")
+# Retries for transient failures, with full-jitter exponential backoff
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+# Send a backup request when the first one is slower than recent requests
+LLM_HEDGE_REQUESTS = os.getenv("LLM_HEDGE_REQUESTS", "false").lower() in ("1", "true", "yes")
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+
+# Marks a stream that ended before producing any text
+_END_OF_STREAM = object()
+
+class LatencyTracker:
+    """Recent latencies per endpoint, used to decide when to hedge"""
+    
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[Tuple[str, ...], Deque[float]] = {}
+    
+    def record(self, key: Tuple[str, ...], seconds: float):
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self.window)
+        samples.append(seconds)
+    
+    def quantile(self, key: Tuple[str, ...], q: float, min_samples: int) -> Optional[float]:
+        """Latency at quantile q, or None until enough samples are recorded"""
+        samples = self._samples.get(key)
+        if not samples or len(samples) < min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+_latency_tracker = LatencyTracker()
 
 class LLMService:
     """Service for interacting with various LLM providers"""
     
-    def __init__(self, config: LLMConfig):
+    def __init__(self, config: LLMConfig, cache: Optional[LLMCache] = None):
         self.config = config
-        self.client = httpx.AsyncClient(timeout=60.0)
+        # Responses are cached only when a cache is supplied
+        self.cache = cache
+        # Shared keep-alive client for this provider endpoint
+        self.client = get_client_pool().get(config.provider, self.base_url)
+        self.limiter = get_rate_limiter_registry().get(
+            config.provider, self.base_url, config.modelName
+        )
+        self.tokenizer = get_tokenizer(config.provider, config.modelName)
+        # Health and circuit breaker of the endpoint
+        self.endpoint = get_provider_health().get(config.provider, self.base_url)
+    
+    @property
+    def base_url(self) -> str:
+        """Base URL of the configured provider endpoint"""
+        if self.config.provider == "ollama":
+            return self.config.baseUrl or OLLAMA_BASE_URL
+        elif self.config.provider == "openai":
+            return self.config.baseUrl or OPENAI_BASE_URL
+        elif self.config.provider == "anthropic":
+            return self.config.baseUrl or ANTHROPIC_BASE_URL
+        return self.config.baseUrl or ""
     
     async def generate(
         self, 
@@ -29,21 +119,98 @@ class LLMService:
             system_prompt: Optional system prompt
             temperature: Temperature for generation (overrides config)
             max_tokens: Max tokens to generate (overrides config)
-            
+        
         Returns:
             Generated text
+        
+        Raises:
+            LLMError: If the provider can't be reached or returns an error,
+                after retrying transient failures and trying each fallback
         """
+        for service, is_last in self._failover_chain():
+            try:
+                return await service._generate(prompt, system_prompt, temperature, max_tokens)
+            except LLMError as e:
+                if is_last or not service._should_fail_over(e):
+                    raise
+    
+    async def _generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: Optional[float],
+        max_tokens: Optional[int]
+    ) -> str:
+        """generate() against this service's own endpoint"""
         temp = temperature if temperature is not None else self.config.temperature
         tokens = max_tokens if max_tokens is not None else self.config.maxTokens
         
-        if self.config.provider == "ollama":
-            return await self._generate_ollama(prompt, system_prompt, temp, tokens)
-        elif self.config.provider == "openai":
-            return await self._generate_openai(prompt, system_prompt, temp, tokens)
-        elif self.config.provider == "anthropic":
-            return await self._generate_anthropic(prompt, system_prompt, temp, tokens)
-        else:
-            return await self._generate_custom(prompt, system_prompt, temp, tokens)
+        request_key = self._request_key(prompt, system_prompt, temp, tokens)
+        prompt_tokens = self._prompt_tokens(prompt, system_prompt)
+        with self._span("llm.generate", prompt_tokens) as span:
+            if self.cache is not None:
+                cached = await self.cache.get(request_key)
+                if cached is not None:
+                    span.set(cache_hit=True, completion_tokens=len(cached) // 4)
+                    return cached
+            
+            async def attempt() -> str:
+                self._check_circuit()
+                # Each attempt takes its own slot so backoff doesn't hold one
+                with get_tracer().span("llm.attempt"):
+                    async with self.limiter.slot(prompt_tokens + tokens):
+                        try:
+                            if self.config.provider == "ollama":
+                                response = await self._generate_ollama(prompt, system_prompt, temp, tokens)
+                            elif self.config.provider == "openai":
+                                response = await self._generate_openai(prompt, system_prompt, temp, tokens)
+                            elif self.config.provider == "anthropic":
+                                response = await self._generate_anthropic(prompt, system_prompt, temp, tokens)
+                            else:
+                                response = await self._generate_custom(prompt, system_prompt, temp, tokens)
+                        except LLMError as e:
+                            self.endpoint.record_failure(e)
+                            raise
+                        self.endpoint.record_success()
+                        return response
+            
+            async def run() -> str:
+                started = time.monotonic()
+                try:
+                    response = await self._with_retries(lambda: self._hedged(attempt))
+                except LLMError as e:
+                    self._record_error(e)
+                    raise
+                self._record_completion("generate", started, started, len(response))
+                if self.cache is not None:
+                    await self.cache.set(request_key, response)
+                return response
+            
+            if LLM_COALESCE_REQUESTS:
+                response = await get_request_coalescer().call(request_key, run)
+            else:
+                response = await run()
+            span.set(completion_tokens=len(response) // 4)
+            return response
+    
+    def _request_key(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int
+    ) -> str:
+        """Identify a request for caching and coalescing"""
+        return LLMCache.make_key(
+            self.config.provider,
+            self.base_url,
+            self.config.modelName,
+            system_prompt,
+            prompt,
+            temperature,
+            max_tokens,
+            self.config.apiKey
+        )
     
     async def _generate_ollama(
         self, 
@@ -53,8 +220,6 @@ class LLMService:
         max_tokens: int
     ) -> str:
         """Generate using Ollama"""
-        base_url = self.config.baseUrl or "http://localhost:11434"
-        
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
@@ -62,25 +227,18 @@ class LLMService:
         
         try:
             response = await self.client.post(
-                f"{base_url}/api/chat",
-                json={
-                    "model": self.config.modelName,
-                    "messages": messages,
-                    "options": {
-                        "temperature": temperature,
-                        "num_predict": max_tokens
-                    },
-                    "stream": False
-                }
+                f"{self.base_url}/api/chat",
+                json=self._ollama_chat_body(messages, temperature, max_tokens, stream=False)
             )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data.get("message", {}).get("content", "")
-            else:
-                return f"Error: Ollama returned status {response.status_code}"
-        except Exception as e:
-            return f"Error communicating with Ollama: {str(e)}"
+        except httpx.TransportError as e:
+            raise LLMConnectionError("Ollama", _describe(e)) from e
+        
+        await self._check_response(response, "Ollama")
+        try:
+            data = response.json()
+            return data.get("message", {}).get("content", "")
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise LLMResponseError("Ollama", f"unexpected response: {e!r}") from e
     
     async def _generate_openai(
         self, 
@@ -91,7 +249,7 @@ class LLMService:
     ) -> str:
         """Generate using OpenAI API"""
         if not self.config.apiKey:
-            return "Error: OpenAI API key not configured"
+            raise LLMConfigurationError("OpenAI", "API key not configured")
         
         messages = []
         if system_prompt:
@@ -100,7 +258,7 @@ class LLMService:
         
         try:
             response = await self.client.post(
-                "https://api.openai.com/v1/chat/completions",
+                f"{self.base_url}/v1/chat/completions",
                 headers={
                     "Authorization": f"Bearer {self.config.apiKey}",
                     "Content-Type": "application/json"
@@ -112,14 +270,15 @@ class LLMService:
                     "max_tokens": max_tokens
                 }
             )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data["choices"][0]["message"]["content"]
-            else:
-                return f"Error: OpenAI returned status {response.status_code}"
-        except Exception as e:
-            return f"Error communicating with OpenAI: {str(e)}"
+        except httpx.TransportError as e:
+            raise LLMConnectionError("OpenAI", _describe(e)) from e
+        
+        await self._check_response(response, "OpenAI")
+        try:
+            data = response.json()
+            return data["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise LLMResponseError("OpenAI", f"unexpected response: {e!r}") from e
     
     async def _generate_anthropic(
         self, 
@@ -130,11 +289,11 @@ class LLMService:
     ) -> str:
         """Generate using Anthropic API"""
         if not self.config.apiKey:
-            return "Error: Anthropic API key not configured"
+            raise LLMConfigurationError("Anthropic", "API key not configured")
         
         try:
             response = await self.client.post(
-                "https://api.anthropic.com/v1/messages",
+                f"{self.base_url}/v1/messages",
                 headers={
                     "x-api-key": self.config.apiKey,
                     "anthropic-version": "2023-06-01",
@@ -148,14 +307,15 @@ class LLMService:
                     "max_tokens": max_tokens
                 }
             )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data["content"][0]["text"]
-            else:
-                return f"Error: Anthropic returned status {response.status_code}"
-        except Exception as e:
-            return f"Error communicating with Anthropic: {str(e)}"
+        except httpx.TransportError as e:
+            raise LLMConnectionError("Anthropic", _describe(e)) from e
+        
+        await self._check_response(response, "Anthropic")
+        try:
+            data = response.json()
+            return data["content"][0]["text"]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise LLMResponseError("Anthropic", f"unexpected response: {e!r}") from e
     
     async def _generate_custom(
         self, 
@@ -166,7 +326,7 @@ class LLMService:
     ) -> str:
         """Generate using custom OpenAI-compatible API"""
         if not self.config.baseUrl:
-            return "Error: Custom API base URL not configured"
+            raise LLMConfigurationError("Custom API", "base URL not configured")
         
         messages = []
         if system_prompt:
@@ -188,18 +348,669 @@ class LLMService:
                     "max_tokens": max_tokens
                 }
             )
+        except httpx.TransportError as e:
+            raise LLMConnectionError("Custom API", _describe(e)) from e
+        
+        await self._check_response(response, "Custom API")
+        try:
+            data = response.json()
+            return data["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise LLMResponseError("Custom API", f"unexpected response: {e!r}") from e
+    
+    async def generate_stream(
+        self, 
+        prompt: str, 
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream generated text from the configured LLM provider.
+        
+        Takes the same arguments as generate() but yields text fragments
+        as the provider produces them instead of waiting for the full
+        completion. Failures raise LLMError; a stream is retried, or passed
+        to a fallback, only if it fails before producing any text.
+        """
+        for service, is_last in self._failover_chain():
+            started = False
+            try:
+                async for chunk in service._generate_stream(prompt, system_prompt, temperature, max_tokens):
+                    started = True
+                    yield chunk
+                return
+            except LLMError as e:
+                if started or is_last or not service._should_fail_over(e):
+                    raise
+    
+    async def _generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: Optional[float],
+        max_tokens: Optional[int]
+    ) -> AsyncIterator[str]:
+        """generate_stream() against this service's own endpoint"""
+        temp = temperature if temperature is not None else self.config.temperature
+        tokens = max_tokens if max_tokens is not None else self.config.maxTokens
+        
+        request_key = self._request_key(prompt, system_prompt, temp, tokens)
+        # Async generators may resume in another task's context, so spans
+        # here aren't made current and are passed down as parents instead
+        prompt_tokens = self._prompt_tokens(prompt, system_prompt)
+        with self._span("llm.stream", prompt_tokens, activate=False) as span:
+            if self.cache is not None:
+                cached = await self.cache.get(request_key)
+                if cached is not None:
+                    span.set(cache_hit=True, completion_tokens=len(cached) // 4)
+                    yield cached
+                    return
+            
+            async def attempt() -> AsyncIterator[str]:
+                if self.config.provider == "ollama":
+                    stream = self._stream_ollama(prompt, system_prompt, temp, tokens)
+                elif self.config.provider == "openai":
+                    stream = self._stream_openai(prompt, system_prompt, temp, tokens)
+                elif self.config.provider == "anthropic":
+                    stream = self._stream_anthropic(prompt, system_prompt, temp, tokens)
+                else:
+                    stream = self._stream_custom(prompt, system_prompt, temp, tokens)
+                
+                self._check_circuit()
+                with get_tracer().span("llm.attempt", parent=span, activate=False):
+                    async with self.limiter.slot(prompt_tokens + tokens):
+                        try:
+                            async for chunk in stream:
+                                yield chunk
+                        except LLMError as e:
+                            self.endpoint.record_failure(e)
+                            raise
+                        self.endpoint.record_success()
             
-            if response.status_code == 200:
-                data = response.json()
-                return data["choices"][0]["message"]["content"]
+            async def run() -> AsyncIterator[str]:
+                chunks: List[str] = []
+                started = time.monotonic()
+                first_token_at = None
+                chars = 0
+                try:
+                    async for chunk in self._with_retries_stream(lambda: self._hedged_stream(attempt), span):
+                        if first_token_at is None:
+                            first_token_at = time.monotonic()
+                        chars += len(chunk)
+                        if self.cache is not None:
+                            chunks.append(chunk)
+                        yield chunk
+                except LLMError as e:
+                    self._record_error(e)
+                    raise
+                self._record_completion("stream", started, first_token_at, chars)
+                
+                if self.cache is not None:
+                    await self.cache.set(request_key, "".join(chunks))
+            
+            if LLM_COALESCE_REQUESTS:
+                stream = get_request_coalescer().stream(request_key, run)
             else:
-                return f"Error: Custom API returned status {response.status_code}"
-        except Exception as e:
-            return f"Error communicating with custom API: {str(e)}"
+                stream = run()
+            started = time.monotonic()
+            chars = 0
+            async for chunk in stream:
+                if not chars:
+                    span.set(ttft_ms=round((time.monotonic() - started) * 1000, 1))
+                chars += len(chunk)
+                yield chunk
+            span.set(completion_tokens=chars // 4)
+    
+    async def _stream_ollama(
+        self, 
+        prompt: str, 
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int
+    ) -> AsyncIterator[str]:
+        """Stream from Ollama, which returns one JSON object per line"""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        try:
+            async with self.client.stream(
+                "POST",
+                f"{self.base_url}/api/chat",
+                json=self._ollama_chat_body(messages, temperature, max_tokens, stream=True)
+            ) as response:
+                await self._check_response(response, "Ollama")
+                
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    data = json.loads(line)
+                    if "error" in data:
+                        raise LLMResponseError("Ollama", str(data["error"]))
+                    content = data.get("message", {}).get("content", "")
+                    if content:
+                        yield content
+                    if data.get("done"):
+                        return
+        except httpx.TransportError as e:
+            raise LLMConnectionError("Ollama", _describe(e)) from e
+        except ValueError as e:
+            raise LLMResponseError("Ollama", f"malformed stream: {e!r}") from e
+    
+    async def _stream_openai(
+        self, 
+        prompt: str, 
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int
+    ) -> AsyncIterator[str]:
+        """Stream from the OpenAI API"""
+        if not self.config.apiKey:
+            raise LLMConfigurationError("OpenAI", "API key not configured")
+        
+        async for chunk in self._stream_chat_completions(
+            f"{self.base_url}/v1/chat/completions",
+            {"Authorization": f"Bearer {self.config.apiKey}"},
+            prompt,
+            system_prompt,
+            temperature,
+            max_tokens,
+            "OpenAI"
+        ):
+            yield chunk
+    
+    async def _stream_custom(
+        self, 
+        prompt: str, 
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int
+    ) -> AsyncIterator[str]:
+        """Stream from a custom OpenAI-compatible API"""
+        if not self.config.baseUrl:
+            raise LLMConfigurationError("Custom API", "base URL not configured")
+        
+        headers = {}
+        if self.config.apiKey:
+            headers["Authorization"] = f"Bearer {self.config.apiKey}"
+        
+        async for chunk in self._stream_chat_completions(
+            f"{self.config.baseUrl}/chat/completions",
+            headers,
+            prompt,
+            system_prompt,
+            temperature,
+            max_tokens,
+            "Custom API"
+        ):
+            yield chunk
+    
+    async def _stream_chat_completions(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        prompt: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        provider_name: str
+    ) -> AsyncIterator[str]:
+        """Stream an OpenAI-style chat completion delivered as SSE chunks"""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        try:
+            async with self.client.stream(
+                "POST",
+                url,
+                headers={**headers, "Content-Type": "application/json"},
+                json={
+                    "model": self.config.modelName,
+                    "messages": messages,
+                    "temperature": temperature,
+                    "max_tokens": max_tokens,
+                    "stream": True
+                }
+            ) as response:
+                await self._check_response(response, provider_name)
+                
+                async for event, data in _iter_sse(response):
+                    if data == "[DONE]":
+                        return
+                    payload = json.loads(data)
+                    for choice in payload.get("choices", []):
+                        content = (choice.get("delta") or {}).get("content")
+                        if content:
+                            yield content
+        except httpx.TransportError as e:
+            raise LLMConnectionError(provider_name, _describe(e)) from e
+        except ValueError as e:
+            raise LLMResponseError(provider_name, f"malformed stream: {e!r}") from e
+    
+    async def _stream_anthropic(
+        self, 
+        prompt: str, 
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int
+    ) -> AsyncIterator[str]:
+        """Stream from the Anthropic Messages API"""
+        if not self.config.apiKey:
+            raise LLMConfigurationError("Anthropic", "API key not configured")
+        
+        try:
+            async with self.client.stream(
+                "POST",
+                f"{self.base_url}/v1/messages",
+                headers={
+                    "x-api-key": self.config.apiKey,
+                    "anthropic-version": "2023-06-01",
+                    "Content-Type": "application/json"
+                },
+                json={
+                    "model": self.config.modelName,
+                    "messages": [{"role": "user", "content": prompt}],
+                    "system": system_prompt or "",
+                    "temperature": temperature,
+                    "max_tokens": max_tokens,
+                    "stream": True
+                }
+            ) as response:
+                await self._check_response(response, "Anthropic")
+                
+                async for event, data in _iter_sse(response):
+                    payload = json.loads(data)
+                    event_type = payload.get("type", event)
+                    if event_type == "content_block_delta":
+                        text = payload.get("delta", {}).get("text")
+                        if text:
+                            yield text
+                    elif event_type == "error":
+                        error = payload.get("error", {})
+                        message = error.get("message", "unknown error")
+                        if error.get("type") == "overloaded_error":
+                            raise LLMHTTPError("Anthropic", 529, message)
+                        raise LLMResponseError("Anthropic", message)
+                    elif event_type == "message_stop":
+                        return
+        except httpx.TransportError as e:
+            raise LLMConnectionError("Anthropic", _describe(e)) from e
+        except ValueError as e:
+            raise LLMResponseError("Anthropic", f"malformed stream: {e!r}") from e
+    
+    def _check_circuit(self):
+        """Refuse at once while the endpoint's circuit is open"""
+        if not self.endpoint.allow():
+            raise LLMUnavailableError(
+                self.config.provider,
+                f"{self.base_url} is failing; circuit open for another "
+                f"{self.endpoint.breaker.retry_in():.0f}s ({self.endpoint.error})"
+            )
+    
+    def _failover_chain(self) -> Iterator[Tuple["LLMService", bool]]:
+        """This service, then one per configured fallback, each with whether it's the last"""
+        fallbacks = self.config.fallbacks
+        yield self, not fallbacks
+        for index, fallback in enumerate(fallbacks):
+            same_provider = fallback.provider == self.config.provider
+            config = self.config.model_copy(update={
+                "provider": fallback.provider,
+                "modelName": fallback.modelName,
+                "baseUrl": fallback.baseUrl,
+                # Keys and sizes belong to the primary provider and model
+                "apiKey": self.config.apiKey if same_provider else None,
+                "contextWindow": None,
+                "fallbacks": [],
+            })
+            yield LLMService(config, cache=self.cache), index == len(fallbacks) - 1
+    
+    def _should_fail_over(self, error: LLMError) -> bool:
+        """Errors that say the endpoint is unavailable, rather than the request being wrong"""
+        if not (isinstance(error, LLMUnavailableError) or error.retryable):
+            return False
+        get_metrics().llm_failovers.inc(provider=self.config.provider, model=self.config.modelName)
+        logger.warning(
+            "%s model %s unavailable, trying fallback: %s",
+            self.config.provider, self.config.modelName, error
+        )
+        return True
+    
+    async def _with_retries(self, factory: Callable[[], Awaitable[str]]) -> str:
+        """Run factory(), retrying transient failures with backoff"""
+        retry = 0
+        while True:
+            try:
+                return await factory()
+            except LLMError as e:
+                delay = self._retry_delay(e, retry)
+                if delay is None:
+                    raise
+                error = _describe(e)
+            with get_tracer().span("llm.retry_backoff", retry=retry + 1, delay_seconds=delay, error=error):
+                await asyncio.sleep(delay)
+            retry += 1
+    
+    async def _with_retries_stream(
+        self,
+        factory: Callable[[], AsyncIterator[str]],
+        span: Optional[Span] = None
+    ) -> AsyncIterator[str]:
+        """Stream from factory(), retrying failures that happen before the first chunk"""
+        retry = 0
+        while True:
+            started = False
+            try:
+                async for chunk in factory():
+                    started = True
+                    yield chunk
+                return
+            except LLMError as e:
+                # Text already passed downstream can't be taken back
+                delay = None if started else self._retry_delay(e, retry)
+                if delay is None:
+                    raise
+                error = _describe(e)
+            with get_tracer().span(
+                "llm.retry_backoff",
+                parent=span,
+                activate=False,
+                retry=retry + 1,
+                delay_seconds=delay,
+                error=error
+            ):
+                await asyncio.sleep(delay)
+            retry += 1
+    
+    def _retry_delay(self, error: LLMError, retry: int) -> Optional[float]:
+        """Seconds to wait before retrying, or None if the error is final"""
+        if not error.retryable or retry >= LLM_MAX_RETRIES:
+            return None
+        delay = random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * 2 ** retry))
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, LLM_RETRY_MAX_DELAY))
+        logger.info(
+            "Retrying %s in %.2fs (%d/%d): %s",
+            self.config.provider, delay, retry + 1, LLM_MAX_RETRIES, error
+        )
+        return delay
+    
+    def _hedge_delay(self, kind: str) -> Optional[float]:
+        """How long to wait before sending a backup request, if hedging applies"""
+        if not LLM_HEDGE_REQUESTS:
+            return None
+        return _latency_tracker.quantile(
+            self._latency_key(kind), LLM_HEDGE_QUANTILE, LLM_HEDGE_MIN_SAMPLES
+        )
+    
+    def _latency_key(self, kind: str) -> Tuple[str, ...]:
+        return (self.config.provider, self.base_url.rstrip("/"), self.config.modelName, kind)
+    
+    async def _hedged(self, factory: Callable[[], Awaitable[str]]) -> str:
+        """
+        Run factory(), starting a second copy if the first is slower than the
+        recent tail latency. The first successful result wins.
+        """
+        delay = self._hedge_delay("generate")
+        started = time.monotonic()
+        if delay is None:
+            result = await factory()
+            _latency_tracker.record(self._latency_key("generate"), time.monotonic() - started)
+            return result
+        
+        tasks = [asyncio.create_task(factory())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                tasks.append(asyncio.create_task(factory()))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        _latency_tracker.record(self._latency_key("generate"), time.monotonic() - started)
+                        return task.result()
+            # Every copy failed; report the original request's error
+            return tasks[0].result()
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def _hedged_stream(self, factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Stream from factory(), starting a second copy if the first chunk takes
+        longer than the recent tail time-to-first-token. The copy that produces
+        text first is streamed and the other is cancelled.
+        """
+        delay = self._hedge_delay("stream")
+        started = time.monotonic()
+        if delay is None:
+            first = True
+            async for chunk in factory():
+                if first:
+                    first = False
+                    _latency_tracker.record(self._latency_key("stream"), time.monotonic() - started)
+                yield chunk
+            return
+        
+        streams: Dict[asyncio.Task, AsyncIterator[str]] = {}
+        
+        def start():
+            stream = factory()
+            streams[asyncio.create_task(_first_chunk(stream))] = stream
+        
+        start()
+        winner: Optional[asyncio.Task] = None
+        try:
+            done, _ = await asyncio.wait(list(streams), timeout=delay)
+            if not done:
+                start()
+            pending = set(streams)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+            if winner is None:
+                # Every copy failed; report the original request's error
+                next(iter(streams)).result()
+        finally:
+            for task, stream in streams.items():
+                if task is not winner:
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    await stream.aclose()
+        
+        _latency_tracker.record(self._latency_key("stream"), time.monotonic() - started)
+        stream = streams[winner]
+        try:
+            chunk = winner.result()
+            if chunk is _END_OF_STREAM:
+                return
+            yield chunk
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+    
+    def _prompt_tokens(self, prompt: str, system_prompt: Optional[str]) -> int:
+        """Request size in the model's tokens, for token-per-minute limits and traces"""
+        return self.tokenizer.count(prompt) + self.tokenizer.count(system_prompt or "")
+    
+    def _ollama_chat_body(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        stream: bool
+    ) -> Dict[str, Any]:
+        body = {
+            "model": self.config.modelName,
+            "messages": messages,
+            "options": {"temperature": temperature, "num_predict": max_tokens, **self._ollama_load_options()},
+            "stream": stream
+        }
+        keep_alive = ollama_duration(self.config.keepAlive or OLLAMA_KEEP_ALIVE)
+        if keep_alive is not None:
+            body["keep_alive"] = keep_alive
+        return body
+    
+    def _ollama_load_options(self) -> Dict[str, Any]:
+        """Options that decide how a model is loaded; a request that changes them reloads it"""
+        # Without num_ctx Ollama silently cuts prompts to its default window
+        num_ctx = self.config.contextWindow or OLLAMA_NUM_CTX
+        return {"num_ctx": num_ctx} if num_ctx else {}
+    
+    async def preload(self, keep_alive: Optional[Union[int, str]] = None) -> float:
+        """
+        Load the configured Ollama model into memory without generating.
+        
+        Args:
+            keep_alive: How long to keep it loaded (defaults to the config's
+                keepAlive, then OLLAMA_KEEP_ALIVE)
+        
+        Returns:
+            Seconds the request took, which is the load time if the model
+            wasn't already loaded
+        
+        Raises:
+            LLMError: If Ollama can't be reached or fails to load the model
+        """
+        if self.config.provider != "ollama":
+            raise LLMConfigurationError(self.config.provider, "only Ollama models can be preloaded")
+        body: Dict[str, Any] = {"model": self.config.modelName}
+        keep_alive = ollama_duration(keep_alive if keep_alive is not None else self.config.keepAlive or OLLAMA_KEEP_ALIVE)
+        if keep_alive is not None:
+            body["keep_alive"] = keep_alive
+        load_options = self._ollama_load_options()
+        if load_options:
+            body["options"] = load_options
+        
+        started = time.monotonic()
+        try:
+            # A generate request without a prompt only loads the model
+            response = await self.client.post(
+                f"{self.base_url}/api/generate", json=body, timeout=OLLAMA_PRELOAD_TIMEOUT
+            )
+        except httpx.TransportError as e:
+            raise LLMConnectionError("Ollama", _describe(e)) from e
+        await self._check_response(response, "Ollama")
+        return time.monotonic() - started
+    
+    async def loaded_models(self) -> List[str]:
+        """Names of the models Ollama currently holds in memory"""
+        try:
+            response = await self.client.get(f"{self.base_url}/api/ps")
+        except httpx.TransportError as e:
+            raise LLMConnectionError("Ollama", _describe(e)) from e
+        await self._check_response(response, "Ollama")
+        try:
+            return [model["name"] for model in response.json().get("models", [])]
+        except (ValueError, KeyError, TypeError) as e:
+            raise LLMResponseError("Ollama", f"unexpected response: {e!r}") from e
+    
+    def _span(self, name: str, prompt_tokens: int, activate: bool = True):
+        """Trace span for one LLM call, labelled with the model and prompt size"""
+        return get_tracer().span(
+            name,
+            activate=activate,
+            provider=self.config.provider,
+            model=self.config.modelName,
+            prompt_tokens=prompt_tokens,
+        )
+    
+    def _record_completion(
+        self,
+        mode: str,
+        started: float,
+        first_token_at: Optional[float],
+        chars: int
+    ):
+        """Export latency, time-to-first-token and generation speed"""
+        metrics = get_metrics()
+        labels = {"provider": self.config.provider, "model": self.config.modelName}
+        finished = time.monotonic()
+        metrics.llm_request_seconds.observe(finished - started, mode=mode, **labels)
+        if first_token_at is None:
+            return
+        if mode == "stream":
+            metrics.llm_ttft_seconds.observe(first_token_at - started, **labels)
+        # Rate over the generation itself, after the first token for streams
+        generating = finished - first_token_at
+        if chars and generating > 0:
+            metrics.llm_tokens_per_second.observe(chars / 4 / generating, **labels)
+    
+    def _record_error(self, error: LLMError):
+        get_metrics().llm_errors.inc(
+            provider=self.config.provider,
+            model=self.config.modelName,
+            error=type(error).__name__
+        )
+    
+    async def _check_response(self, response: httpx.Response, provider_name: str):
+        """Report the response to the rate limiter and raise on error statuses"""
+        self.limiter.observe(response)
+        get_metrics().llm_responses.inc(
+            provider=self.config.provider, status=str(response.status_code)
+        )
+        if response.status_code != 200:
+            await response.aread()
+            raise LLMHTTPError(
+                provider_name,
+                response.status_code,
+                response.text[:200],
+                retry_after_seconds(response)
+            )
     
     async def close(self):
-        """Close the HTTP client"""
-        await self.client.aclose()
+        """Release the service; the pooled HTTP client stays open for reuse"""
+        # Coalesced requests started by this service may still be using the client
+        return None
+
+def ollama_duration(value: Optional[Union[int, str]]) -> Optional[Union[int, str]]:
+    """
+    A keep_alive value as Ollama expects it: bare numbers are seconds and
+    must be sent as JSON numbers, since Ollama parses strings as durations.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    return value
+
+def _describe(error: Exception) -> str:
+    return str(error) or type(error).__name__
+
+async def _first_chunk(stream: AsyncIterator[str]) -> Any:
+    """The first chunk of a stream, or _END_OF_STREAM if it produced nothing"""
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return _END_OF_STREAM
+
+async def _iter_sse(response: httpx.Response) -> AsyncIterator[Tuple[Optional[str], str]]:
+    """Yield (event, data) pairs from a Server-Sent Events response"""
+    event = None
+    data_lines: List[str] = []
+    async for line in response.aiter_lines():
+        if not line:
+            if data_lines:
+                yield event, "\n".join(data_lines)
+            event = None
+            data_lines = []
+        elif line.startswith(":"):
+            continue
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[5:].lstrip())
+    if data_lines:
+        yield event, "\n".join(data_lines)
 
 def create_llm_service(config: LLMConfig) -> LLMService:
     """Factory function to create an LLM service"""
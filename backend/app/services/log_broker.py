@@ -0,0 +1,122 @@
+"""
+Publish/subscribe fan-out for execution logs.
+Feeds the Server-Sent Events stream so clients receive new log entries
+as they happen instead of re-polling the whole log list.
+"""
+import asyncio
+import itertools
+import os
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from app.models import ExecutionLog
+
+# Events kept per workflow for Last-Event-ID resume
+LOG_STREAM_BUFFER_SIZE = int(os.getenv("LOG_STREAM_BUFFER_SIZE", "1000"))
+# Events queued per subscriber before the oldest are dropped
+LOG_STREAM_QUEUE_SIZE = int(os.getenv("LOG_STREAM_QUEUE_SIZE", "500"))
+# Workflows whose replay buffers are kept once nobody is subscribed
+LOG_STREAM_MAX_WORKFLOWS = int(os.getenv("LOG_STREAM_MAX_WORKFLOWS", "256"))
+
+class LogSubscription:
+    """A single subscriber's bounded event queue"""
+    
+    def __init__(self, workflow_id: str, maxsize: int):
+        self.workflow_id = workflow_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+    
+    def put(self, event: Tuple[int, ExecutionLog]):
+        """Enqueue an event, dropping the oldest one if the queue is full"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+    
+    async def get(self) -> Tuple[int, ExecutionLog]:
+        """Wait for the next event"""
+        return await self.queue.get()
+
+class LogBroker:
+    """Fan execution logs out to per-workflow subscribers"""
+    
+    def __init__(
+        self,
+        buffer_size: int = LOG_STREAM_BUFFER_SIZE,
+        queue_size: int = LOG_STREAM_QUEUE_SIZE,
+        max_workflows: int = LOG_STREAM_MAX_WORKFLOWS
+    ):
+        self.buffer_size = buffer_size
+        self.queue_size = queue_size
+        self.max_workflows = max_workflows
+        self._event_ids = itertools.count(1)
+        self._buffers: "OrderedDict[str, Deque[Tuple[int, ExecutionLog]]]" = OrderedDict()
+        self._subscribers: Dict[str, Set[LogSubscription]] = {}
+    
+    def publish(self, log: ExecutionLog) -> int:
+        """
+        Record a log entry and deliver it to the workflow's subscribers.
+        
+        Returns:
+            The event ID assigned to the entry
+        """
+        event_id = next(self._event_ids)
+        event = (event_id, log)
+        
+        buffer = self._buffers.get(log.workflowId)
+        if buffer is None:
+            buffer = deque(maxlen=self.buffer_size)
+            self._buffers[log.workflowId] = buffer
+            self._evict_buffers()
+        else:
+            self._buffers.move_to_end(log.workflowId)
+        buffer.append(event)
+        
+        for subscription in self._subscribers.get(log.workflowId, ()):
+            subscription.put(event)
+        
+        return event_id
+    
+    def subscribe(self, workflow_id: str, last_event_id: Optional[int] = None) -> LogSubscription:
+        """
+        Subscribe to a workflow's logs.
+        
+        Args:
+            workflow_id: Workflow to follow
+            last_event_id: Last event the client saw; buffered events after
+                it are replayed before live events
+        """
+        subscription = LogSubscription(workflow_id, self.queue_size)
+        if last_event_id is not None:
+            for event in self._buffers.get(workflow_id, ()):
+                if event[0] > last_event_id:
+                    subscription.put(event)
+        self._subscribers.setdefault(workflow_id, set()).add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: LogSubscription):
+        """Stop delivering events to a subscription"""
+        subscribers = self._subscribers.get(subscription.workflow_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.workflow_id]
+    
+    def subscriber_count(self, workflow_id: Optional[str] = None) -> int:
+        """Number of live subscribers, optionally for one workflow"""
+        if workflow_id is not None:
+            return len(self._subscribers.get(workflow_id, ()))
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+    
+    def _evict_buffers(self):
+        """Drop the least recently used replay buffers of unwatched workflows"""
+        excess = len(self._buffers) - self.max_workflows
+        if excess <= 0:
+            return
+        evictable: List[str] = [
+            workflow_id for workflow_id in self._buffers
+            if workflow_id not in self._subscribers
+        ][:excess]
+        for workflow_id in evictable:
+            del self._buffers[workflow_id]
@@ -0,0 +1,167 @@
+"""
+Bounded, indexed storage for execution logs.
+Keeps the most recent entries in memory with per-workflow and per-execution
+indexes so filtered and paginated queries don't scan the whole history.
+"""
+import itertools
+import os
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.models import ExecutionLog
+
+# Entries retained before the oldest are evicted
+LOG_STORE_MAX_ENTRIES = int(os.getenv("LOG_STORE_MAX_ENTRIES", "50000"))
+
+class _SeqIndex:
+    """Sorted sequence numbers for one key, trimmed lazily as entries expire"""
+    
+    def __init__(self):
+        self.seqs: List[int] = []
+        self.expired = 0
+    
+    def live(self) -> int:
+        return len(self.seqs) - self.expired
+    
+    def expire_one(self):
+        self.expired += 1
+        # Trim in bulk so eviction stays amortised O(1)
+        if self.expired * 2 > len(self.seqs):
+            del self.seqs[:self.expired]
+            self.expired = 0
+
+class LogStore:
+    """In-memory log store with indexes, filters and a retention cap"""
+    
+    def __init__(self, max_entries: int = LOG_STORE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._seq = itertools.count(1)
+        self._first_seq = 1
+        self._entries: Dict[int, ExecutionLog] = {}
+        self._all = _SeqIndex()
+        self._by_workflow: Dict[str, _SeqIndex] = {}
+        self._by_execution: Dict[str, _SeqIndex] = {}
+        self.evicted = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def append(self, log: ExecutionLog) -> int:
+        """
+        Store a log entry, evicting the oldest entries past the cap.
+        
+        Returns:
+            The entry's sequence number
+        """
+        seq = next(self._seq)
+        self._entries[seq] = log
+        self._all.seqs.append(seq)
+        self._by_workflow.setdefault(log.workflowId, _SeqIndex()).seqs.append(seq)
+        if log.executionId:
+            self._by_execution.setdefault(log.executionId, _SeqIndex()).seqs.append(seq)
+        
+        while len(self._entries) > self.max_entries:
+            self._evict_oldest()
+        return seq
+    
+    def query(
+        self,
+        workflow_id: Optional[str] = None,
+        execution_id: Optional[str] = None,
+        levels: Optional[Iterable[str]] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        newest: bool = False
+    ) -> Tuple[List[ExecutionLog], Optional[str]]:
+        """
+        Return matching logs in insertion order.
+        
+        Args:
+            workflow_id: Only logs for this workflow
+            execution_id: Only logs for this execution
+            levels: Only logs with one of these levels
+            since: Only logs at or after this time
+            until: Only logs at or before this time
+            cursor: Cursor returned by a previous call; resumes after it
+            limit: Maximum number of logs to return
+            newest: Return the last limit matches instead of the first; the
+                cursor then points past the newest log
+        
+        Returns:
+            The page of logs and the cursor to pass for the next page
+        """
+        if execution_id is not None:
+            index = self._by_execution.get(execution_id)
+        elif workflow_id is not None:
+            index = self._by_workflow.get(workflow_id)
+        else:
+            index = self._all
+        if index is None:
+            return [], cursor
+        
+        after = self._parse_cursor(cursor)
+        seqs = index.seqs
+        start = bisect_left(seqs, max(self._first_seq, after + 1), lo=index.expired)
+        end = len(seqs)
+        
+        # Timestamps increase with sequence numbers, so time ranges bisect too
+        def timestamp(seq: int) -> datetime:
+            return self._entries[seq].timestamp
+        
+        if since is not None:
+            start = bisect_left(seqs, since, lo=start, hi=end, key=timestamp)
+        if until is not None:
+            end = bisect_right(seqs, until, lo=start, hi=end, key=timestamp)
+        
+        level_filter = set(levels) if levels else None
+        page: List[ExecutionLog] = []
+        last_seq = None
+        positions = range(end - 1, start - 1, -1) if newest else range(start, end)
+        for position in positions:
+            seq = seqs[position]
+            log = self._entries[seq]
+            if last_seq is None or not newest:
+                last_seq = seq
+            if workflow_id is not None and log.workflowId != workflow_id:
+                continue
+            if level_filter is not None and log.level not in level_filter:
+                continue
+            page.append(log)
+            if limit is not None and len(page) >= limit:
+                break
+        if newest:
+            page.reverse()
+        
+        if last_seq is None:
+            return page, cursor
+        return page, str(last_seq)
+    
+    @staticmethod
+    def _parse_cursor(cursor: Optional[str]) -> int:
+        if not cursor:
+            return 0
+        try:
+            return int(cursor)
+        except ValueError:
+            raise ValueError(f"Invalid log cursor: {cursor}")
+    
+    def _evict_oldest(self):
+        seq = self._first_seq
+        self._first_seq += 1
+        log = self._entries.pop(seq)
+        self.evicted += 1
+        
+        self._all.expire_one()
+        self._expire(self._by_workflow, log.workflowId)
+        if log.executionId:
+            self._expire(self._by_execution, log.executionId)
+    
+    @staticmethod
+    def _expire(indexes: Dict[str, _SeqIndex], key: str):
+        index = indexes[key]
+        index.expire_one()
+        if index.live() == 0:
+            del indexes[key]
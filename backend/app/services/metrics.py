@@ -0,0 +1,273 @@
+"""
+Prometheus metrics for LLM calls, workflow execution and internal queues.
+A small in-process registry rendered in the Prometheus text exposition
+format, so /metrics needs no extra dependency.
+"""
+import bisect
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Seconds; spans fast cache hits to multi-minute local generations
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+THROUGHPUT_BUCKETS = (1, 2, 5, 10, 20, 35, 50, 75, 100, 150, 250, 500)
+
+LabelValues = Tuple[str, ...]
+
+class _Metric:
+    kind = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+    
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+    
+    def _format_labels(self, values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, values))
+        if extra is not None:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+    
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self._samples(),
+        ]
+    
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """A value that only goes up"""
+    
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+    
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+    
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{self._format_labels(key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+class Gauge(_Metric):
+    """A value that is set to its current reading, usually right before a scrape"""
+    
+    kind = "gauge"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+    
+    def set(self, value: float, **labels: str):
+        self._values[self._key(labels)] = float(value)
+    
+    def clear(self):
+        self._values.clear()
+    
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{self._format_labels(key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets"""
+    
+    kind = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket counts (last is +Inf), sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+    
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = entry
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+    
+    def count(self, **labels: str) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+    
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else _format_value(bound)
+                lines.append(f"{self.name}_bucket{self._format_labels(key, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+class Metrics:
+    """Every metric the backend exports"""
+    
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        
+        # LLM providers
+        self.llm_request_seconds = self._add(Histogram(
+            "llm_request_duration_seconds",
+            "LLM request latency including retries.",
+            ("provider", "model", "mode"),
+        ))
+        self.llm_ttft_seconds = self._add(Histogram(
+            "llm_time_to_first_token_seconds",
+            "Time until a streamed LLM response produced its first text.",
+            ("provider", "model"),
+        ))
+        self.llm_tokens_per_second = self._add(Histogram(
+            "llm_output_tokens_per_second",
+            "Generation speed in estimated output tokens per second.",
+            ("provider", "model"),
+            THROUGHPUT_BUCKETS,
+        ))
+        self.llm_responses = self._add(Counter(
+            "llm_http_responses_total",
+            "HTTP responses from LLM providers by status code.",
+            ("provider", "status"),
+        ))
+        self.llm_errors = self._add(Counter(
+            "llm_errors_total",
+            "Failed LLM requests by error type.",
+            ("provider", "model", "error"),
+        ))
+        self.llm_circuit_opens = self._add(Counter(
+            "llm_circuit_opens_total",
+            "Times an LLM endpoint's circuit breaker opened after repeated failures.",
+            ("provider",),
+        ))
+        self.llm_failovers = self._add(Counter(
+            "llm_failovers_total",
+            "Requests passed to an agent's fallback model, by the model that failed.",
+            ("provider", "model"),
+        ))
+        self.llm_queued = self._add(Gauge(
+            "llm_requests_queued",
+            "LLM requests waiting for a rate limiter slot.",
+            ("provider", "model"),
+        ))
+        self.llm_in_flight = self._add(Gauge(
+            "llm_requests_in_flight",
+            "LLM requests currently holding a rate limiter slot.",
+            ("provider", "model"),
+        ))
+        
+        # Workflow execution
+        self.node_seconds = self._add(Histogram(
+            "workflow_node_duration_seconds",
+            "Time to run one agent node of a workflow.",
+            ("provider", "model", "status"),
+        ))
+        self.nodes_reused = self._add(Counter(
+            "workflow_nodes_reused_total",
+            "Agent nodes answered from a checkpoint instead of running.",
+        ))
+        self.prompt_overflows = self._add(Counter(
+            "workflow_prompt_overflows_total",
+            "Agent inputs over their context budget, by how they were shrunk.",
+            ("strategy",),
+        ))
+        self.model_switches = self._add(Counter(
+            "workflow_model_switches_total",
+            "Times a local LLM endpoint was switched to another model, by the model switched to.",
+            ("model",),
+        ))
+        self.active_executions = self._add(Gauge(
+            "workflow_active_executions",
+            "Workflow executions currently running.",
+        ))
+        self.executions_queued = self._add(Gauge(
+            "workflow_executions_queued",
+            "Workflow executions waiting for a running slot.",
+        ))
+        self.executions_rejected = self._add(Counter(
+            "workflow_executions_rejected_total",
+            "Workflow executions turned away because the execution queue was full.",
+        ))
+        self.executions_cancelled = self._add(Counter(
+            "workflow_executions_cancelled_total",
+            "Workflow executions cancelled before finishing.",
+        ))
+        self.nodes_waiting = self._add(Gauge(
+            "workflow_nodes_waiting",
+            "Ready agent nodes waiting for a concurrency slot.",
+        ))
+        self.log_store_entries = self._add(Gauge(
+            "log_store_entries",
+            "Execution log entries held in memory.",
+        ))
+        self.log_stream_subscribers = self._add(Gauge(
+            "log_stream_subscribers",
+            "Open live log streams.",
+        ))
+        
+        # Sandbox workers
+        self.sandbox_workers = self._add(Gauge(
+            "sandbox_workers",
+            "Sandbox worker processes by state.",
+            ("state",),
+        ))
+        self.sandbox_queued = self._add(Gauge(
+            "sandbox_tasks_queued",
+            "Sandbox tasks waiting for a free worker.",
+        ))
+    
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+# Global metrics instance
+_metrics: Optional[Metrics] = None
+
+def get_metrics() -> Metrics:
+    """Get or create the global metrics"""
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics()
+    return _metrics
@@ -0,0 +1,186 @@
+"""
+Executor-wide concurrency slots with model affinity for local LLM hosts.
+Ready nodes from every run wait here; on an Ollama endpoint the nodes for
+the model already loaded go first, so the host isn't swapping models.
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.services.metrics import get_metrics
+
+# Group ready nodes by model on Ollama endpoints; off is plain FIFO
+WORKFLOW_MODEL_AFFINITY = os.getenv("WORKFLOW_MODEL_AFFINITY", "true").lower() in ("1", "true", "yes")
+# Nodes of the loaded model started in a row while other models wait
+WORKFLOW_AFFINITY_MAX_BATCH = int(os.getenv("WORKFLOW_AFFINITY_MAX_BATCH", "16"))
+# Longest a node waits for its model's turn before the endpoint switches to it
+WORKFLOW_AFFINITY_MAX_WAIT = float(os.getenv("WORKFLOW_AFFINITY_MAX_WAIT", "30"))
+
+# (base URL, model); None for providers that serve any model at any time
+AffinityKey = Optional[Tuple[str, str]]
+
+class _Waiter:
+    __slots__ = ("key", "future", "enqueued")
+    
+    def __init__(self, key: AffinityKey, future: asyncio.Future):
+        self.key = key
+        self.future = future
+        self.enqueued = time.monotonic()
+
+class _Endpoint:
+    """The model an endpoint is serving and the nodes using it"""
+    __slots__ = ("model", "running", "batch", "waiting")
+    
+    def __init__(self):
+        self.model: Optional[str] = None
+        self.running = 0
+        # Waiting nodes by model
+        self.waiting: Dict[str, int] = {}
+        # Nodes started in a row while other models were waiting
+        self.batch = 0
+
+class ModelAffinityScheduler:
+    """
+    A counting semaphore that hands out slots by model rather than arrival.
+    
+    While an endpoint's current model has waiting nodes they are started
+    ahead of other models' nodes on that endpoint. A switch happens once
+    the current model runs out of waiting nodes, has started max_batch in
+    a row while another model waited, or the oldest waiting node has waited
+    max_wait seconds; the endpoint then finishes its running nodes and moves
+    on to the model of its oldest waiting node, so no run starves. Nodes
+    without an affinity key only wait for a free slot.
+    """
+    
+    def __init__(
+        self,
+        capacity: int,
+        enabled: bool = WORKFLOW_MODEL_AFFINITY,
+        max_batch: int = WORKFLOW_AFFINITY_MAX_BATCH,
+        max_wait: float = WORKFLOW_AFFINITY_MAX_WAIT
+    ):
+        self.capacity = capacity
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.active = 0
+        self.switches = 0
+        # In arrival order
+        self._waiters: List[_Waiter] = []
+        self._endpoints: Dict[str, _Endpoint] = {}
+    
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+    
+    @asynccontextmanager
+    async def slot(self, key: AffinityKey = None) -> AsyncIterator[None]:
+        """Hold one slot for the block, waiting for the key's turn if needed"""
+        if not self.enabled:
+            key = None
+        waiter = _Waiter(key, asyncio.get_running_loop().create_future())
+        self._enqueue(waiter)
+        self._dispatch()
+        try:
+            await waiter.future
+        except BaseException:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the wait was cancelled
+                self._release(key)
+            else:
+                self._dequeue(waiter)
+                self._dispatch()
+            raise
+        try:
+            yield
+        finally:
+            self._release(key)
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "active": self.active,
+            "waiting": self.waiting,
+            "model_switches": self.switches,
+            "endpoints": {
+                base_url: {"model": endpoint.model, "running": endpoint.running}
+                for base_url, endpoint in self._endpoints.items()
+            },
+        }
+    
+    def _enqueue(self, waiter: _Waiter):
+        self._waiters.append(waiter)
+        if waiter.key is not None:
+            base_url, model = waiter.key
+            endpoint = self._endpoints.setdefault(base_url, _Endpoint())
+            endpoint.waiting[model] = endpoint.waiting.get(model, 0) + 1
+    
+    def _dequeue(self, waiter: _Waiter):
+        self._waiters.remove(waiter)
+        if waiter.key is not None:
+            base_url, model = waiter.key
+            waiting = self._endpoints[base_url].waiting
+            waiting[model] -= 1
+            if not waiting[model]:
+                del waiting[model]
+    
+    def _release(self, key: AffinityKey):
+        self.active -= 1
+        if key is not None:
+            self._endpoints[key[0]].running -= 1
+        self._dispatch()
+    
+    def _dispatch(self):
+        while self.active < self.capacity:
+            waiter = self._next()
+            if waiter is None:
+                return
+            self._grant(waiter)
+    
+    def _next(self) -> Optional[_Waiter]:
+        """The longest-waiting node whose model may start now"""
+        now = time.monotonic()
+        targets: Dict[str, Optional[str]] = {}
+        for waiter in self._waiters:
+            if waiter.key is None:
+                return waiter
+            base_url, model = waiter.key
+            if base_url not in targets:
+                targets[base_url] = self._target(base_url, waiter, now)
+            if targets[base_url] == model:
+                return waiter
+        return None
+    
+    def _target(self, base_url: str, oldest: _Waiter, now: float) -> Optional[str]:
+        """
+        The model an endpoint may start nodes for, given its oldest waiting
+        node, or None while it finishes the current model before switching.
+        """
+        endpoint = self._endpoints[base_url]
+        if endpoint.model is None:
+            return oldest.key[1]
+        fair = endpoint.batch < self.max_batch and now - oldest.enqueued < self.max_wait
+        if endpoint.model in endpoint.waiting and fair:
+            return endpoint.model
+        if endpoint.running and oldest.key[1] != endpoint.model:
+            return None
+        return oldest.key[1]
+    
+    def _grant(self, waiter: _Waiter):
+        self._dequeue(waiter)
+        self.active += 1
+        if waiter.key is not None:
+            base_url, model = waiter.key
+            endpoint = self._endpoints[base_url]
+            if endpoint.model != model:
+                if endpoint.model is not None:
+                    self.switches += 1
+                    get_metrics().model_switches.inc(model=model)
+                endpoint.model = model
+                endpoint.batch = 0
+            endpoint.running += 1
+            others_waiting = len(endpoint.waiting) > (model in endpoint.waiting)
+            endpoint.batch = endpoint.batch + 1 if others_waiting else 0
+        waiter.future.set_result(None)
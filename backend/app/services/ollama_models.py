@@ -0,0 +1,153 @@
+"""
+Ollama model preloading and keep_alive pinning for workflow runs.
+Models a run needs are loaded concurrently when it starts and kept loaded
+until the last run using them finishes, so no step pays for a cold load.
+"""
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
+
+from app.models import LLMConfig
+from app.services import llm_service
+from app.services.llm_errors import LLMError
+from app.services.llm_service import OLLAMA_KEEP_ALIVE, LLMService
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_PRELOAD_MODELS = os.getenv("OLLAMA_PRELOAD_MODELS", "true").lower() in ("1", "true", "yes")
+# keep_alive sent while a run needs a model; -1 keeps it loaded indefinitely
+OLLAMA_RUN_KEEP_ALIVE = os.getenv("OLLAMA_RUN_KEEP_ALIVE", "-1")
+# keep_alive restored once no run needs the model
+OLLAMA_RELEASE_KEEP_ALIVE = OLLAMA_KEEP_ALIVE or "5m"
+
+ModelKey = Tuple[str, str]
+
+class OllamaModelManager:
+    """Preload Ollama models and keep them pinned while runs use them"""
+    
+    def __init__(self):
+        # Runs currently needing each (base URL, model)
+        self._pins: Dict[ModelKey, int] = {}
+    
+    def run_config(self, config: LLMConfig) -> LLMConfig:
+        """The config to use for requests made during a run, with the run keep_alive"""
+        if not OLLAMA_PRELOAD_MODELS or config.provider != "ollama":
+            return config
+        return config.model_copy(update={"keepAlive": OLLAMA_RUN_KEEP_ALIVE})
+    
+    async def warm(
+        self,
+        configs: Iterable[LLMConfig],
+        keep_alive: Optional[Union[int, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Load Ollama models concurrently.
+        
+        Failures are reported per model rather than raised, since a model
+        that can't be preloaded still gets a chance when a step uses it.
+        
+        Returns:
+            One result per distinct model: model, baseUrl, loaded, seconds
+            and, on failure, error
+        """
+        services = self._services(configs)
+        
+        async def load(service: LLMService) -> Dict[str, Any]:
+            result = {"model": service.config.modelName, "baseUrl": service.base_url}
+            try:
+                seconds = await service.preload(keep_alive)
+            except LLMError as e:
+                logger.warning("Couldn't preload Ollama model %s: %s", service.config.modelName, e)
+                return {**result, "loaded": False, "error": str(e)}
+            logger.info("Ollama model %s ready in %.2fs", service.config.modelName, seconds)
+            return {**result, "loaded": True, "seconds": round(seconds, 3)}
+        
+        return list(await asyncio.gather(*(load(service) for service in services)))
+    
+    @asynccontextmanager
+    async def pinned(self, configs: Iterable[LLMConfig]) -> AsyncIterator[None]:
+        """
+        Keep the Ollama models in configs loaded for the block.
+        
+        Loading starts in the background so early steps aren't held up by
+        models only later steps need. When the last run using a model ends,
+        its keep_alive goes back to OLLAMA_RELEASE_KEEP_ALIVE.
+        """
+        configs = [config for config in configs if config.provider == "ollama"]
+        if not OLLAMA_PRELOAD_MODELS or not configs:
+            yield
+            return
+        
+        services = self._services(configs)
+        keys = [_model_key(service) for service in services]
+        for key in keys:
+            self._pins[key] = self._pins.get(key, 0) + 1
+        warming = asyncio.create_task(
+            self.warm([service.config for service in services], OLLAMA_RUN_KEEP_ALIVE)
+        )
+        try:
+            yield
+        finally:
+            if not warming.done():
+                warming.cancel()
+            await asyncio.gather(warming, return_exceptions=True)
+            released = []
+            for service, key in zip(services, keys):
+                self._pins[key] -= 1
+                if self._pins[key] == 0:
+                    del self._pins[key]
+                    released.append(service)
+            if released:
+                # Only a model that is already loaded is touched, so this is quick
+                await self._release(released)
+    
+    def pinned_models(self) -> Dict[str, int]:
+        """Runs pinning each model, keyed by base URL and model name"""
+        return {f"{base_url} {model}": count for (base_url, model), count in self._pins.items()}
+    
+    async def _release(self, services: List[LLMService]):
+        """Let Ollama unload models again, without loading ones it already evicted"""
+        by_endpoint: Dict[str, List[LLMService]] = {}
+        for service in services:
+            by_endpoint.setdefault(service.base_url, []).append(service)
+        for endpoint_services in by_endpoint.values():
+            try:
+                loaded = {_tagged(name) for name in await endpoint_services[0].loaded_models()}
+                for service in endpoint_services:
+                    # A new run may have pinned it again meanwhile
+                    if _model_key(service) in self._pins or _tagged(service.config.modelName) not in loaded:
+                        continue
+                    await service.preload(OLLAMA_RELEASE_KEEP_ALIVE)
+            except LLMError as e:
+                logger.warning("Couldn't reset Ollama keep_alive: %s", e)
+    
+    @staticmethod
+    def _services(configs: Iterable[LLMConfig]) -> List[LLMService]:
+        """One service per distinct endpoint, model and context size"""
+        distinct: Dict[Tuple[str, str, Optional[int]], LLMConfig] = {}
+        for config in configs:
+            distinct.setdefault((*model_key(config.modelName, config.baseUrl), config.contextWindow), config)
+        return [LLMService(config) for config in distinct.values()]
+
+def model_key(model: str, base_url: Optional[str] = None) -> ModelKey:
+    """The Ollama endpoint and fully tagged model name a request goes to"""
+    return ((base_url or llm_service.OLLAMA_BASE_URL).rstrip("/"), _tagged(model))
+
+def _model_key(service: LLMService) -> ModelKey:
+    return model_key(service.config.modelName, service.base_url)
+
+def _tagged(model: str) -> str:
+    """Ollama reports untagged models with their implicit :latest tag"""
+    return model if ":" in model else f"{model}:latest"
+
+# Global manager instance
+_ollama_models: Optional[OllamaModelManager] = None
+
+def get_ollama_models() -> OllamaModelManager:
+    """Get or create the global Ollama model manager"""
+    global _ollama_models
+    if _ollama_models is None:
+        _ollama_models = OllamaModelManager()
+    return _ollama_models
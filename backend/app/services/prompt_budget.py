@@ -0,0 +1,115 @@
+"""
+Context window budgeting for agent prompts.
+Works out how many input tokens an agent can take and shrinks oversized
+upstream output by truncating it, chunking it, or summarizing it first.
+"""
+import os
+import sys
+from typing import Awaitable, Callable, List, Optional
+
+from app.models import Agent
+from app.services.tokenizer import OLLAMA_NUM_CTX, Tokenizer, context_window, get_tokenizer
+
+OVERFLOW_STRATEGIES = ("head", "tail", "head_tail", "chunk", "summarize")
+# Used by agents that don't set overflowStrategy
+PROMPT_OVERFLOW_STRATEGY = os.getenv("PROMPT_OVERFLOW_STRATEGY", "head_tail")
+# Held back from the window for chat templates and tokenizer estimate error
+PROMPT_SAFETY_MARGIN_TOKENS = int(os.getenv("PROMPT_SAFETY_MARGIN_TOKENS", "64"))
+# Summary passes before falling back to truncation
+PROMPT_MAX_SUMMARY_ROUNDS = int(os.getenv("PROMPT_MAX_SUMMARY_ROUNDS", "2"))
+# Smallest input budget an agent is given, even if maxTokens leaves less
+MIN_PROMPT_TOKENS = 256
+
+SUMMARY_SYSTEM_PROMPT = (
+    "Condense the text you are given so another agent can work from it. "
+    "Keep every fact, figure, name, decision and open question; drop "
+    "repetition and filler. Reply with the condensed text only."
+)
+OMITTED_MARKER = "\n\n[... {tokens} tokens omitted ...]\n\n"
+
+class PromptBudget:
+    """The input token budget of one agent"""
+    
+    def __init__(self, agent: Agent):
+        self.agent = agent
+        self.tokenizer: Tokenizer = get_tokenizer(agent.llmProvider, agent.modelName)
+        self.strategy = agent.overflowStrategy or PROMPT_OVERFLOW_STRATEGY
+        if self.strategy not in OVERFLOW_STRATEGIES:
+            raise ValueError(f"Unknown prompt overflow strategy: {self.strategy}")
+        self.window = context_window(agent.llmProvider, agent.modelName, agent.contextWindow)
+        if agent.llmProvider == "ollama" and not agent.contextWindow and OLLAMA_NUM_CTX is None:
+            # Ollama's default num_ctx says nothing about the model, so
+            # inputs are passed whole unless a window is configured
+            self.limit = sys.maxsize
+            return
+        # At most half the window is held back for the reply, so a large
+        # maxTokens doesn't squeeze the input down to the minimum
+        reserved = (
+            min(agent.maxTokens, self.window // 2)
+            + self.tokenizer.count(agent.systemPrompt)
+            + PROMPT_SAFETY_MARGIN_TOKENS
+        )
+        self.limit = max(MIN_PROMPT_TOKENS, self.window - reserved)
+    
+    def fits(self, prompt: str) -> bool:
+        return self.tokenizer.count(prompt) <= self.limit
+    
+    def truncate(self, prompt: str, strategy: Optional[str] = None) -> str:
+        """
+        Cut prompt down to the budget.
+        
+        head keeps the start, tail keeps the end, and head_tail keeps both
+        ends around a marker, since instructions tend to come first and
+        conclusions last.
+        """
+        strategy = strategy or self.strategy
+        total = self.tokenizer.count(prompt)
+        if total <= self.limit:
+            return prompt
+        if strategy == "head":
+            return self.tokenizer.head(prompt, self.limit)
+        if strategy == "tail":
+            return self.tokenizer.tail(prompt, self.limit)
+        marker_tokens = self.tokenizer.count(OMITTED_MARKER.format(tokens=total))
+        keep = max(0, self.limit - marker_tokens)
+        head = self.tokenizer.head(prompt, keep - keep // 2)
+        tail = self.tokenizer.tail(prompt, keep // 2)
+        omitted = total - self.tokenizer.count(head) - self.tokenizer.count(tail)
+        return head + OMITTED_MARKER.format(tokens=omitted) + tail
+    
+    def chunks(self, prompt: str) -> List[str]:
+        """Split prompt into parts that each fit, labelled with their position"""
+        # Leave room for the "[Part i/n]" label
+        pieces = self.tokenizer.split(prompt, max(1, self.limit - 16))
+        if len(pieces) == 1:
+            return pieces
+        return [
+            f"[Part {index} of {len(pieces)}]\n{piece}"
+            for index, piece in enumerate(pieces, start=1)
+        ]
+    
+    async def summarize(
+        self,
+        prompt: str,
+        generate: Callable[[str, str, int], Awaitable[str]]
+    ) -> str:
+        """
+        Shrink prompt with summary passes until it fits.
+        
+        Each pass summarizes budget-sized chunks one at a time, since the
+        node holds a single concurrency slot, and joins the summaries.
+        Whatever still doesn't fit afterwards is truncated.
+        
+        Args:
+            prompt: The oversized input
+            generate: Called as generate(text, system_prompt, max_tokens)
+        """
+        for _ in range(PROMPT_MAX_SUMMARY_ROUNDS):
+            if self.fits(prompt):
+                return prompt
+            pieces = self.tokenizer.split(prompt, self.limit)
+            # Share the budget between the summaries so their join fits
+            max_tokens = max(32, min(self.agent.maxTokens, self.limit // len(pieces)))
+            summaries = [await generate(piece, SUMMARY_SYSTEM_PROMPT, max_tokens) for piece in pieces]
+            prompt = "\n\n".join(summary.strip() for summary in summaries)
+        return self.truncate(prompt, "head_tail")
@@ -0,0 +1,255 @@
+"""
+Health of LLM provider endpoints, checked in the background.
+Each endpoint has a circuit breaker that opens after repeated failures, so
+requests to a dead endpoint fail over at once instead of waiting on timeouts.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from app.services.http_pool import get_client_pool
+from app.services.llm_errors import LLMConnectionError, LLMError, LLMHTTPError
+from app.services.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Seconds between background checks of every known endpoint; 0 disables them
+LLM_HEALTH_CHECK_INTERVAL = float(os.getenv("LLM_HEALTH_CHECK_INTERVAL", "30"))
+LLM_HEALTH_CHECK_TIMEOUT = float(os.getenv("LLM_HEALTH_CHECK_TIMEOUT", "3"))
+# Consecutive failures that open an endpoint's circuit
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+# Seconds an open circuit waits before letting a trial request through
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+# Probed on each provider; any answer below 500, even 401, means it's up
+_HEALTH_PATHS = {
+    "ollama": "/api/tags",
+    "openai": "/v1/models",
+    "anthropic": "/v1/models",
+    "custom": "/models",
+}
+
+class CircuitBreaker:
+    """
+    Closed until failure_threshold consecutive failures, then open: calls
+    are refused for reset_seconds, after which it is half-open and lets one
+    trial call through. The trial's outcome closes or reopens it.
+    """
+    
+    def __init__(
+        self,
+        failure_threshold: int = LLM_BREAKER_FAILURES,
+        reset_seconds: float = LLM_BREAKER_RESET_SECONDS
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        # When the half-open trial was let through
+        self._trial_at: Optional[float] = None
+    
+    def allow(self) -> bool:
+        """Whether a call may go ahead now"""
+        if self.state == "closed":
+            return True
+        now = time.monotonic()
+        if self.state == "open":
+            if now - self.opened_at < self.reset_seconds:
+                return False
+            self.state = "half_open"
+        # A trial that never reports back (e.g. cancelled) is replaced eventually
+        if self._trial_at is not None and now - self._trial_at < self.reset_seconds:
+            return False
+        self._trial_at = now
+        return True
+    
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._trial_at = None
+    
+    def record_failure(self) -> bool:
+        """Count a failure; returns True if it opened the circuit"""
+        self.failures += 1
+        if self.state == "open":
+            return False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self._trial_at = None
+            return True
+        return False
+    
+    def probe_succeeded(self):
+        """A health check got through: let the next call be the trial now"""
+        if self.state == "open":
+            self.state = "half_open"
+            self._trial_at = None
+    
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a trial through"""
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_seconds - time.monotonic())
+
+class ProviderEndpoint:
+    """One provider base URL: its breaker and the result of the last check"""
+    
+    def __init__(self, provider: str, base_url: str):
+        self.provider = provider
+        self.base_url = base_url
+        self.breaker = CircuitBreaker()
+        self.healthy: Optional[bool] = None
+        self.checked_at: Optional[float] = None
+        self.latency_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        # Ollama's /api/tags model list from the last successful check
+        self.models: List[Dict[str, Any]] = []
+    
+    def allow(self) -> bool:
+        return self.breaker.allow()
+    
+    def record_success(self):
+        if self.breaker.state != "closed":
+            logger.info("%s endpoint %s recovered; closing circuit", self.provider, self.base_url)
+        self.breaker.record_success()
+    
+    def record_failure(self, error: LLMError):
+        """Count errors that say the endpoint is in trouble; client errors don't"""
+        if isinstance(error, LLMConnectionError) or (
+            isinstance(error, LLMHTTPError) and error.status_code >= 500
+        ):
+            self.error = str(error)
+            if self.breaker.record_failure():
+                get_metrics().llm_circuit_opens.inc(provider=self.provider)
+                logger.warning(
+                    "%s endpoint %s failed %d times; opening circuit for %.0fs: %s",
+                    self.provider, self.base_url, self.breaker.failures,
+                    self.breaker.reset_seconds, error
+                )
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider,
+            "base_url": self.base_url,
+            "healthy": self.healthy,
+            "circuit": self.breaker.state,
+            "failures": self.breaker.failures,
+            "retry_in": round(self.breaker.retry_in(), 1),
+            "latency_ms": self.latency_ms,
+            "checked_seconds_ago": (
+                None if self.checked_at is None else round(time.monotonic() - self.checked_at, 1)
+            ),
+            "error": self.error,
+            "models": len(self.models),
+        }
+
+class ProviderHealthRegistry:
+    """Endpoints by (provider, base URL), created on first use and checked periodically"""
+    
+    def __init__(
+        self,
+        interval: float = LLM_HEALTH_CHECK_INTERVAL,
+        timeout: float = LLM_HEALTH_CHECK_TIMEOUT
+    ):
+        self.interval = interval
+        self.timeout = timeout
+        self._endpoints: Dict[Tuple[str, str], ProviderEndpoint] = {}
+        self._task: Optional[asyncio.Task] = None
+    
+    def get(self, provider: str, base_url: str) -> ProviderEndpoint:
+        key = (provider, base_url.rstrip("/"))
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = self._endpoints[key] = ProviderEndpoint(*key)
+        return endpoint
+    
+    async def check(self, endpoint: ProviderEndpoint) -> bool:
+        """
+        Probe an endpoint and update its health and cached model list.
+        
+        A failed probe counts towards opening the circuit; a successful one
+        lets an open circuit try a real request straight away.
+        """
+        url = endpoint.base_url + _HEALTH_PATHS.get(endpoint.provider, "/")
+        client = get_client_pool().get(endpoint.provider, endpoint.base_url)
+        started = time.monotonic()
+        try:
+            response = await client.get(url, timeout=self.timeout)
+            if response.status_code >= 500:
+                raise LLMHTTPError(endpoint.provider, response.status_code)
+            if endpoint.provider == "ollama":
+                endpoint.models = response.json().get("models", [])
+        except (httpx.HTTPError, ValueError, AttributeError, LLMError) as e:
+            if not isinstance(e, LLMError):
+                e = LLMConnectionError(endpoint.provider, str(e) or type(e).__name__)
+            endpoint.healthy = False
+            endpoint.record_failure(e)
+            endpoint.error = str(e)
+        else:
+            endpoint.healthy = True
+            endpoint.error = None
+            endpoint.breaker.probe_succeeded()
+        endpoint.checked_at = time.monotonic()
+        endpoint.latency_ms = round((endpoint.checked_at - started) * 1000, 1)
+        return endpoint.healthy
+    
+    async def check_all(self):
+        await asyncio.gather(*(self.check(endpoint) for endpoint in list(self._endpoints.values())))
+    
+    async def ollama_models(self, base_url: str) -> List[Dict[str, Any]]:
+        """
+        Ollama's installed models, from the last check if it's recent.
+        
+        Raises:
+            LLMConnectionError: If Ollama can't be reached
+        """
+        endpoint = self.get("ollama", base_url)
+        stale = endpoint.checked_at is None or time.monotonic() - endpoint.checked_at >= self.interval
+        if stale or not endpoint.healthy:
+            await self.check(endpoint)
+        if not endpoint.healthy:
+            raise LLMConnectionError("Ollama", endpoint.error or "unreachable")
+        return endpoint.models
+    
+    async def start(self, endpoints: Iterable[Tuple[str, str]] = ()):
+        """Register endpoints worth watching before first use and start checking"""
+        for provider, base_url in endpoints:
+            self.get(provider, base_url)
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            f"{provider}@{base_url}": endpoint.snapshot()
+            for (provider, base_url), endpoint in self._endpoints.items()
+        }
+    
+    async def _run(self):
+        while True:
+            try:
+                await self.check_all()
+            except Exception:
+                logger.exception("Provider health check failed")
+            await asyncio.sleep(self.interval)
+
+# Global registry instance
+_provider_health: Optional[ProviderHealthRegistry] = None
+
+def get_provider_health() -> ProviderHealthRegistry:
+    """Get or create the global provider health registry"""
+    global _provider_health
+    if _provider_health is None:
+        _provider_health = ProviderHealthRegistry()
+    return _provider_health
@@ -0,0 +1,215 @@
+"""
+Per-provider rate limiting and concurrency control for LLM requests.
+Each (provider, endpoint, model) gets request/token buckets, an in-flight cap
+that shrinks on 429 responses and recovers on success, and queue-wait metrics.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+
+import httpx
+
+# Defaults per provider; override with e.g. LLM_MAX_IN_FLIGHT_OLLAMA=2,
+# LLM_RPM_OPENAI=500 or LLM_TPM_ANTHROPIC=40000 (0 means unlimited)
+DEFAULT_MAX_IN_FLIGHT = {"ollama": 4, "openai": 16, "anthropic": 16, "custom": 8}
+# Longest backoff applied after repeated 429s without a Retry-After header
+LLM_MAX_BACKOFF_SECONDS = float(os.getenv("LLM_MAX_BACKOFF_SECONDS", "60"))
+
+def _provider_setting(name: str, provider: str, default: int) -> int:
+    return int(os.getenv(f"{name}_{provider.upper()}", str(default)))
+
+class TokenBucket:
+    """Refills continuously up to a per-minute capacity"""
+    
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+    
+    async def take(self, amount: float):
+        """Wait until amount tokens are available and consume them"""
+        amount = min(amount, self.capacity)
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) / self.rate)
+
+class AdaptiveSemaphore:
+    """A FIFO semaphore whose limit can change while requests are waiting"""
+    
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+    
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+    
+    async def acquire(self):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted just as we were cancelled
+                self.release()
+            else:
+                self._waiters.remove(future)
+            raise
+    
+    def release(self):
+        self.active -= 1
+        self.wake()
+    
+    def set_limit(self, limit: int):
+        self.limit = limit
+        self.wake()
+    
+    def wake(self):
+        while self._waiters and self.active < self.limit:
+            future = self._waiters.popleft()
+            if not future.done():
+                self.active += 1
+                future.set_result(None)
+
+class ProviderLimiter:
+    """Rate limits and adaptive concurrency for one provider endpoint and model"""
+    
+    def __init__(
+        self,
+        max_in_flight: int,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0
+    ):
+        self.max_in_flight = max_in_flight
+        self.semaphore = AdaptiveSemaphore(max_in_flight)
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.blocked_until = 0.0
+        self._consecutive_throttles = 0
+        self._successes = 0
+        self.queued = 0
+        self.stats = {
+            "requests": 0,
+            "throttled": 0,
+            "queue_wait_seconds_total": 0.0,
+            "queue_wait_seconds_max": 0.0,
+        }
+    
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int = 0) -> AsyncIterator[None]:
+        """Hold a request slot, waiting for backoff, buckets and the in-flight cap"""
+        queued_at = time.monotonic()
+        self.queued += 1
+        try:
+            while time.monotonic() < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - time.monotonic())
+            if self.request_bucket is not None:
+                await self.request_bucket.take(1)
+            if self.token_bucket is not None and estimated_tokens:
+                await self.token_bucket.take(estimated_tokens)
+            await self.semaphore.acquire()
+        finally:
+            self.queued -= 1
+        
+        waited = time.monotonic() - queued_at
+        self.stats["requests"] += 1
+        self.stats["queue_wait_seconds_total"] += waited
+        self.stats["queue_wait_seconds_max"] = max(self.stats["queue_wait_seconds_max"], waited)
+        try:
+            yield
+        finally:
+            self.semaphore.release()
+    
+    def observe(self, response: httpx.Response):
+        """Adapt to a provider response: back off on 429, recover on success"""
+        if response.status_code == 429:
+            self.stats["throttled"] += 1
+            self._consecutive_throttles += 1
+            self._successes = 0
+            delay = retry_after_seconds(response)
+            if delay is None:
+                delay = min(LLM_MAX_BACKOFF_SECONDS, 2 ** (self._consecutive_throttles - 1))
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+            self.semaphore.set_limit(max(1, self.semaphore.limit // 2))
+        elif response.status_code < 400:
+            self._consecutive_throttles = 0
+            self._successes += 1
+            # Additive increase: one more slot per limit's worth of successes
+            if self.semaphore.limit < self.max_in_flight and self._successes >= self.semaphore.limit:
+                self._successes = 0
+                self.semaphore.set_limit(self.semaphore.limit + 1)
+    
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            **self.stats,
+            "in_flight": self.semaphore.active,
+            "queued": self.queued,
+            "limit": self.semaphore.limit,
+            "max_in_flight": self.max_in_flight,
+            "backoff_seconds": max(0.0, self.blocked_until - time.monotonic()),
+        }
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Parse a numeric Retry-After header (HTTP-date values are ignored)"""
+    value = response.headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+class RateLimiterRegistry:
+    """Creates limiters on demand, one per (provider, base URL, model)"""
+    
+    def __init__(self):
+        self._limiters: Dict[Tuple[str, str, str], ProviderLimiter] = {}
+    
+    def get(self, provider: str, base_url: str, model: str) -> ProviderLimiter:
+        key = (provider, base_url.rstrip("/"), model)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = ProviderLimiter(
+                max_in_flight=_provider_setting(
+                    "LLM_MAX_IN_FLIGHT", provider, DEFAULT_MAX_IN_FLIGHT.get(provider, 8)
+                ),
+                requests_per_minute=_provider_setting("LLM_RPM", provider, 0),
+                tokens_per_minute=_provider_setting("LLM_TPM", provider, 0),
+            )
+            self._limiters[key] = limiter
+        return limiter
+    
+    def limiters(self) -> Dict[Tuple[str, str, str], ProviderLimiter]:
+        """Every limiter created so far, keyed by (provider, base URL, model)"""
+        return dict(self._limiters)
+    
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Current metrics for every limiter, keyed by provider/base_url/model"""
+        return {
+            f"{provider}:{model}@{base_url}": limiter.snapshot()
+            for (provider, base_url, model), limiter in self._limiters.items()
+        }
+
+# Global registry instance
+_rate_limiter_registry: Optional[RateLimiterRegistry] = None
+
+def get_rate_limiter_registry() -> RateLimiterRegistry:
+    """Get or create the global rate limiter registry"""
+    global _rate_limiter_registry
+    if _rate_limiter_registry is None:
+        _rate_limiter_registry = RateLimiterRegistry()
+    return _rate_limiter_registry
@@ -0,0 +1,216 @@
+"""
+Async repositories for persisted models.
+Reads go through a short-lived in-process cache; concurrent writes are
+grouped into a single transaction so bursts of saves share one commit.
+"""
+import asyncio
+import os
+import time
+from typing import Dict, Generic, Iterable, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+from sqlalchemy import Table, delete, select
+from sqlalchemy.dialects.sqlite import insert
+
+from app.models import Agent, Team, Workflow
+from app.services.database import (
+    Database,
+    agents_table,
+    get_database,
+    teams_table,
+    workflows_table,
+)
+
+# Seconds a cached row is trusted before re-reading it (other workers may write)
+DB_CACHE_TTL_SECONDS = float(os.getenv("DB_CACHE_TTL_SECONDS", "5"))
+# Largest number of writes committed in one transaction
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "500"))
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+class Repository(Generic[ModelT]):
+    """Persist one model type in its own table"""
+    
+    def __init__(
+        self,
+        database: Database,
+        table: Table,
+        model: Type[ModelT],
+        cache_ttl: float = DB_CACHE_TTL_SECONDS,
+        batch_size: int = DB_WRITE_BATCH_SIZE
+    ):
+        self.database = database
+        self.table = table
+        self.model = model
+        self.cache_ttl = cache_ttl
+        self.batch_size = batch_size
+        self._cache: Dict[str, Tuple[float, ModelT]] = {}
+        self._pending: List[Tuple[str, object, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self.flushes = 0
+    
+    async def get(self, item_id: str) -> Optional[ModelT]:
+        """Get one item by ID, or None if it doesn't exist"""
+        cached = self._cached(item_id)
+        if cached is not None:
+            return cached
+        items = await self._select(self.table.c.id == item_id)
+        return items[0] if items else None
+    
+    async def get_many(self, item_ids: Iterable[str]) -> Dict[str, ModelT]:
+        """Get several items by ID; missing IDs are left out"""
+        found: Dict[str, ModelT] = {}
+        missing: List[str] = []
+        for item_id in set(item_ids):
+            cached = self._cached(item_id)
+            if cached is not None:
+                found[item_id] = cached
+            else:
+                missing.append(item_id)
+        if missing:
+            for item in await self._select(self.table.c.id.in_(missing)):
+                found[item.id] = item
+        return found
+    
+    async def list(self) -> List[ModelT]:
+        """List all items, oldest first"""
+        return await self._select(None)
+    
+    async def save(self, item: ModelT):
+        """Insert or update an item"""
+        self._cache[item.id] = (time.monotonic(), item)
+        await self._submit("upsert", item)
+    
+    async def delete(self, item_id: str):
+        """Delete an item if it exists"""
+        self._cache.pop(item_id, None)
+        await self._submit("delete", item_id)
+    
+    async def _select(self, where) -> List[ModelT]:
+        await self.database.init()
+        query = select(self.table.c.data).order_by(self.table.c.created_at)
+        if where is not None:
+            query = query.where(where)
+        async with self.database.engine.connect() as conn:
+            rows = (await conn.execute(query)).all()
+        
+        now = time.monotonic()
+        items = [self.model.model_validate_json(row.data) for row in rows]
+        for item in items:
+            self._cache[item.id] = (now, item)
+        return items
+    
+    def _cached(self, item_id: str) -> Optional[ModelT]:
+        entry = self._cache.get(item_id)
+        if entry is None:
+            return None
+        cached_at, item = entry
+        if time.monotonic() - cached_at > self.cache_ttl:
+            del self._cache[item_id]
+            return None
+        return item
+    
+    async def _submit(self, op: str, payload: object):
+        """Queue a write and wait until the batch containing it commits"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((op, payload, future))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+        await future
+    
+    async def _flush(self):
+        # Let every writer that is already runnable join this batch
+        await asyncio.sleep(0)
+        try:
+            await self.database.init()
+            while self._pending:
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+                try:
+                    await self._write_batch(batch)
+                except Exception as e:
+                    self._fail(batch, e)
+                else:
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_result(None)
+        except Exception as e:
+            batch, self._pending = self._pending, []
+            self._fail(batch, e)
+        finally:
+            self._flush_task = None
+    
+    def _fail(self, batch: List[Tuple[str, object, asyncio.Future]], error: Exception):
+        """Propagate a write failure and forget cached values that never committed"""
+        for op, payload, future in batch:
+            if op == "upsert":
+                self._cache.pop(payload.id, None)
+            if not future.done():
+                future.set_exception(error)
+    
+    async def _write_batch(self, batch: List[Tuple[str, object, asyncio.Future]]):
+        """Apply a batch of writes in order within one transaction"""
+        self.flushes += 1
+        async with self.database.engine.begin() as conn:
+            upserts: Dict[str, dict] = {}
+            for op, payload, _ in batch:
+                if op == "upsert":
+                    upserts[payload.id] = self._to_row(payload)
+                    continue
+                # Flush earlier upserts so the delete sees them
+                await self._upsert_rows(conn, list(upserts.values()))
+                upserts = {}
+                await conn.execute(delete(self.table).where(self.table.c.id == payload))
+            await self._upsert_rows(conn, list(upserts.values()))
+    
+    async def _upsert_rows(self, conn, rows: List[dict]):
+        if not rows:
+            return
+        statement = insert(self.table)
+        await conn.execute(
+            statement.on_conflict_do_update(
+                index_elements=[self.table.c.id],
+                set_={
+                    "name": statement.excluded.name,
+                    "updated_at": statement.excluded.updated_at,
+                    "data": statement.excluded.data,
+                }
+            ),
+            rows
+        )
+    
+    @staticmethod
+    def _to_row(item: BaseModel) -> dict:
+        return {
+            "id": item.id,
+            "name": item.name,
+            "created_at": item.createdAt,
+            "updated_at": item.updatedAt,
+            "data": item.model_dump_json(),
+        }
+
+# Global repository instances
+_agent_repository: Optional[Repository[Agent]] = None
+_workflow_repository: Optional[Repository[Workflow]] = None
+_team_repository: Optional[Repository[Team]] = None
+
+def get_agent_repository() -> Repository[Agent]:
+    """Get or create the global agent repository"""
+    global _agent_repository
+    if _agent_repository is None:
+        _agent_repository = Repository(get_database(), agents_table, Agent)
+    return _agent_repository
+
+def get_workflow_repository() -> Repository[Workflow]:
+    """Get or create the global workflow repository"""
+    global _workflow_repository
+    if _workflow_repository is None:
+        _workflow_repository = Repository(get_database(), workflows_table, Workflow)
+    return _workflow_repository
+
+def get_team_repository() -> Repository[Team]:
+    """Get or create the global team repository"""
+    global _team_repository
+    if _team_repository is None:
+        _team_repository = Repository(get_database(), teams_table, Team)
+    return _team_repository
@@ -0,0 +1,168 @@
+"""
+Single-flight coalescing of identical in-flight LLM requests.
+While a request is running, identical requests wait on the same result
+instead of sending a duplicate generation to the provider.
+"""
+import asyncio
+import os
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Characters of a stream kept for late joiners to replay; once a stream has
+# produced more, identical requests start their own and chunks every reader
+# has passed are dropped
+LLM_COALESCE_REPLAY_CHARS = int(os.getenv("LLM_COALESCE_REPLAY_CHARS", "65536"))
+
+class _Flight:
+    """A shared in-flight request and the callers waiting on it"""
+    
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+        self.abandoned = False
+        # Streaming flights keep chunks so late joiners can replay them;
+        # start is the index of the first chunk still kept
+        self.chunks: Deque[str] = deque()
+        self.start = 0
+        self.produced = 0
+        self.joinable = True
+        # Index of the next chunk for each reader
+        self.positions: Dict[object, int] = {}
+        self.updated = asyncio.Event()
+    
+    @property
+    def end(self) -> int:
+        return self.start + len(self.chunks)
+    
+    def append(self, chunk: str, max_replay: int):
+        self.chunks.append(chunk)
+        self.produced += len(chunk)
+        if self.produced > max_replay:
+            self.joinable = False
+        self.trim()
+    
+    def trim(self):
+        """Drop chunks every reader has passed, once nobody new can join"""
+        if self.joinable:
+            return
+        low = min(self.positions.values(), default=self.end)
+        while self.start < low:
+            self.chunks.popleft()
+            self.start += 1
+    
+    def notify(self):
+        """Wake stream readers waiting for the next chunk"""
+        self.updated.set()
+        self.updated = asyncio.Event()
+    
+    def release(self):
+        """Drop one waiter; the request is cancelled once nobody is left"""
+        self.waiters -= 1
+        if self.waiters == 0 and self.task is not None and not self.task.done():
+            self.abandoned = True
+            self.task.cancel()
+
+class RequestCoalescer:
+    """Share one in-flight request between identical concurrent callers"""
+    
+    def __init__(self, max_replay: int = LLM_COALESCE_REPLAY_CHARS):
+        self.max_replay = max_replay
+        self._calls: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _Flight] = {}
+        self.stats = {"requests": 0, "coalesced": 0}
+    
+    async def call(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await the result for key, starting factory() only if no identical
+        request is already in flight.
+        
+        Cancelling one caller doesn't cancel the shared request while
+        other callers are still waiting for it.
+        """
+        flight = self._join(self._calls, key)
+        if flight.task is None:
+            flight.task = asyncio.create_task(factory())
+            self._forget_when_done(self._calls, key, flight)
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.release()
+    
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Yield the chunks for key, starting factory() only if no identical
+        stream is already in flight. Callers that join late receive the
+        chunks produced so far before live ones, as long as the stream
+        hasn't produced more than max_replay characters yet.
+        """
+        flight = self._join(self._streams, key)
+        if flight.task is None:
+            flight.task = asyncio.create_task(self._pump(flight, factory(), self.max_replay))
+            self._forget_when_done(self._streams, key, flight)
+        reader = object()
+        index = flight.start
+        flight.positions[reader] = index
+        try:
+            while True:
+                updated = flight.updated
+                if index < flight.end:
+                    chunk = flight.chunks[index - flight.start]
+                    index += 1
+                    flight.positions[reader] = index
+                    flight.trim()
+                    yield chunk
+                    continue
+                if flight.task.done():
+                    # Re-raise the producer's failure, if any
+                    flight.task.result()
+                    return
+                await updated.wait()
+        finally:
+            del flight.positions[reader]
+            flight.trim()
+            flight.release()
+    
+    def in_flight(self) -> int:
+        """Number of distinct requests currently running"""
+        return len(self._calls) + len(self._streams)
+    
+    def _join(self, flights: Dict[str, _Flight], key: str) -> _Flight:
+        flight = flights.get(key)
+        # A flight that was just cancelled, or streamed past what it keeps
+        # for replay, can't be joined; start a new one
+        if flight is None or flight.abandoned or not flight.joinable:
+            flight = _Flight()
+            flights[key] = flight
+            self.stats["requests"] += 1
+        else:
+            self.stats["coalesced"] += 1
+        flight.waiters += 1
+        return flight
+    
+    @staticmethod
+    def _forget_when_done(flights: Dict[str, _Flight], key: str, flight: _Flight):
+        def forget(_task: asyncio.Task):
+            if flights.get(key) is flight:
+                del flights[key]
+        flight.task.add_done_callback(forget)
+    
+    @staticmethod
+    async def _pump(flight: _Flight, stream: AsyncIterator[str], max_replay: int):
+        try:
+            async for chunk in stream:
+                flight.append(chunk, max_replay)
+                flight.notify()
+        finally:
+            flight.notify()
+
+# Global coalescer instance
+_request_coalescer: Optional[RequestCoalescer] = None
+
+def get_request_coalescer() -> RequestCoalescer:
+    """Get or create the global request coalescer"""
+    global _request_coalescer
+    if _request_coalescer is None:
+        _request_coalescer = RequestCoalescer()
+    return _request_coalescer
@@ -0,0 +1,138 @@
+"""
+Resource limits and usage sampling for sandbox worker processes.
+Applies rlimits to workers when they start, places them in a cgroup v2 group
+when one can be created, and reads /proc to track their memory and CPU use.
+"""
+import logging
+import os
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+SANDBOX_MAX_MEMORY_MB = int(os.getenv("SANDBOX_MAX_MEMORY_MB", "512"))
+# Share of one CPU a worker may use, enforced through cgroup cpu.max
+SANDBOX_MAX_CPU_PERCENT = int(os.getenv("SANDBOX_MAX_CPU_PERCENT", "50"))
+# CPU seconds a single task may consume
+SANDBOX_MAX_CPU_SECONDS = int(os.getenv("SANDBOX_MAX_CPU_SECONDS", "60"))
+SANDBOX_MAX_OPEN_FILES = int(os.getenv("SANDBOX_MAX_OPEN_FILES", "256"))
+SANDBOX_CGROUP_ROOT = os.getenv("SANDBOX_CGROUP_ROOT", "/sys/fs/cgroup/agent-orchestrator")
+
+CGROUP_CPU_PERIOD_US = 100000
+
+class ProcessSample(NamedTuple):
+    rss_mb: float
+    cpu_seconds: float
+
+def sample_process(pid: int) -> Optional[ProcessSample]:
+    """Read a process's RSS and CPU time from /proc/<pid>/stat in one read"""
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            data = stat.read()
+    except OSError:
+        return None
+    # The command name may contain spaces, so split after its closing paren
+    fields = data[data.rindex(")") + 2:].split()
+    ticks = os.sysconf("SC_CLK_TCK")
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / ticks
+    rss_mb = int(fields[21]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    return ProcessSample(rss_mb, cpu_seconds)
+
+class ResourceLimiter:
+    """Manage resource limits for agent execution"""
+    
+    def __init__(
+        self,
+        max_memory_mb: int = SANDBOX_MAX_MEMORY_MB,
+        max_cpu_percent: int = SANDBOX_MAX_CPU_PERCENT,
+        max_cpu_seconds: int = SANDBOX_MAX_CPU_SECONDS,
+        max_open_files: int = SANDBOX_MAX_OPEN_FILES,
+        cgroup_root: Optional[str] = SANDBOX_CGROUP_ROOT
+    ):
+        self.max_memory_mb = max_memory_mb
+        self.max_cpu_percent = max_cpu_percent
+        self.max_cpu_seconds = max_cpu_seconds
+        self.max_open_files = max_open_files
+        self.cgroup_root = Path(cgroup_root) if cgroup_root else None
+        self._cgroups_available: Optional[bool] = None
+    
+    def set_limits(self):
+        """
+        Set resource limits for the current process.
+        
+        Used as a preexec hook so the limits apply to a worker before it
+        runs anything. The CPU limit is a per-task budget the worker moves
+        forward before each task, so only the soft limit is set here.
+        """
+        if resource is None:
+            return
+        memory = self.max_memory_mb * 1024 * 1024
+        _lower_limit(resource.RLIMIT_AS, memory, memory)
+        _lower_limit(resource.RLIMIT_NOFILE, self.max_open_files, self.max_open_files)
+        _lower_limit(resource.RLIMIT_CPU, self.max_cpu_seconds, None)
+    
+    def check_limits(self, pid: Optional[int] = None) -> bool:
+        """Check if a process (default: the current one) is within the memory limit"""
+        sample = sample_process(pid or os.getpid())
+        return sample is None or sample.rss_mb <= self.max_memory_mb
+    
+    def attach_cgroup(self, pid: int) -> Optional[Path]:
+        """
+        Move a process into its own cgroup with memory.max and cpu.max set.
+        
+        Returns the cgroup directory, or None when cgroup v2 isn't writable
+        here (rlimits and sampling still apply).
+        """
+        if self.cgroup_root is None or self._cgroups_available is False:
+            return None
+        group = self.cgroup_root / f"worker-{pid}"
+        try:
+            if not self._cgroups_available:
+                self.cgroup_root.mkdir(exist_ok=True)
+                (self.cgroup_root / "cgroup.subtree_control").write_text("+memory +cpu")
+            group.mkdir(exist_ok=True)
+            (group / "memory.max").write_text(str(self.max_memory_mb * 1024 * 1024))
+            quota = max(1000, CGROUP_CPU_PERIOD_US * self.max_cpu_percent // 100)
+            (group / "cpu.max").write_text(f"{quota} {CGROUP_CPU_PERIOD_US}")
+            (group / "cgroup.procs").write_text(str(pid))
+        except OSError as e:
+            if self._cgroups_available is None:
+                logger.info(
+                    "cgroup v2 limits unavailable under %s (%s); using rlimits only",
+                    self.cgroup_root, e
+                )
+                self._cgroups_available = False
+            _remove_cgroup(group)
+            return None
+        self._cgroups_available = True
+        return group
+    
+    def release_cgroup(self, group: Optional[Path]):
+        """Remove a worker's cgroup once its process has exited"""
+        if group is not None:
+            _remove_cgroup(group)
+
+def _lower_limit(limit: int, soft: int, hard: Optional[int]):
+    """Lower a limit without raising it above what's already allowed"""
+    current_soft, current_hard = resource.getrlimit(limit)
+    if hard is None:
+        hard = current_hard
+    elif current_hard != resource.RLIM_INFINITY:
+        hard = min(hard, current_hard)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    try:
+        resource.setrlimit(limit, (soft, hard))
+    except (ValueError, OSError):
+        pass
+
+def _remove_cgroup(group: Path):
+    try:
+        group.rmdir()
+    except OSError:
+        pass
@@ -5,8 +5,14 @@ Supports multiple isolation methods: Docker containers, Python subprocess isolat
 import subprocess
 import asyncio
 import json
+import os
 from typing import Optional, Dict, Any
 from enum import Enum
+from app.services.sandbox_pool import get_sandbox_pool
+
+# Process sandboxing runs task code with resource limits but no filesystem
+# or network isolation, so it has to be switched on deliberately
+SANDBOX_PROCESS_ENABLED = os.getenv("SANDBOX_PROCESS_ENABLED", "false").lower() in ("1", "true", "yes")
 
 class SandboxType(str, Enum):
     DOCKER = "docker"
@@ -31,8 +37,10 @@ class SandboxExecutor:
         
         Args:
             agent_id: Unique identifier for the agent
-            task: The task to execute
-            context: Context data for the task
+            task: Python source to run (in process mode it is executed, not
+                a description of the work); the output is the value it
+                assigns to `result`, or else what it prints
+            context: Context data for the task, in scope as `context`
             timeout: Execution timeout in seconds
             
         Returns:
@@ -69,18 +77,29 @@ class SandboxExecutor:
         context: Dict[str, Any],
         timeout: int
     ) -> Dict[str, Any]:
-        """Execute in isolated Python process"""
+        """
+        Execute task as Python source on a pooled worker process.
+        
+        The output is the task's `result` variable if it sets one,
+        otherwise whatever it printed.
+        """
+        if not SANDBOX_PROCESS_ENABLED:
+            return {
+                "status": "error",
+                "output": "Process sandbox is disabled; set SANDBOX_PROCESS_ENABLED=true to run tasks",
+                "agent_id": agent_id,
+                "sandbox_type": "process"
+            }
         try:
-            # Create a safe execution environment
-            result = await asyncio.wait_for(
-                self._run_in_subprocess(task, context),
-                timeout=timeout
-            )
+            # The pool kills and replaces the worker if the task times out
+            result = await self._run_in_subprocess(task, context, timeout)
             return {
                 "status": "success",
-                "output": result,
+                "output": result["output"],
                 "agent_id": agent_id,
-                "sandbox_type": "process"
+                "sandbox_type": "process",
+                "peak_rss_mb": result["peak_rss_mb"],
+                "cpu_seconds": result["cpu_seconds"]
             }
         except asyncio.TimeoutError:
             return {
@@ -97,17 +116,17 @@ class SandboxExecutor:
                 "sandbox_type": "process"
             }
     
-    async def _run_in_subprocess(self, task: str, context: Dict[str, Any]) -> str:
-        """Run task in a subprocess with restricted permissions"""
-        # This is a simplified version. In production, you'd want:
+    async def _run_in_subprocess(
+        self,
+        task: str,
+        context: Dict[str, Any],
+        timeout: float
+    ) -> Dict[str, Any]:
+        """Run task on a warm, resource-limited worker from the sandbox pool"""
+        # Still to come (see sandbox_pool for what workers can reach):
         # 1. Restricted file system access
         # 2. Network isolation
-        # 3. Resource limits (CPU, memory)
-        # 4. Timeout enforcement
-        
-        # For now, just simulate execution
-        await asyncio.sleep(0.1)  # Simulate processing time
-        return f"Processed task: {task[:100]}..."
+        return await get_sandbox_pool().run(task, context, timeout)
     
     async def _execute_direct(
         self, 
@@ -125,23 +144,6 @@ class SandboxExecutor:
             "warning": "No sandboxing applied"
         }
 
-class ResourceLimiter:
-    """Manage resource limits for agent execution"""
-    
-    def __init__(self, max_memory_mb: int = 512, max_cpu_percent: int = 50):
-        self.max_memory_mb = max_memory_mb
-        self.max_cpu_percent = max_cpu_percent
-    
-    def set_limits(self):
-        """Set resource limits for the current process"""
-        # TODO: Implement actual resource limiting using cgroups or similar
-        pass
-    
-    def check_limits(self) -> bool:
-        """Check if current process is within limits"""
-        # TODO: Implement resource monitoring
-        return True
-
 # Global executor instance
 _executor: Optional[SandboxExecutor] = None
 
@@ -0,0 +1,419 @@
+"""
+Pool of sandbox worker processes, started on the first task.
+Workers stay warm between tasks so process-mode sandboxing doesn't pay
+interpreter startup per call; stuck or bloated workers are killed and replaced.
+
+Workers are confined by rlimits and, where available, a cgroup, and start
+with an empty environment apart from PATH and locale. They have no
+filesystem or network isolation: a task can read and write whatever the
+server's user can and open network connections.
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from app.services.resource_limits import ResourceLimiter, sample_process
+from app.services.sandbox_worker import FRAME_HEADER, MAX_FRAME_BYTES
+from app.services.shared_context import SharedContext, remove_stale_segments
+from app.services.tracing import get_tracer
+
+logger = logging.getLogger(__name__)
+
+SANDBOX_POOL_MIN_WORKERS = int(os.getenv("SANDBOX_POOL_MIN_WORKERS", "2"))
+SANDBOX_POOL_MAX_WORKERS = int(os.getenv("SANDBOX_POOL_MAX_WORKERS", "8"))
+# Recycle a worker after this many tasks or once its RSS grows past the limit
+SANDBOX_WORKER_MAX_TASKS = int(os.getenv("SANDBOX_WORKER_MAX_TASKS", "100"))
+SANDBOX_WORKER_MAX_RSS_MB = float(os.getenv("SANDBOX_WORKER_MAX_RSS_MB", "256"))
+# Workers above the minimum exit after being idle this long
+SANDBOX_POOL_IDLE_SECONDS = float(os.getenv("SANDBOX_POOL_IDLE_SECONDS", "60"))
+# How often a running task's memory and CPU are read from /proc
+SANDBOX_SAMPLE_INTERVAL = float(os.getenv("SANDBOX_SAMPLE_INTERVAL", "0.1"))
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+WORKER_START_TIMEOUT = 10.0
+# Passed through to workers; API keys and other settings are not
+WORKER_ENV_KEYS = ("PATH", "LANG", "LC_ALL", "TMPDIR", "SYSTEMROOT")
+
+class SandboxTaskError(Exception):
+    """A task raised an exception inside its worker"""
+
+class SandboxLimitError(SandboxTaskError):
+    """A task went over its memory limit and its worker was killed"""
+
+class SandboxWorker:
+    """One worker process and the pipes used to talk to it"""
+    
+    def __init__(self, process: asyncio.subprocess.Process, limiter: ResourceLimiter):
+        self.process = process
+        self.limiter = limiter
+        self.cgroup = limiter.attach_cgroup(process.pid)
+        self.tasks_run = 0
+        self.rss_mb = 0.0
+        self.last_used = time.monotonic()
+    
+    @classmethod
+    async def start(cls, limiter: ResourceLimiter) -> "SandboxWorker":
+        """Spawn a worker under the limiter's rlimits and wait until it reports ready"""
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-I", WORKER_SCRIPT,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            env={key: os.environ[key] for key in WORKER_ENV_KEYS if key in os.environ},
+            preexec_fn=limiter.set_limits if os.name == "posix" else None,
+        )
+        worker = cls(process, limiter)
+        try:
+            hello = await asyncio.wait_for(worker._read(), WORKER_START_TIMEOUT)
+        except BaseException:
+            await worker.kill()
+            raise
+        worker.rss_mb = hello.get("rss_mb", 0.0)
+        return worker
+    
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+    
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+    
+    async def run(
+        self,
+        request: Dict[str, Any],
+        timeout: float,
+        sample_interval: float = SANDBOX_SAMPLE_INTERVAL
+    ) -> Dict[str, Any]:
+        """
+        Send one task and wait for its reply, sampling the worker's memory
+        while it runs.
+        
+        Raises:
+            asyncio.TimeoutError: If no reply arrives within timeout
+            SandboxLimitError: If the worker's RSS goes over the memory limit
+        """
+        payload = json.dumps(request, default=str).encode("utf-8")
+        self.process.stdin.write(FRAME_HEADER.pack(len(payload)) + payload)
+        await self.process.stdin.drain()
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        reading = asyncio.ensure_future(self._read())
+        sampled_peak = 0.0
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                done, _ = await asyncio.wait({reading}, timeout=min(sample_interval, remaining))
+                if done:
+                    reply = reading.result()
+                    break
+                sample = sample_process(self.pid)
+                if sample is None:
+                    continue
+                sampled_peak = max(sampled_peak, sample.rss_mb)
+                if sample.rss_mb > self.limiter.max_memory_mb:
+                    raise SandboxLimitError(
+                        f"Task exceeded the {self.limiter.max_memory_mb} MB memory limit"
+                    )
+        finally:
+            if not reading.done():
+                reading.cancel()
+        
+        # Short tasks finish between samples; the worker reports its own peak
+        reply["peak_rss_mb"] = max(reply.get("peak_rss_mb", 0.0), sampled_peak)
+        self.tasks_run += 1
+        self.rss_mb = reply.get("rss_mb", self.rss_mb)
+        self.last_used = time.monotonic()
+        return reply
+    
+    async def kill(self):
+        if self.alive:
+            self.process.kill()
+        await self.process.wait()
+        self.limiter.release_cgroup(self.cgroup)
+        self.cgroup = None
+    
+    async def stop(self):
+        """Ask the worker to exit by closing its input, killing it if it doesn't"""
+        if self.alive:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), 2)
+            except asyncio.TimeoutError:
+                pass
+        await self.kill()
+    
+    async def _read(self) -> Dict[str, Any]:
+        try:
+            header = await self.process.stdout.readexactly(FRAME_HEADER.size)
+            (length,) = FRAME_HEADER.unpack(header)
+            if length > MAX_FRAME_BYTES:
+                raise RuntimeError(f"Sandbox worker sent an oversized frame ({length} bytes)")
+            payload = await self.process.stdout.readexactly(length)
+        except asyncio.IncompleteReadError:
+            raise RuntimeError("Sandbox worker exited unexpectedly")
+        return json.loads(payload)
+
+class SandboxPool:
+    """Hand tasks to warm workers, growing with queue depth up to a maximum"""
+    
+    def __init__(
+        self,
+        min_workers: int = SANDBOX_POOL_MIN_WORKERS,
+        max_workers: int = SANDBOX_POOL_MAX_WORKERS,
+        max_tasks: int = SANDBOX_WORKER_MAX_TASKS,
+        max_rss_mb: float = SANDBOX_WORKER_MAX_RSS_MB,
+        idle_seconds: float = SANDBOX_POOL_IDLE_SECONDS,
+        limiter: Optional[ResourceLimiter] = None
+    ):
+        self.limiter = limiter or ResourceLimiter()
+        self.min_workers = min_workers
+        self.max_workers = max(1, max_workers, min_workers)
+        self.max_tasks = max_tasks
+        self.max_rss_mb = max_rss_mb
+        self.idle_seconds = idle_seconds
+        self._idle: Deque[SandboxWorker] = deque()
+        self._busy: List[SandboxWorker] = []
+        # Workers that exist or are starting
+        self._size = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._background: Set[asyncio.Task] = set()
+        self._reaper: Optional[asyncio.Task] = None
+        self._closed = False
+        self._started = False
+        self._start_lock = asyncio.Lock()
+        self.stats = {
+            "tasks": 0,
+            "spawned": 0,
+            "recycled": 0,
+            "timeouts": 0,
+            "limit_kills": 0,
+            "shared_bytes": 0,
+        }
+    
+    async def start(self):
+        """Pre-fork the minimum number of workers; run() calls this on first use"""
+        self._closed = False
+        self._started = True
+        removed = remove_stale_segments()
+        if removed:
+            logger.info("Removed %d stale shared context segments", removed)
+        self._ensure_reaper()
+        starting = max(0, self.min_workers - self._size)
+        self._size += starting
+        await asyncio.gather(*(self._start_idle() for _ in range(starting)))
+    
+    async def run(self, task: str, context: Dict[str, Any], timeout: float = 300) -> Dict[str, Any]:
+        """
+        Run a task on a pooled worker.
+        
+        Large context values are passed through shared memory rather than
+        inline (see SharedContext) and removed once the task finishes.
+        
+        Returns:
+            The task's output with its peak RSS (MB) and CPU time (seconds)
+        
+        Raises:
+            asyncio.TimeoutError: If the task ran longer than timeout; the
+                worker is killed and replaced
+            SandboxLimitError: If the task went over the memory limit; the
+                worker is killed and replaced
+            SandboxTaskError: If the task raised an exception, including
+                running out of memory or CPU time inside the worker
+        """
+        if not self._started:
+            async with self._start_lock:
+                if not self._started:
+                    await self.start()
+        self._ensure_reaper()
+        with get_tracer().span("sandbox.task") as span, SharedContext(context) as shared:
+            self.stats["shared_bytes"] += shared.shared_bytes
+            result = await self._run_on_worker(task, shared.inline, timeout)
+            span.set(
+                shared_bytes=shared.shared_bytes,
+                output_bytes=len(str(result["output"]).encode("utf-8")),
+                peak_rss_mb=result["peak_rss_mb"],
+                cpu_seconds=result["cpu_seconds"],
+            )
+            return result
+    
+    async def _run_on_worker(self, task: str, context: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        worker = await self._acquire()
+        self.stats["tasks"] += 1
+        request = {"task": task, "context": context, "cpu_seconds": self.limiter.max_cpu_seconds}
+        try:
+            reply = await worker.run(request, timeout)
+        except SandboxLimitError:
+            self.stats["limit_kills"] += 1
+            logger.warning("Sandbox worker %s went over its memory limit; replacing it", worker.pid)
+            await self._discard(worker)
+            raise
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            logger.warning("Sandbox worker %s timed out after %ss; replacing it", worker.pid, timeout)
+            await self._discard(worker)
+            raise
+        except BaseException:
+            await self._discard(worker)
+            raise
+        self._release(worker)
+        
+        if reply.get("status") != "success":
+            raise SandboxTaskError(reply.get("error", "Task failed"))
+        return {
+            "output": reply.get("output", ""),
+            "peak_rss_mb": reply.get("peak_rss_mb", 0.0),
+            "cpu_seconds": reply.get("cpu_seconds", 0.0),
+        }
+    
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "workers": self._size,
+            "idle": len(self._idle),
+            "busy": len(self._busy),
+            "queued": len(self._waiters),
+        }
+    
+    async def close(self):
+        """Stop every worker"""
+        self._closed = True
+        self._started = False
+        for task in [*self._background, *([self._reaper] if self._reaper else [])]:
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        self._background.clear()
+        self._reaper = None
+        workers = [*self._idle, *self._busy]
+        self._idle.clear()
+        self._busy.clear()
+        self._size = 0
+        await asyncio.gather(*(worker.stop() for worker in workers), return_exceptions=True)
+    
+    async def _acquire(self) -> SandboxWorker:
+        while True:
+            while self._idle:
+                worker = self._idle.popleft()
+                if worker.alive:
+                    self._busy.append(worker)
+                    return worker
+                self._size -= 1
+            
+            if self._size < self.max_workers:
+                # Nothing idle: the queue is deep enough to justify another worker
+                self._size += 1
+                try:
+                    worker = await SandboxWorker.start(self.limiter)
+                except BaseException:
+                    self._size -= 1
+                    raise
+                self.stats["spawned"] += 1
+                self._busy.append(worker)
+                return worker
+            
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Pass the wake-up on to the next caller in line
+                    self._wake()
+                elif future in self._waiters:
+                    self._waiters.remove(future)
+                raise
+    
+    def _release(self, worker: SandboxWorker):
+        if worker not in self._busy:
+            # The pool was closed while the task ran
+            self._in_background(worker.stop())
+            return
+        self._busy.remove(worker)
+        if worker.tasks_run >= self.max_tasks or worker.rss_mb > self.max_rss_mb:
+            self.stats["recycled"] += 1
+            self._size -= 1
+            self._replace()
+            self._in_background(worker.stop())
+        else:
+            self._idle.append(worker)
+        self._wake()
+    
+    async def _discard(self, worker: SandboxWorker):
+        if worker in self._busy:
+            self._busy.remove(worker)
+            self._size -= 1
+            self._replace()
+            self._wake()
+        await worker.kill()
+    
+    def _replace(self):
+        """Start a worker in the background to keep the pool at its minimum"""
+        if self._size < self.min_workers and not self._closed:
+            self._size += 1
+            self._in_background(self._start_idle())
+    
+    async def _start_idle(self):
+        """Start an idle worker for a slot already counted in _size"""
+        try:
+            worker = await SandboxWorker.start(self.limiter)
+        except Exception:
+            self._size -= 1
+            logger.exception("Failed to start sandbox worker")
+            self._wake()
+            return
+        self.stats["spawned"] += 1
+        if self._closed:
+            self._size -= 1
+            await worker.stop()
+            return
+        self._idle.append(worker)
+        self._wake()
+    
+    def _wake(self):
+        """Let one queued caller retry now that a worker (or a slot) is free"""
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+    
+    def _in_background(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    def _ensure_reaper(self):
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap_idle())
+    
+    async def _reap_idle(self):
+        """Shrink back toward the minimum once extra workers sit idle"""
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_seconds / 2))
+            now = time.monotonic()
+            for worker in list(self._idle):
+                if self._size <= self.min_workers:
+                    break
+                if worker not in self._idle:
+                    continue
+                if now - worker.last_used > self.idle_seconds or not worker.alive:
+                    self._idle.remove(worker)
+                    self._size -= 1
+                    await worker.stop()
+
+# Global sandbox pool
+_sandbox_pool: Optional[SandboxPool] = None
+
+def get_sandbox_pool() -> SandboxPool:
+    """Get or create the global sandbox worker pool"""
+    global _sandbox_pool
+    if _sandbox_pool is None:
+        _sandbox_pool = SandboxPool()
+    return _sandbox_pool
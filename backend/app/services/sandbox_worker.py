@@ -0,0 +1,193 @@
+"""
+Long-lived sandbox worker process.
+Reads length-prefixed JSON task frames on stdin, executes each task as Python
+source and writes a length-prefixed JSON reply on stdout; the reply's output
+is the task's `result` variable if it sets one, otherwise what it printed. Started by the sandbox pool; it only
+uses the standard library so it starts quickly and runs in isolated mode.
+"""
+import contextlib
+import io
+import json
+import mmap
+import os
+import signal
+import struct
+import traceback
+from typing import Any, BinaryIO, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Every frame is a 4-byte big-endian length followed by that many bytes of JSON
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+# Marks a context value passed as a shared segment (see shared_context.py)
+HANDLE_KEY = "__shared__"
+
+def read_frame(stream: BinaryIO) -> Optional[Dict[str, Any]]:
+    """Read one frame, or None when the other side has closed the pipe"""
+    header = stream.read(FRAME_HEADER.size)
+    if len(header) < FRAME_HEADER.size:
+        return None
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame of {length} bytes exceeds the {MAX_FRAME_BYTES} byte limit")
+    payload = stream.read(length)
+    if len(payload) < length:
+        return None
+    return json.loads(payload)
+
+def write_frame(stream: BinaryIO, message: Dict[str, Any]):
+    payload = json.dumps(message, default=str).encode("utf-8")
+    stream.write(FRAME_HEADER.pack(len(payload)) + payload)
+    stream.flush()
+
+class CPUTimeExceeded(Exception):
+    """Raised inside a task when it uses up its CPU time budget"""
+
+def rss_mb() -> float:
+    """Current resident set size of this process in MB"""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+def peak_rss_mb() -> float:
+    """Peak resident set size since the last reset_peak_rss() in MB"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return 0.0
+    # Lifetime peak, in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def reset_peak_rss():
+    """Reset VmHWM so the next reading covers only the coming task"""
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+def cpu_seconds() -> float:
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def set_cpu_budget(seconds: Optional[float]):
+    """Move the soft CPU limit to `seconds` past current usage, or lift it"""
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = hard if not seconds else int(cpu_seconds() + seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    except (ValueError, OSError):
+        pass
+
+def attach_context(context: Dict[str, Any], maps: List[mmap.mmap]) -> Dict[str, Any]:
+    """
+    Replace shared segment handles with their values.
+    
+    Bytes values are exposed as the read-only mapping itself so large
+    payloads aren't copied; mappings are appended to maps for closing.
+    """
+    attached = {}
+    for key, value in context.items():
+        if not (isinstance(value, dict) and HANDLE_KEY in value):
+            attached[key] = value
+            continue
+        if not value["size"]:
+            attached[key] = "" if value["type"] == "str" else b""
+            continue
+        with open(value[HANDLE_KEY], "rb") as segment:
+            mapping = mmap.mmap(segment.fileno(), value["size"], access=mmap.ACCESS_READ)
+        if value["type"] == "str":
+            with mapping:
+                attached[key] = str(mapping[:], "utf-8")
+        else:
+            maps.append(mapping)
+            attached[key] = mapping
+    return attached
+
+def close_maps(maps: List[mmap.mmap]):
+    for mapping in maps:
+        try:
+            mapping.close()
+        except BufferError:
+            # The task kept a view into it; it's released with the view
+            pass
+
+def _on_cpu_limit(signum, frame):
+    raise CPUTimeExceeded("CPU time limit exceeded")
+
+def run_task(task: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run task as Python source with `context` in scope.
+    
+    The output is the value assigned to `result` if the task sets one,
+    otherwise whatever the task printed.
+    """
+    namespace: Dict[str, Any] = {"__name__": "__sandbox__", "context": context}
+    captured = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(captured):
+            exec(compile(task, "<task>", "exec"), namespace)
+    except MemoryError:
+        return {"status": "error", "error": "MemoryError: memory limit exceeded"}
+    except CPUTimeExceeded as e:
+        return {"status": "error", "error": f"CPUTimeExceeded: {e}"}
+    except BaseException:
+        return {"status": "error", "error": traceback.format_exc(limit=5)}
+    if "result" in namespace:
+        return {"status": "success", "output": str(namespace["result"])}
+    return {"status": "success", "output": captured.getvalue()}
+
+def main():
+    # Keep the IPC channel private: anything the task writes to fd 1 goes to stderr
+    channel_in = os.fdopen(os.dup(0), "rb")
+    channel_out = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    
+    if hasattr(signal, "SIGXCPU"):
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    set_cpu_budget(None)
+    
+    write_frame(channel_out, {"ready": True, "pid": os.getpid(), "rss_mb": rss_mb()})
+    while True:
+        request = read_frame(channel_in)
+        if request is None:
+            return
+        reset_peak_rss()
+        started = cpu_seconds()
+        set_cpu_budget(request.get("cpu_seconds"))
+        maps: List[mmap.mmap] = []
+        try:
+            context = attach_context(request.get("context") or {}, maps)
+            reply = run_task(request.get("task", ""), context)
+        except (OSError, ValueError, KeyError) as e:
+            reply = {"status": "error", "error": f"Couldn't attach shared context: {e!r}"}
+        finally:
+            close_maps(maps)
+            set_cpu_budget(None)
+        reply["cpu_seconds"] = round(cpu_seconds() - started, 4)
+        reply["peak_rss_mb"] = round(peak_rss_mb(), 2)
+        reply["rss_mb"] = rss_mb()
+        write_frame(channel_out, reply)
+
+if __name__ == "__main__":
+    main()
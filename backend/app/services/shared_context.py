@@ -0,0 +1,126 @@
+"""
+Shared-memory passing of large task context values to sandbox workers.
+Values above a size threshold are written once to a file in /dev/shm (or the
+temp directory) and sent by handle; workers map them instead of decoding JSON.
+"""
+import logging
+import os
+import tempfile
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Values at least this large (encoded) are passed by handle instead of inline
+SANDBOX_SHM_THRESHOLD_BYTES = int(os.getenv("SANDBOX_SHM_THRESHOLD_BYTES", "65536"))
+SANDBOX_SHM_DIR = os.getenv("SANDBOX_SHM_DIR") or (
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+)
+
+SEGMENT_PREFIX = "sandbox-ctx-"
+# Key marking a context value that was replaced by a shared segment handle
+HANDLE_KEY = "__shared__"
+
+class SharedContext:
+    """
+    A task context with its large values moved to shared segments.
+    
+    Use as a context manager; the segments are removed on exit whether or
+    not the task succeeded. Bytes values always travel by handle because
+    JSON can't carry them.
+    """
+    
+    def __init__(
+        self,
+        context: Dict[str, Any],
+        threshold: int = SANDBOX_SHM_THRESHOLD_BYTES,
+        directory: str = SANDBOX_SHM_DIR
+    ):
+        self.context = context
+        self.threshold = threshold
+        self.directory = directory
+        self.inline: Dict[str, Any] = {}
+        self.paths: List[str] = []
+        self.shared_bytes = 0
+    
+    def __enter__(self) -> "SharedContext":
+        try:
+            for key, value in self.context.items():
+                self.inline[key] = self._export(value)
+        except BaseException:
+            self.close()
+            raise
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def close(self):
+        """Remove every segment created for this context"""
+        for path in self.paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning("Couldn't remove shared context segment %s: %s", path, e)
+        self.paths = []
+    
+    def _export(self, value: Any) -> Any:
+        if isinstance(value, str):
+            # Cheap upper bound first so small strings aren't encoded twice
+            if len(value) * 4 < self.threshold:
+                return value
+            data = value.encode("utf-8")
+            if len(data) < self.threshold:
+                return value
+            return self._share(data, "str")
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return self._share(value, "bytes")
+        return value
+    
+    def _share(self, data, kind: str) -> Dict[str, Any]:
+        size = len(data)
+        if size == 0:
+            return {HANDLE_KEY: None, "type": kind, "size": 0}
+        fd, path = tempfile.mkstemp(prefix=f"{SEGMENT_PREFIX}{os.getpid()}-", dir=self.directory)
+        self.paths.append(path)
+        with os.fdopen(fd, "wb") as segment:
+            segment.write(data)
+        self.shared_bytes += size
+        return {HANDLE_KEY: path, "type": kind, "size": size}
+
+def remove_stale_segments(directory: str = SANDBOX_SHM_DIR) -> int:
+    """Delete segments left behind by processes that no longer exist"""
+    removed = 0
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return 0
+    for name in names:
+        if not name.startswith(SEGMENT_PREFIX):
+            continue
+        owner = _owner_pid(name)
+        if owner is None or owner == os.getpid() or _process_exists(owner):
+            continue
+        try:
+            os.unlink(os.path.join(directory, name))
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+def _owner_pid(name: str) -> Optional[int]:
+    try:
+        return int(name[len(SEGMENT_PREFIX):].split("-", 1)[0])
+    except ValueError:
+        return None
+
+def _process_exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists but belongs to someone else
+        return True
+    return True
@@ -0,0 +1,162 @@
+"""
+Token counting and context window sizes per model family.
+Tokenizers are built once per model and cached. OpenAI models use tiktoken
+when it's installed; other families use a calibrated bytes-per-token estimate.
+"""
+import logging
+import math
+import os
+from functools import lru_cache
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Context window assumed for models not listed below
+LLM_DEFAULT_CONTEXT_TOKENS = int(os.getenv("LLM_DEFAULT_CONTEXT_TOKENS", "8192"))
+# Ollama runs every model with num_ctx tokens of context, whatever the model
+# supports; it is sent with requests only when set
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "0")) or None
+OLLAMA_DEFAULT_NUM_CTX = 2048
+
+# Longest matching prefix of the lowercased model name wins
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4-1106": 128000,
+    "gpt-4-0125": 128000,
+    "gpt-4-32k": 32768,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "o1": 128000,
+    "o3": 200000,
+    "claude-instant": 100000,
+    "claude-2.0": 100000,
+    "claude": 200000,
+    "llama3.1": 131072,
+    "llama3.2": 131072,
+    "llama3": 8192,
+    "llama2": 4096,
+    "codellama": 16384,
+    "mistral": 32768,
+    "mixtral": 32768,
+    "qwen": 32768,
+    "gemma": 8192,
+    "phi3": 4096,
+}
+
+# UTF-8 bytes per token, measured on English prose; conservative so
+# estimates err towards more tokens
+_BYTES_PER_TOKEN = {
+    "openai": 4.0,
+    "anthropic": 3.5,
+    "llama": 3.6,
+    "mistral": 3.4,
+    "qwen": 3.3,
+    "default": 3.3,
+}
+
+class Tokenizer:
+    """Counts and cuts text in one model family's tokens"""
+    
+    def __init__(self, family: str, encoding=None):
+        self.family = family
+        self.encoding = encoding
+        self.bytes_per_token = _BYTES_PER_TOKEN.get(family, _BYTES_PER_TOKEN["default"])
+    
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return math.ceil(len(text.encode("utf-8")) / self.bytes_per_token)
+    
+    def head(self, text: str, tokens: int) -> str:
+        """The longest start of text that fits in tokens"""
+        if self.encoding is not None:
+            return self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:max(0, tokens)])
+        return text[:self._fitting_chars(text, tokens)]
+    
+    def tail(self, text: str, tokens: int) -> str:
+        """The longest end of text that fits in tokens"""
+        if tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            return self.encoding.decode(self.encoding.encode(text, disallowed_special=())[-tokens:])
+        chars = self._fitting_chars(text[::-1], tokens)
+        return text[len(text) - chars:]
+    
+    def split(self, text: str, tokens: int) -> List[str]:
+        """Cut text into consecutive pieces of at most tokens each, preferring line breaks"""
+        chunks = []
+        while text:
+            piece = self.head(text, tokens)
+            if len(piece) < len(text):
+                # Break at the last newline in the second half of the piece
+                cut = piece.rfind("\n", len(piece) // 2)
+                if cut > 0:
+                    piece = piece[:cut + 1]
+            if not piece:
+                piece = text[:1]
+            chunks.append(piece)
+            text = text[len(piece):]
+        return chunks
+    
+    def _fitting_chars(self, text: str, tokens: int) -> int:
+        if tokens <= 0:
+            return 0
+        if self.count(text) <= tokens:
+            return len(text)
+        # Start from the byte estimate and shrink until it fits, since
+        # multi-byte characters take more tokens than ASCII
+        chars = int(tokens * self.bytes_per_token)
+        while chars > 0 and self.count(text[:chars]) > tokens:
+            chars = int(chars * 0.9)
+        return chars
+
+def model_family(provider: str, model: str) -> str:
+    name = model.lower()
+    if provider == "openai" or name.startswith(("gpt-", "o1", "o3", "text-")):
+        return "openai"
+    if provider == "anthropic" or name.startswith("claude"):
+        return "anthropic"
+    if "llama" in name:
+        return "llama"
+    if "mistral" in name or "mixtral" in name:
+        return "mistral"
+    if "qwen" in name:
+        return "qwen"
+    return "default"
+
+@lru_cache(maxsize=None)
+def get_tokenizer(provider: str, model: str) -> Tokenizer:
+    """Get the cached tokenizer for a provider's model"""
+    family = model_family(provider, model)
+    encoding = _tiktoken_encoding(model) if family == "openai" else None
+    return Tokenizer(family, encoding)
+
+def context_window(provider: str, model: str, override: Optional[int] = None) -> int:
+    """Tokens of prompt plus completion the model accepts"""
+    if override:
+        return override
+    if provider == "ollama":
+        return OLLAMA_NUM_CTX or OLLAMA_DEFAULT_NUM_CTX
+    name = model.lower().split(":", 1)[0]
+    matches = [prefix for prefix in MODEL_CONTEXT_WINDOWS if name.startswith(prefix)]
+    if not matches:
+        return LLM_DEFAULT_CONTEXT_TOKENS
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)]
+
+def _tiktoken_encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base" if model.startswith(("gpt-4o", "o1", "o3")) else "cl100k_base")
+    except Exception as e:
+        # Encodings are downloaded on first use, which fails offline
+        logger.warning("tiktoken encoding for %s unavailable (%s); estimating tokens", model, e)
+        return None
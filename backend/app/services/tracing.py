@@ -0,0 +1,335 @@
+"""
+Per-execution tracing of workflow runs, nodes, LLM calls and sandbox tasks.
+Spans nest through a context variable and are exported as Chrome trace-event
+JSON (for Perfetto / chrome://tracing) or OTLP-JSON written to a local file.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Finished and running traces kept in memory for the trace endpoint
+TRACE_MAX_EXECUTIONS = int(os.getenv("TRACE_MAX_EXECUTIONS", "256"))
+# Directory for OTLP-JSON trace files; unset or empty disables writing them
+TRACE_OTLP_DIR = os.getenv("TRACE_OTLP_DIR") or None
+# OTLP-JSON files kept in TRACE_OTLP_DIR; the oldest are deleted past this
+TRACE_OTLP_MAX_FILES = int(os.getenv("TRACE_OTLP_MAX_FILES", "1000"))
+
+SERVICE_NAME = "agent-orchestrator"
+
+class Span:
+    """One timed operation within a trace"""
+    
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+    
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+    
+    def end(self, error: Optional[BaseException] = None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+    
+    @property
+    def duration_ns(self) -> int:
+        return (self.end_ns or time.time_ns()) - self.start_ns
+    
+    def __bool__(self) -> bool:
+        return True
+
+class _NullSpan:
+    """Stands in for a span when nothing is being traced"""
+    
+    def set(self, **attributes: Any):
+        pass
+    
+    def __bool__(self) -> bool:
+        return False
+
+NULL_SPAN = _NullSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+class Trace:
+    """All spans recorded for one workflow execution"""
+    
+    def __init__(self, execution_id: str):
+        self.execution_id = execution_id
+        try:
+            self.trace_id = uuid.UUID(execution_id).hex
+        except ValueError:
+            self.trace_id = uuid.uuid5(uuid.NAMESPACE_OID, execution_id).hex
+        self.spans: List[Span] = []
+    
+    def to_chrome(self) -> Dict[str, Any]:
+        """Chrome trace-event JSON; parallel nodes get their own rows"""
+        spans = sorted(self.spans, key=lambda span: span.start_ns)
+        origin = spans[0].start_ns if spans else 0
+        lanes = self._lanes(spans)
+        events = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 1,
+                "tid": lane,
+                "args": {"name": label},
+            }
+            for lane, label in sorted(self._lane_names(spans, lanes).items())
+        ]
+        for span in spans:
+            args = {key: _json_value(value) for key, value in span.attributes.items()}
+            if span.error:
+                args["error"] = span.error
+            events.append({
+                "name": span.name,
+                "cat": span.name.split(".")[0],
+                "ph": "X",
+                "ts": (span.start_ns - origin) / 1000,
+                "dur": span.duration_ns / 1000,
+                "pid": 1,
+                "tid": lanes[span.span_id],
+                "args": args,
+            })
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "execution_id": self.execution_id,
+                "trace_id": self.trace_id,
+                "critical_path": self.critical_path(),
+            },
+        }
+    
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP-JSON (the OpenTelemetry protobuf JSON mapping)"""
+        otlp_spans = []
+        for span in self.spans:
+            otlp_span = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns or time.time_ns()),
+                "attributes": [
+                    {"key": key, "value": _otlp_value(value)}
+                    for key, value in span.attributes.items()
+                ],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            otlp_spans.append(otlp_span)
+        return {
+            "resourceSpans": [{
+                "resource": {
+                    "attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]
+                },
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": otlp_spans,
+                }],
+            }]
+        }
+    
+    def critical_path(self) -> List[str]:
+        """
+        Node labels along the dependency chain that finished last.
+        
+        Starting from the node that ended last, repeatedly follow the
+        dependency that finished last, since it was the one being waited on.
+        """
+        nodes = {
+            span.attributes["node_id"]: span
+            for span in self.spans
+            if span.name == "workflow.node" and "node_id" in span.attributes
+        }
+        if not nodes:
+            return []
+        span = max(nodes.values(), key=lambda node: node.end_ns or 0)
+        path = []
+        while span is not None:
+            path.append(span.attributes.get("label", span.attributes["node_id"]))
+            parents = [nodes[node_id] for node_id in span.attributes.get("depends_on", []) if node_id in nodes]
+            span = max(parents, key=lambda node: node.end_ns or 0) if parents else None
+        return list(reversed(path))
+    
+    def _lanes(self, spans: List[Span]) -> Dict[str, int]:
+        """Give overlapping node spans separate rows; children share their node's row"""
+        by_id = {span.span_id: span for span in spans}
+        lane_ends: List[int] = []
+        lanes: Dict[str, int] = {}
+        for span in spans:
+            if span.name == "workflow.node":
+                end = span.end_ns or time.time_ns()
+                for index, lane_end in enumerate(lane_ends):
+                    if lane_end <= span.start_ns:
+                        lane_ends[index] = end
+                        lanes[span.span_id] = index + 1
+                        break
+                else:
+                    lane_ends.append(end)
+                    lanes[span.span_id] = len(lane_ends)
+        for span in spans:
+            if span.span_id in lanes:
+                continue
+            ancestor = by_id.get(span.parent_id)
+            while ancestor is not None and ancestor.span_id not in lanes:
+                ancestor = by_id.get(ancestor.parent_id)
+            lanes[span.span_id] = lanes[ancestor.span_id] if ancestor is not None else 0
+        return lanes
+    
+    @staticmethod
+    def _lane_names(spans: List[Span], lanes: Dict[str, int]) -> Dict[int, str]:
+        names = {0: "workflow"}
+        for span in spans:
+            if span.name == "workflow.node":
+                names.setdefault(lanes[span.span_id], f"node lane {lanes[span.span_id]}")
+        return names
+
+class Tracer:
+    """Record spans for executions and keep recent traces for export"""
+    
+    def __init__(
+        self,
+        max_traces: int = TRACE_MAX_EXECUTIONS,
+        otlp_dir: Optional[str] = TRACE_OTLP_DIR,
+        max_otlp_files: int = TRACE_OTLP_MAX_FILES
+    ):
+        self.max_traces = max_traces
+        self.otlp_dir = Path(otlp_dir) if otlp_dir else None
+        self.max_otlp_files = max_otlp_files
+        self._traces: "OrderedDict[str, Trace]" = OrderedDict()
+        # Written OTLP files, oldest first; loaded from otlp_dir on first write
+        self._otlp_files: Optional[Deque[Path]] = None
+    
+    def get(self, execution_id: str) -> Optional[Trace]:
+        return self._traces.get(execution_id)
+    
+    @asynccontextmanager
+    async def trace(self, execution_id: str, name: str, **attributes: Any) -> AsyncIterator[Span]:
+        """Start a trace whose root span covers the block; spans inside nest under it"""
+        trace = Trace(execution_id)
+        self._traces[execution_id] = trace
+        while len(self._traces) > self.max_traces:
+            self._traces.popitem(last=False)
+        
+        span = Span(trace, name, None, attributes)
+        trace.spans.append(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(e)
+            raise
+        finally:
+            span.end()
+            _current_span.reset(token)
+            if self.otlp_dir is not None:
+                await asyncio.to_thread(self._write_otlp, trace)
+    
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        parent: Optional[Span] = None,
+        activate: bool = True,
+        **attributes: Any
+    ) -> Iterator[Any]:
+        """
+        Time the block as a child of parent (default: the current span).
+        
+        Nothing is recorded outside a trace. Pass activate=False inside
+        async generators, which may resume in another task's context; the
+        span is then only a parent when passed explicitly.
+        """
+        parent = parent if parent is not None else _current_span.get()
+        if not parent:
+            yield NULL_SPAN
+            return
+        span = Span(parent.trace, name, parent.span_id, attributes)
+        parent.trace.spans.append(span)
+        token = _current_span.set(span) if activate else None
+        try:
+            yield span
+        except GeneratorExit:
+            # A stream closed early by its consumer isn't a failure
+            raise
+        except BaseException as e:
+            span.end(e)
+            raise
+        finally:
+            span.end()
+            if token is not None:
+                _current_span.reset(token)
+    
+    def _write_otlp(self, trace: Trace):
+        try:
+            self.otlp_dir.mkdir(parents=True, exist_ok=True)
+            if self._otlp_files is None:
+                existing = sorted(self.otlp_dir.glob("*.json"), key=lambda path: path.stat().st_mtime)
+                self._otlp_files = deque(existing)
+            path = self.otlp_dir / f"{trace.execution_id}.json"
+            path.write_text(json.dumps(trace.to_otlp()), encoding="utf-8")
+        except OSError as e:
+            logger.warning("Couldn't write OTLP trace for %s: %s", trace.execution_id, e)
+            return
+        if path in self._otlp_files:
+            self._otlp_files.remove(path)
+        self._otlp_files.append(path)
+        while self.max_otlp_files and len(self._otlp_files) > self.max_otlp_files:
+            try:
+                self._otlp_files.popleft().unlink()
+            except OSError:
+                pass
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_json_value(item) for item in value]
+    return str(value)
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # OTLP-JSON encodes 64-bit integers as strings
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+# Global tracer instance
+_tracer: Optional[Tracer] = None
+
+def get_tracer() -> Tracer:
+    """Get or create the global tracer"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
@@ -3,170 +3,764 @@ Workflow execution engine for orchestrating agent teams.
 Handles workflow execution, agent coordination, and result aggregation.
 """
 import asyncio
-from typing import Dict, Any, List, Optional
+import os
+import time
+from collections import deque
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 from datetime import datetime
 import uuid
 
-from app.models import Workflow, Agent, ExecutionLog, LLMConfig
+from app.models import Workflow, Agent, BatchInput, ExecutionLog, LLMConfig
+from app.services.admission import AdmissionTicket, ExecutionAdmission, Priority
+from app.services.blob_store import BlobStore, get_blob_store
+from app.services.checkpoint_store import CheckpointStore, get_checkpoint_store, node_fingerprint
+from app.services.llm_cache import get_llm_cache
+from app.services.llm_errors import LLMError
 from app.services.llm_service import LLMService
+from app.services.log_broker import LogBroker
+from app.services.log_store import LogStore
+from app.services.metrics import get_metrics
+from app.services.model_scheduler import AffinityKey, ModelAffinityScheduler
+from app.services.ollama_models import get_ollama_models, model_key
+from app.services.prompt_budget import PromptBudget
 from app.services.sandbox import get_executor, SandboxType
+from app.services.tracing import Span, get_tracer
+
+# Concurrency limits for independent agent nodes
+DEFAULT_RUN_CONCURRENCY = int(os.getenv("WORKFLOW_MAX_PARALLEL_NODES", "4"))
+DEFAULT_GLOBAL_CONCURRENCY = int(os.getenv("WORKFLOW_GLOBAL_MAX_CONCURRENCY", "16"))
+# Executions run at once by a batch
+DEFAULT_BATCH_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+# Finished executions kept in active_executions for status and resume
+EXECUTION_HISTORY_MAX = int(os.getenv("EXECUTION_HISTORY_MAX", "1000"))
 
 class WorkflowExecutor:
     """Execute workflows by coordinating multiple agents"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_GLOBAL_CONCURRENCY,
+        checkpoints: Optional[CheckpointStore] = None,
+        admission: Optional[ExecutionAdmission] = None,
+        blobs: Optional[BlobStore] = None,
+        max_finished: int = EXECUTION_HISTORY_MAX
+    ):
         self.active_executions: Dict[str, dict] = {}
-        self.execution_logs: List[ExecutionLog] = []
+        # Finished execution IDs, oldest first, evicted past max_finished
+        self._finished: Dict[str, None] = {}
+        self.max_finished = max_finished
+        # Node outputs reused by incremental runs; None disables checkpointing
+        self.checkpoints = checkpoints
+        # Large node outputs are moved here and returned as references;
+        # None keeps every output inline
+        self.blobs = blobs
+        # Running slots and the bounded queue in front of them
+        self.admission = admission or ExecutionAdmission()
+        self._tickets: Dict[str, AdmissionTicket] = {}
+        # Task running each admitted execution, cancelled by cancel()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.log_store = LogStore()
+        self.log_broker = LogBroker()
+        # Slots shared across all executions handled by this executor,
+        # handed out so local model hosts aren't made to swap models
+        self.scheduler = ModelAffinityScheduler(max_concurrency)
+        # Ready agent nodes waiting for a concurrency slot
+        self.nodes_waiting = 0
     
     async def execute_workflow(
         self,
         workflow: Workflow,
         agents: Dict[str, Agent],
         initial_input: str,
-        sandbox_type: SandboxType = SandboxType.PROCESS
+        sandbox_type: SandboxType = SandboxType.PROCESS,
+        max_concurrency: Optional[int] = None,
+        incremental: bool = False,
+        execution_id: Optional[str] = None,
+        priority: Priority = "interactive"
     ) -> Dict[str, Any]:
         """
         Execute a workflow with the given agents.
         
+        The run waits for an execution slot first, unless one was already
+        reserved for execution_id with admit().
+        
         Args:
             workflow: The workflow to execute
             agents: Dictionary of available agents
             initial_input: Initial input to the workflow
             sandbox_type: Type of sandbox to use
-            
+            max_concurrency: Max agents run at once for this execution
+                (defaults to WORKFLOW_MAX_PARALLEL_NODES)
+            incremental: Reuse checkpointed node outputs whose agent config
+                and input are unchanged; nodes that run are checkpointed either way
+            execution_id: ID to run under, e.g. the queued job's (generated
+                if not given)
+            priority: Admission class when no slot was reserved; interactive
+                runs are started ahead of batch runs
+        
         Returns:
             Execution results and metadata
         """
-        execution_id = str(uuid.uuid4())
-        start_time = datetime.now()
+        execution_id = execution_id or str(uuid.uuid4())
+        if execution_id not in self._tickets:
+            execution = self.active_executions.get(execution_id)
+            if execution is not None and execution["status"] == "cancelled":
+                # Cancelled while its reserved slot was still queued
+                self._retire(execution_id)
+                return {"execution_id": execution_id, "status": "cancelled", "error": "Cancelled"}
+            self.admit(workflow, initial_input, priority, execution_id, bounded=False)
         
+        # Run in a task of its own so cancel() stops only this execution
+        task = asyncio.create_task(self._execute_admitted(
+            workflow, agents, initial_input, max_concurrency, incremental, execution_id
+        ))
+        self._tasks[execution_id] = task
+        try:
+            return await task
+        finally:
+            self._tasks.pop(execution_id, None)
+    
+    def admit(
+        self,
+        workflow: Workflow,
+        initial_input: str,
+        priority: Priority = "interactive",
+        execution_id: Optional[str] = None,
+        bounded: bool = True
+    ) -> str:
+        """
+        Reserve an execution slot, or a place in the queue for one, ahead of
+        execute_workflow(execution_id=...).
+        
+        Returns:
+            The execution ID
+        
+        Raises:
+            AdmissionRejected: If bounded and the execution queue is full
+        """
+        execution_id = execution_id or str(uuid.uuid4())
+        self._tickets[execution_id] = self.admission.enqueue(
+            execution_id, workflow.id, priority, workflow.maxConcurrentRuns, bounded
+        )
+        self._finished.pop(execution_id, None)
         self.active_executions[execution_id] = {
             "workflow_id": workflow.id,
-            "status": "running",
-            "start_time": start_time
+            "status": "queued",
+            "priority": priority,
+            "queued_at": datetime.now(),
+            # Kept for resume until the execution completes
+            "initial_input": initial_input
         }
+        return execution_id
+    
+    def cancel(self, execution_id: str) -> bool:
+        """
+        Cancel a queued or running execution. Its in-flight LLM and sandbox
+        calls are cancelled straight away, freeing their slots.
         
-        self._log(workflow.id, None, "info", f"Starting workflow execution: {workflow.name}")
-        
+        Returns:
+            False if the execution isn't queued or running
+        """
+        execution = self.active_executions.get(execution_id)
+        if execution is None or execution["status"] not in ("queued", "running"):
+            return False
+        execution["status"] = "cancelled"
+        get_metrics().executions_cancelled.inc()
+        task = self._tasks.get(execution_id)
+        if task is not None:
+            task.cancel()
+        else:
+            # Admitted but not started yet
+            self.admission.release(self._tickets.pop(execution_id))
+        return True
+    
+    def queue_position(self, execution_id: str) -> Optional[int]:
+        """1-based place of a queued execution in the admission queue"""
+        ticket = self._tickets.get(execution_id)
+        return self.admission.position(ticket) if ticket is not None else None
+    
+    async def _execute_admitted(
+        self,
+        workflow: Workflow,
+        agents: Dict[str, Agent],
+        initial_input: str,
+        max_concurrency: Optional[int],
+        incremental: bool,
+        execution_id: str
+    ) -> Dict[str, Any]:
+        execution = self.active_executions[execution_id]
+        ticket = self._tickets[execution_id]
         try:
-            # Get execution order from workflow nodes and edges
-            execution_plan = self._create_execution_plan(workflow)
-            
-            # Execute agents in order
-            results = {}
-            current_input = initial_input
-            
-            for step in execution_plan:
-                agent_id = step.get("agent_id")
-                if not agent_id or agent_id not in agents:
-                    continue
+            await self.admission.wait(ticket)
+            return await self._run_execution(
+                workflow, agents, initial_input, max_concurrency, incremental, execution_id
+            )
+        except asyncio.CancelledError:
+            if execution["status"] != "cancelled":
+                raise
+            self._log(workflow.id, None, "warning", "Workflow execution cancelled", execution_id)
+            return {"execution_id": execution_id, "status": "cancelled", "error": "Cancelled"}
+        finally:
+            self._tickets.pop(execution_id, None)
+            self.admission.release(ticket)
+            self._retire(execution_id)
+    
+    def _retire(self, execution_id: str):
+        """Drop what a finished execution no longer needs, and the oldest finished executions"""
+        execution = self.active_executions.get(execution_id)
+        if execution is not None and execution["status"] == "completed":
+            # Only failed and cancelled executions can be resumed
+            execution.pop("initial_input", None)
+        self._finished.pop(execution_id, None)
+        self._finished[execution_id] = None
+        while len(self._finished) > self.max_finished:
+            oldest = next(iter(self._finished))
+            del self._finished[oldest]
+            self.active_executions.pop(oldest, None)
+    
+    async def _run_execution(
+        self,
+        workflow: Workflow,
+        agents: Dict[str, Agent],
+        initial_input: str,
+        max_concurrency: Optional[int],
+        incremental: bool,
+        execution_id: str
+    ) -> Dict[str, Any]:
+        start_time = datetime.now()
+        self.active_executions[execution_id].update(status="running", start_time=start_time)
+        
+        self._log(workflow.id, None, "info", f"Starting workflow execution: {workflow.name}", execution_id)
+        
+        async with get_tracer().trace(
+            execution_id, "workflow.run", workflow_id=workflow.id, workflow_name=workflow.name
+        ) as run_span:
+            try:
+                # Get execution order from workflow nodes and edges
+                execution_plan = self._create_execution_plan(workflow)
                 
-                agent = agents[agent_id]
-                self._log(workflow.id, agent_id, "info", f"Executing agent: {agent.name}")
+                # Load the run's Ollama models up front and keep them loaded
+                # until it finishes, so no step waits on a cold load
+                models = {
+                    (agent.llmProvider, agent.modelName, agent.contextWindow): agent
+                    for agent in (agents.get(step["agent_id"]) for step in execution_plan)
+                    if agent is not None
+                }
+                async with get_ollama_models().pinned(self._llm_config(agent) for agent in models.values()):
+                    # Execute agents as their dependencies complete
+                    results = await self._run_plan(
+                        workflow,
+                        execution_id,
+                        execution_plan,
+                        agents,
+                        initial_input,
+                        max_concurrency or DEFAULT_RUN_CONCURRENCY,
+                        incremental
+                    )
+                final_output = self._collect_final_output(execution_plan, results, initial_input)
+                if self.blobs is not None:
+                    results = {node_id: await self.blobs.offload(output) for node_id, output in results.items()}
+                    final_output = await self.blobs.offload(final_output)
                 
-                # Create LLM service for the agent
-                llm_config = LLMConfig(
-                    provider=agent.llmProvider,
-                    modelName=agent.modelName,
-                    temperature=agent.temperature,
-                    maxTokens=agent.maxTokens
-                )
+                # Mark execution as complete
+                end_time = datetime.now()
+                duration = (end_time - start_time).total_seconds()
                 
-                llm_service = LLMService(llm_config)
+                self.active_executions[execution_id]["status"] = "completed"
+                self.active_executions[execution_id]["end_time"] = end_time
+                run_span.set(status="completed")
                 
-                try:
-                    # Generate response using LLM
-                    response = await llm_service.generate(
-                        prompt=current_input,
-                        system_prompt=agent.systemPrompt
-                    )
-                    
-                    results[agent_id] = response
-                    current_input = response  # Pass output to next agent
-                    
-                    self._log(
-                        workflow.id, 
-                        agent_id, 
-                        "info", 
-                        f"Agent completed: {len(response)} chars generated"
-                    )
-                    
-                finally:
-                    await llm_service.close()
-            
-            # Mark execution as complete
-            end_time = datetime.now()
-            duration = (end_time - start_time).total_seconds()
-            
-            self.active_executions[execution_id]["status"] = "completed"
-            self.active_executions[execution_id]["end_time"] = end_time
-            
-            self._log(workflow.id, None, "info", f"Workflow completed in {duration:.2f}s")
-            
-            return {
-                "execution_id": execution_id,
-                "status": "completed",
-                "results": results,
-                "duration": duration,
-                "final_output": current_input
-            }
-            
-        except Exception as e:
-            self.active_executions[execution_id]["status"] = "error"
-            self._log(workflow.id, None, "error", f"Workflow execution failed: {str(e)}")
+                self._log(workflow.id, None, "info", f"Workflow completed in {duration:.2f}s", execution_id)
+                
+                return {
+                    "execution_id": execution_id,
+                    "status": "completed",
+                    "results": results,
+                    "duration": duration,
+                    "final_output": final_output
+                }
             
-            return {
-                "execution_id": execution_id,
-                "status": "error",
-                "error": str(e)
-            }
+            except Exception as e:
+                self.active_executions[execution_id]["status"] = "error"
+                run_span.set(status="error", error=str(e))
+                self._log(workflow.id, None, "error", f"Workflow execution failed: {str(e)}", execution_id)
+                
+                return {
+                    "execution_id": execution_id,
+                    "status": "error",
+                    "error": str(e)
+                }
     
     def _create_execution_plan(self, workflow: Workflow) -> List[Dict[str, Any]]:
         """
         Create an execution plan from workflow nodes and edges.
         
-        For now, this returns a simple sequential plan.
-        In the future, this should analyze the graph structure to:
-        - Detect parallel execution opportunities
-        - Handle conditional branches
-        - Manage loops and cycles
+        Returns the agent nodes in topological order. Each step lists the
+        agent nodes it depends on; non-agent nodes (start/end markers) are
+        collapsed so their upstream agents feed their downstream agents
+        directly. Workflows without any edges keep the original behaviour
+        of chaining agent nodes in declaration order.
+        
+        Raises:
+            ValueError: If an edge references an unknown node or the graph
+                contains a cycle
         """
-        plan = []
+        agent_nodes = [node for node in workflow.nodes if node.data.agentId]
         
-        # Find nodes with agent_id
-        for node in workflow.nodes:
+        if not workflow.edges:
+            plan = []
+            previous: Optional[str] = None
+            for node in agent_nodes:
+                plan.append({
+                    "node_id": node.id,
+                    "agent_id": node.data.agentId,
+                    "label": node.data.label,
+                    "type": node.type,
+                    "depends_on": [previous] if previous else []
+                })
+                previous = node.id
+            return plan
+        
+        nodes_by_id = {node.id: node for node in workflow.nodes}
+        parents: Dict[str, List[str]] = {node_id: [] for node_id in nodes_by_id}
+        children: Dict[str, List[str]] = {node_id: [] for node_id in nodes_by_id}
+        
+        for edge in workflow.edges:
+            for endpoint in (edge.source, edge.target):
+                if endpoint not in nodes_by_id:
+                    raise ValueError(f"Edge {edge.id} references unknown node: {endpoint}")
+            if edge.source not in parents[edge.target]:
+                parents[edge.target].append(edge.source)
+                children[edge.source].append(edge.target)
+        
+        # Kahn's algorithm, seeded in declaration order for a stable plan
+        in_degree = {node_id: len(parents[node_id]) for node_id in nodes_by_id}
+        ready = deque(node.id for node in workflow.nodes if in_degree[node.id] == 0)
+        order: List[str] = []
+        while ready:
+            node_id = ready.popleft()
+            order.append(node_id)
+            for child in children[node_id]:
+                in_degree[child] -= 1
+                if in_degree[child] == 0:
+                    ready.append(child)
+        
+        if len(order) != len(nodes_by_id):
+            cyclic = [node_id for node_id in nodes_by_id if in_degree[node_id] > 0]
+            raise ValueError(f"Workflow contains a cycle involving nodes: {', '.join(cyclic)}")
+        
+        # Resolve each node's nearest upstream agent nodes, looking through
+        # non-agent nodes. Topological order guarantees parents are resolved first.
+        agent_sources: Dict[str, List[str]] = {}
+        plan = []
+        for node_id in order:
+            node = nodes_by_id[node_id]
+            upstream: List[str] = []
+            for parent_id in parents[node_id]:
+                if nodes_by_id[parent_id].data.agentId:
+                    candidates = [parent_id]
+                else:
+                    candidates = agent_sources[parent_id]
+                for candidate in candidates:
+                    if candidate not in upstream:
+                        upstream.append(candidate)
+            
             if node.data.agentId:
                 plan.append({
                     "node_id": node.id,
                     "agent_id": node.data.agentId,
-                    "type": node.type
+                    "label": node.data.label,
+                    "type": node.type,
+                    "depends_on": upstream
                 })
+            else:
+                agent_sources[node_id] = upstream
         
         return plan
     
+    async def _run_plan(
+        self,
+        workflow: Workflow,
+        execution_id: str,
+        plan: List[Dict[str, Any]],
+        agents: Dict[str, Agent],
+        initial_input: str,
+        max_concurrency: int,
+        incremental: bool = False
+    ) -> Dict[str, str]:
+        """
+        Run every step of the plan as soon as its dependencies finish.
+        
+        Ready steps run concurrently, bounded by both the per-run limit and
+        the executor-wide limit. If any step fails the remaining steps are
+        cancelled and the error is re-raised.
+        
+        Every agent step's output is checkpointed as it finishes. In
+        incremental mode a step whose fingerprint matches its checkpoint
+        reuses the stored output. A changed output changes the inputs of the
+        steps below it, so everything downstream of an edit reruns.
+        
+        With a blob store, a large output is moved into it once every step
+        below has read it, so only its reference stays in memory.
+        
+        Returns:
+            Outputs, or blob references for large outputs that fed other
+            steps, keyed by node ID
+        """
+        run_semaphore = asyncio.Semaphore(max_concurrency)
+        labels = {step["node_id"]: step["label"] for step in plan}
+        results: Dict[str, Any] = {}
+        # Steps yet to read each node's output
+        readers: Dict[str, int] = {}
+        for step in plan:
+            for parent_id in step["depends_on"]:
+                readers[parent_id] = readers.get(parent_id, 0) + 1
+        tasks: Dict[str, asyncio.Task] = {}
+        checkpoints = self.checkpoints
+        # Only incremental runs reuse checkpoints; every run writes them
+        saved = await checkpoints.load(workflow.id) if checkpoints is not None and incremental else {}
+        
+        async def run_agent(agent: Agent, step_input: str, span: Span) -> str:
+            waiting = True
+            self.nodes_waiting += 1
+            queued = time.monotonic()
+            try:
+                async with run_semaphore, self.scheduler.slot(self._affinity_key(agent)):
+                    waiting = False
+                    self.nodes_waiting -= 1
+                    span.set(queued_ms=round((time.monotonic() - queued) * 1000, 1))
+                    return await self._run_agent(workflow, execution_id, agent, step_input)
+            finally:
+                if waiting:
+                    self.nodes_waiting -= 1
+        
+        async def run_step(step: Dict[str, Any]):
+            parent_tasks = [tasks[parent_id] for parent_id in step["depends_on"]]
+            if parent_tasks:
+                await asyncio.gather(*parent_tasks)
+            step_input = self._join_inputs(
+                [(labels[parent_id], results[parent_id]) for parent_id in step["depends_on"]],
+                initial_input
+            )
+            if self.blobs is not None:
+                for parent_id in step["depends_on"]:
+                    readers[parent_id] -= 1
+                    if not readers[parent_id]:
+                        results[parent_id] = await self.blobs.offload(results[parent_id])
+            
+            with get_tracer().span(
+                "workflow.node",
+                node_id=step["node_id"],
+                label=step["label"],
+                agent_id=step["agent_id"],
+                depends_on=step["depends_on"],
+                input_bytes=len(step_input.encode("utf-8")),
+            ) as span:
+                agent = agents.get(step["agent_id"])
+                if agent is None:
+                    # Unknown agents pass their input through unchanged
+                    output = step_input
+                elif checkpoints is None:
+                    output = await run_agent(agent, step_input, span)
+                else:
+                    fingerprint = node_fingerprint(agent, step_input)
+                    checkpoint = saved.get(step["node_id"])
+                    if checkpoint is not None and checkpoint[0] == fingerprint:
+                        output = checkpoint[1]
+                        span.set(reused=True)
+                        get_metrics().nodes_reused.inc()
+                        self._log(
+                            workflow.id,
+                            agent.id,
+                            "info",
+                            f"Reusing checkpointed output for node: {step['label']}",
+                            execution_id
+                        )
+                    else:
+                        output = await run_agent(agent, step_input, span)
+                        # Saved as each node finishes so a failed run resumes from here
+                        await checkpoints.save(
+                            workflow.id, step["node_id"], fingerprint, output, execution_id
+                        )
+                span.set(output_bytes=len(output.encode("utf-8")))
+            
+            results[step["node_id"]] = output
+        
+        for step in plan:
+            tasks[step["node_id"]] = asyncio.create_task(run_step(step))
+        
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        
+        return results
+    
+    @staticmethod
+    def _llm_config(agent: Agent) -> LLMConfig:
+        config = LLMConfig(
+            provider=agent.llmProvider,
+            modelName=agent.modelName,
+            temperature=agent.temperature,
+            maxTokens=agent.maxTokens,
+            contextWindow=agent.contextWindow,
+            fallbacks=agent.fallbacks
+        )
+        # Keep pinned models loaded between this run's requests
+        return get_ollama_models().run_config(config)
+    
+    def _affinity_key(self, agent: Agent) -> AffinityKey:
+        """Local Ollama hosts hold few models at once, so their nodes are grouped by model"""
+        if agent.llmProvider != "ollama":
+            return None
+        return model_key(agent.modelName)
+    
+    async def _run_agent(
+        self,
+        workflow: Workflow,
+        execution_id: str,
+        agent: Agent,
+        prompt: str
+    ) -> str:
+        """Run a single agent against its input and return the response"""
+        self._log(workflow.id, agent.id, "info", f"Executing agent: {agent.name}", execution_id)
+        
+        # Create LLM service for the agent
+        cache = get_llm_cache() if self._should_cache(agent) else None
+        llm_service = LLMService(self._llm_config(agent), cache=cache)
+        
+        started = time.monotonic()
+        status = "error"
+        
+        async def stream(part: str) -> str:
+            # Stream the response so time-to-first-token is visible
+            chunks: List[str] = []
+            async for chunk in llm_service.generate_stream(
+                prompt=part,
+                system_prompt=agent.systemPrompt
+            ):
+                if not chunks:
+                    self._log(
+                        workflow.id,
+                        agent.id,
+                        "debug",
+                        f"First token after {time.monotonic() - started:.2f}s",
+                        execution_id
+                    )
+                chunks.append(chunk)
+            return "".join(chunks)
+        
+        try:
+            parts = await self._fit_prompt(workflow, execution_id, agent, llm_service, prompt)
+            # Parts run one after another within the node's concurrency slot
+            response = "\n\n".join([await stream(part) for part in parts])
+            status = "completed"
+            
+            self._log(
+                workflow.id, 
+                agent.id, 
+                "info", 
+                f"Agent completed: {len(response)} chars generated",
+                execution_id
+            )
+            return response
+        
+        except LLMError as e:
+            self._log(workflow.id, agent.id, "error", f"Agent failed: {e}", execution_id)
+            raise
+        finally:
+            get_metrics().node_seconds.observe(
+                time.monotonic() - started,
+                provider=agent.llmProvider,
+                model=agent.modelName,
+                status=status
+            )
+            await llm_service.close()
+    
+    async def _fit_prompt(
+        self,
+        workflow: Workflow,
+        execution_id: str,
+        agent: Agent,
+        llm_service: LLMService,
+        prompt: str
+    ) -> List[str]:
+        """
+        Shrink an input that is over the agent's context budget.
+        
+        Returns:
+            The prompts to run the agent on: one per chunk with the chunk
+            strategy, otherwise just the (possibly shortened) input
+        """
+        budget = PromptBudget(agent)
+        tokens = budget.tokenizer.count(prompt)
+        if tokens <= budget.limit:
+            return [prompt]
+        
+        get_metrics().prompt_overflows.inc(strategy=budget.strategy)
+        self._log(
+            workflow.id,
+            agent.id,
+            "warning",
+            f"Input of {tokens} tokens is over the {budget.limit}-token budget; using {budget.strategy}",
+            execution_id
+        )
+        
+        async def summarize(text: str, system_prompt: str, max_tokens: int) -> str:
+            return await llm_service.generate(
+                text, system_prompt=system_prompt, temperature=0, max_tokens=max_tokens
+            )
+        
+        with get_tracer().span(
+            "prompt.fit", strategy=budget.strategy, input_tokens=tokens, budget_tokens=budget.limit
+        ):
+            if budget.strategy == "chunk":
+                return budget.chunks(prompt)
+            if budget.strategy == "summarize":
+                return [await budget.summarize(prompt, summarize)]
+            return [budget.truncate(prompt)]
+    
+    @staticmethod
+    def _should_cache(agent: Agent) -> bool:
+        """Cache when the agent opts in, or by default for deterministic agents"""
+        if agent.cacheResponses is not None:
+            return agent.cacheResponses
+        return agent.temperature == 0
+    
+    @staticmethod
+    def _join_inputs(parent_outputs: List[Tuple[str, str]], initial_input: str) -> str:
+        """Combine upstream outputs into a single prompt"""
+        if not parent_outputs:
+            return initial_input
+        if len(parent_outputs) == 1:
+            return parent_outputs[0][1]
+        return "\n\n".join(f"[{label}]\n{output}" for label, output in parent_outputs)
+    
+    def _collect_final_output(
+        self,
+        plan: List[Dict[str, Any]],
+        results: Dict[str, Any],
+        initial_input: str
+    ) -> str:
+        """Join the outputs of the plan's sink nodes"""
+        upstream = {parent_id for step in plan for parent_id in step["depends_on"]}
+        sinks = [
+            (step["label"], results[step["node_id"]])
+            for step in plan
+            if step["node_id"] not in upstream
+        ]
+        return self._join_inputs(sinks, initial_input)
+    
     def _log(
         self, 
         workflow_id: str, 
         agent_id: Optional[str], 
         level: str, 
-        message: str
+        message: str,
+        execution_id: Optional[str] = None
     ):
         """Create an execution log entry"""
         log = ExecutionLog(
             id=str(uuid.uuid4()),
             workflowId=workflow_id,
+            executionId=execution_id,
             agentId=agent_id,
             timestamp=datetime.now(),
             level=level,
             message=message
         )
-        self.execution_logs.append(log)
+        self.log_store.append(log)
+        self.log_broker.publish(log)
     
-    def get_logs(self, workflow_id: Optional[str] = None) -> List[ExecutionLog]:
-        """Get execution logs, optionally filtered by workflow"""
-        if workflow_id:
-            return [log for log in self.execution_logs if log.workflowId == workflow_id]
-        return self.execution_logs
+    def get_logs(
+        self,
+        workflow_id: Optional[str] = None,
+        execution_id: Optional[str] = None,
+        levels: Optional[List[str]] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        newest: bool = False
+    ) -> Tuple[List[ExecutionLog], Optional[str]]:
+        """
+        Get execution logs, optionally filtered.
+        
+        Returns:
+            The matching logs and the cursor for fetching the next page
+        """
+        return self.log_store.query(
+            workflow_id=workflow_id,
+            execution_id=execution_id,
+            levels=levels,
+            since=since,
+            until=until,
+            cursor=cursor,
+            limit=limit,
+            newest=newest
+        )
+    
+    async def execute_batch(
+        self,
+        workflow: Workflow,
+        agents: Dict[str, Agent],
+        inputs: List[BatchInput],
+        concurrency: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Execute a workflow once per input with bounded concurrency.
+        
+        Yields one result per input in completion order. Results are
+        produced only as fast as the caller consumes them, so a slow
+        consumer holds back new executions.
+        """
+        concurrency = concurrency or DEFAULT_BATCH_CONCURRENCY
+        total = len(inputs)
+        pending = iter(enumerate(inputs))
+        results: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+        completed = 0
+        failed = 0
+        
+        async def worker():
+            for index, item in pending:
+                result = await self.execute_workflow(
+                    workflow=workflow,
+                    agents=agents,
+                    initial_input=item.input,
+                    priority="batch"
+                )
+                await results.put((index, item, result))
+        
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, total))]
+        
+        try:
+            while completed < total:
+                index, item, result = await results.get()
+                completed += 1
+                if result["status"] != "completed":
+                    failed += 1
+                line = {
+                    "index": index,
+                    "id": item.id,
+                    "execution_id": result["execution_id"],
+                    "status": result["status"],
+                    "completed": completed,
+                    "failed": failed,
+                    "total": total
+                }
+                if result["status"] == "completed":
+                    line["duration"] = result["duration"]
+                    line["final_output"] = result["final_output"]
+                else:
+                    line["error"] = result.get("error")
+                yield line
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
     
     def get_active_executions(self) -> Dict[str, dict]:
         """Get currently running executions"""
@@ -182,5 +776,5 @@ def get_workflow_executor() -> WorkflowExecutor:
     """Get or create the global workflow executor"""
     global _workflow_executor
     if _workflow_executor is None:
-        _workflow_executor = WorkflowExecutor()
+        _workflow_executor = WorkflowExecutor(checkpoints=get_checkpoint_store(), blobs=get_blob_store())
     return _workflow_executor
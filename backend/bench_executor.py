@@ -0,0 +1,171 @@
+"""
+Workflow executor benchmarks: throughput, per-node overhead and scaling for
+chain, fan-out and diamond workflows, run offline against the mock LLM server.
+Needs pytest-benchmark; run with `pytest bench_executor.py` from backend/.
+"""
+import asyncio
+from datetime import datetime
+from typing import Dict, Tuple
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.models import Agent, Workflow, WorkflowEdge, WorkflowNode, WorkflowNodeData
+from app.services import llm_service, tracing
+from app.services.llm_service import LLMService
+from tests.mock_llm_server import MockLLMServer, MockLLMSettings, MockLLMStats
+from app.services.tracing import Tracer
+from app.services.workflow_executor import WorkflowExecutor
+
+SHAPES = ("chain", "fan_out", "diamond")
+SIZES = (10, 100, 1000)
+# Enough that fan-out levels aren't throttled by the executor itself
+CONCURRENCY = 64
+
+def build_workflow(shape: str, size: int, model: str = "bench-model") -> Tuple[Workflow, Dict[str, Agent]]:
+    """
+    A workflow of `size` agent nodes.
+    
+    chain: n0 -> n1 -> ... ; fan_out: n0 -> every other node;
+    diamond: n0 -> every middle node -> the last node.
+    """
+    node_ids = [f"n{i}" for i in range(size)]
+    if shape == "chain":
+        edges = list(zip(node_ids, node_ids[1:]))
+    elif shape == "fan_out":
+        edges = [(node_ids[0], node_id) for node_id in node_ids[1:]]
+    elif shape == "diamond":
+        middle = node_ids[1:-1]
+        edges = [(node_ids[0], node_id) for node_id in middle]
+        edges += [(node_id, node_ids[-1]) for node_id in middle]
+    else:
+        raise ValueError(f"Unknown shape: {shape}")
+    
+    now = datetime.now()
+    workflow = Workflow(
+        id=f"bench-{shape}-{size}",
+        name=f"Benchmark {shape} x{size}",
+        description="Generated benchmark workflow",
+        nodes=[
+            WorkflowNode(
+                id=node_id,
+                type="agent",
+                position={"x": 0, "y": 0},
+                data=WorkflowNodeData(label=node_id, agentId=node_id)
+            )
+            for node_id in node_ids
+        ],
+        edges=[
+            WorkflowEdge(id=f"e{i}", source=source, target=target)
+            for i, (source, target) in enumerate(edges)
+        ],
+        createdAt=now,
+        updatedAt=now
+    )
+    agents = {
+        node_id: Agent(
+            id=node_id,
+            name=node_id,
+            role="Benchmark",
+            description="Benchmark agent",
+            llmProvider="ollama",
+            modelName=model,
+            # Distinct prompts so identical requests aren't coalesced
+            systemPrompt=f"You are {node_id}",
+            maxTokens=64,
+            createdAt=now,
+            updatedAt=now
+        )
+        for node_id in node_ids
+    }
+    return workflow, agents
+
+def run_benchmark(benchmark, workflow: Workflow, agents: Dict[str, Agent], concurrency: int, rounds: int):
+    """Time whole executions on one event loop and record per-node cost"""
+    loop = asyncio.new_event_loop()
+    executor = WorkflowExecutor(max_concurrency=concurrency)
+    
+    async def execute():
+        result = await executor.execute_workflow(
+            workflow, agents, "benchmark input", max_concurrency=concurrency
+        )
+        assert result["status"] == "completed", result.get("error")
+    
+    try:
+        benchmark.pedantic(
+            lambda: loop.run_until_complete(execute()),
+            rounds=rounds,
+            warmup_rounds=1
+        )
+    finally:
+        loop.close()
+    
+    mean = benchmark.stats.stats.mean
+    benchmark.extra_info["nodes"] = len(agents)
+    benchmark.extra_info["us_per_node"] = round(mean / len(agents) * 1e6, 1)
+    benchmark.extra_info["nodes_per_second"] = round(len(agents) / mean, 1)
+
+@pytest.fixture(autouse=True)
+def in_memory_tracing(monkeypatch):
+    """Keep tracing on, but without writing an OTLP file per execution"""
+    monkeypatch.setattr(tracing, "_tracer", Tracer(otlp_dir=None))
+
+@pytest.fixture(scope="module")
+def mock_server():
+    with MockLLMServer(MockLLMSettings(latency_ms=0, tokens_per_second=0, response_tokens=20)) as server:
+        yield server
+
+@pytest.fixture
+def provider(monkeypatch, mock_server) -> MockLLMServer:
+    """Point Ollama agents at the mock server with no in-flight cap of note"""
+    monkeypatch.setattr(llm_service, "OLLAMA_BASE_URL", mock_server.url)
+    monkeypatch.setenv("LLM_MAX_IN_FLIGHT_OLLAMA", "1024")
+    mock_server.app.state.stats = MockLLMStats()
+    settings = mock_server.settings
+    saved = dict(vars(settings))
+    yield mock_server
+    vars(settings).update(saved)
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("shape", SHAPES)
+def test_executor_overhead(benchmark, monkeypatch, shape, size):
+    """Scheduling cost alone: agents answer instantly without any HTTP"""
+    async def instant_stream(self, prompt, system_prompt=None, **kwargs):
+        yield "ok"
+    
+    monkeypatch.setattr(LLMService, "generate_stream", instant_stream)
+    workflow, agents = build_workflow(shape, size)
+    run_benchmark(benchmark, workflow, agents, CONCURRENCY, rounds=20 if size < 1000 else 5)
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("shape", SHAPES)
+def test_mock_provider_throughput(benchmark, provider, shape, size):
+    """Full request path (limiter, retries, streaming parse) against a zero-latency server"""
+    workflow, agents = build_workflow(shape, size, model=f"throughput-{shape}-{size}")
+    run_benchmark(benchmark, workflow, agents, CONCURRENCY, rounds=10 if size < 1000 else 3)
+    assert provider.stats.errors == 0
+
+@pytest.mark.parametrize("concurrency", (1, 4, 16, 64))
+def test_fan_out_scaling(benchmark, provider, concurrency):
+    """
+    A root and 99 independent nodes against a fixed 20ms provider. Ideal
+    time is (1 + ceil(99 / concurrency)) * 20ms; the gap is overhead.
+    """
+    provider.settings.latency_ms = 20
+    provider.settings.latency_distribution = "fixed"
+    workflow, agents = build_workflow("fan_out", 100, model=f"scaling-{concurrency}")
+    run_benchmark(benchmark, workflow, agents, concurrency, rounds=3)
+    ideal = (1 + -(-99 // concurrency)) * 0.02
+    benchmark.extra_info["ideal_seconds"] = ideal
+    benchmark.extra_info["efficiency"] = round(ideal / benchmark.stats.stats.mean, 3)
+
+def test_latency_distribution_end_to_end(benchmark, provider):
+    """A 10-node diamond against a noisy provider with injected 503s"""
+    provider.settings.latency_ms = 30
+    provider.settings.latency_distribution = "lognormal"
+    provider.settings.tokens_per_second = 500
+    provider.settings.error_rate = 0.05
+    provider.settings.retry_after = 0.01
+    workflow, agents = build_workflow("diamond", 10, model="noisy")
+    run_benchmark(benchmark, workflow, agents, CONCURRENCY, rounds=10)
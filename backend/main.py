@@ -1,12 +1,30 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import agents, workflows, teams, logs, llm
+from app.routes import agents, workflows, teams, logs, llm, metrics, executions, blobs
+from app.services.database import get_database
+from app.services import llm_service
+from app.services.http_pool import get_client_pool
+from app.services.provider_health import get_provider_health
+from app.services.sandbox_pool import get_sandbox_pool
 import uvicorn
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    database = get_database()
+    await database.init()
+    await get_provider_health().start([("ollama", llm_service.OLLAMA_BASE_URL)])
+    yield
+    await get_provider_health().close()
+    await get_sandbox_pool().close()
+    await get_client_pool().close()
+    await database.close()
+
 app = FastAPI(
     title="Agent Orchestrator API",
     description="Backend API for no-code agent orchestration platform",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -16,6 +34,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
@@ -23,7 +42,10 @@ app.include_router(agents.router, prefix="/api/agents", tags=["agents"])
 app.include_router(workflows.router, prefix="/api/workflows", tags=["workflows"])
 app.include_router(teams.router, prefix="/api/teams", tags=["teams"])
 app.include_router(logs.router, prefix="/api/logs", tags=["logs"])
+app.include_router(executions.router, prefix="/api/executions", tags=["executions"])
+app.include_router(blobs.router, prefix="/api/blobs", tags=["blobs"])
 app.include_router(llm.router, prefix="/api/llm", tags=["llm"])
+app.include_router(metrics.router, tags=["metrics"])
 
 @app.get("/")
 async def root():
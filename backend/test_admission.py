@@ -0,0 +1,145 @@
+import asyncio
+import time
+import pytest
+from datetime import datetime
+from app.models import Agent, Workflow, WorkflowNode, WorkflowNodeData
+from app.services.admission import AdmissionRejected, ExecutionAdmission
+from app.services.llm_service import LLMService
+from app.services.workflow_executor import WorkflowExecutor
+
+def make_workflow(workflow_id: str = "wf") -> Workflow:
+    now = datetime.now()
+    return Workflow(
+        id=workflow_id,
+        name=workflow_id,
+        description="Test",
+        nodes=[
+            WorkflowNode(
+                id="a",
+                type="agent",
+                position={"x": 0, "y": 0},
+                data=WorkflowNodeData(label="a", agentId="a")
+            )
+        ],
+        createdAt=now,
+        updatedAt=now
+    )
+
+def make_agents() -> dict:
+    now = datetime.now()
+    return {"a": Agent(
+        id="a",
+        name="a",
+        role="Tester",
+        description="Test",
+        llmProvider="custom",
+        modelName="model",
+        createdAt=now,
+        updatedAt=now
+    )}
+
+@pytest.mark.asyncio
+async def test_interactive_runs_start_before_batch():
+    admission = ExecutionAdmission(max_running=1, max_queued=10)
+    holder = admission.enqueue("hold", "wf")
+    batch = admission.enqueue("b1", "wf", "batch")
+    interactive = admission.enqueue("i1", "wf", "interactive")
+    
+    assert holder.future.done()
+    assert admission.position(interactive) == 1
+    assert admission.position(batch) == 2
+    
+    admission.release(holder)
+    assert interactive.future.done() and not batch.future.done()
+    admission.release(interactive)
+    assert batch.future.done()
+
+@pytest.mark.asyncio
+async def test_workflow_limit_lets_other_workflows_through():
+    admission = ExecutionAdmission(max_running=4, max_queued=10)
+    first = admission.enqueue("a1", "a", limit=1)
+    second = admission.enqueue("a2", "a", limit=1)
+    other = admission.enqueue("b1", "b", limit=1)
+    
+    assert first.future.done() and other.future.done()
+    assert not second.future.done()
+    
+    admission.release(first)
+    assert second.future.done()
+    assert admission.snapshot()["running_by_workflow"] == {"a": 1, "b": 1}
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_with_retry_after():
+    admission = ExecutionAdmission(max_running=1, max_queued=1)
+    admission.enqueue("run", "wf")
+    queued = admission.enqueue("wait", "wf")
+    
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.enqueue("extra", "wf")
+    assert rejected.value.retry_after >= 1
+    assert admission.rejected == 1
+    
+    # Runs of an admitted batch still queue
+    admission.enqueue("batch", "wf", "batch", bounded=False)
+    assert admission.queued == 2
+    
+    # A run that gives up its place leaves the queue
+    admission.release(queued)
+    assert admission.queued == 1
+
+@pytest.mark.asyncio
+async def test_cancel_stops_in_flight_calls_and_frees_the_slot(monkeypatch):
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+    
+    async def fake_stream(self, prompt, system_prompt=None, **kwargs):
+        if "slow" in prompt:
+            started.set()
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+        yield "done"
+    
+    monkeypatch.setattr(LLMService, "generate_stream", fake_stream)
+    executor = WorkflowExecutor(admission=ExecutionAdmission(max_running=1, max_queued=4))
+    workflow, agents = make_workflow(), make_agents()
+    
+    slow_id = executor.admit(workflow, "slow")
+    waiting_id = executor.admit(workflow, "queued")
+    assert executor.queue_position(waiting_id) == 1
+    slow = asyncio.create_task(executor.execute_workflow(workflow, agents, "slow", execution_id=slow_id))
+    await started.wait()
+    
+    # Cancelled before it ever got a slot
+    assert executor.cancel(waiting_id)
+    assert (await executor.execute_workflow(workflow, agents, "queued", execution_id=waiting_id))["status"] == "cancelled"
+    
+    began = time.monotonic()
+    assert executor.cancel(slow_id)
+    result = await slow
+    
+    assert time.monotonic() - began < 1
+    assert cancelled.is_set()
+    assert result["status"] == "cancelled"
+    assert executor.active_executions[slow_id]["status"] == "cancelled"
+    assert not executor.cancel(slow_id)
+    assert executor.admission.running == executor.admission.queued == 0
+    
+    after = await executor.execute_workflow(workflow, agents, "next")
+    assert after["status"] == "completed"
+
+@pytest.mark.asyncio
+async def test_finished_executions_are_evicted(monkeypatch):
+    async def fake_stream(self, prompt, system_prompt=None, **kwargs):
+        yield "done"
+    
+    monkeypatch.setattr(LLMService, "generate_stream", fake_stream)
+    executor = WorkflowExecutor(max_finished=2)
+    workflow, agents = make_workflow(), make_agents()
+    
+    results = [await executor.execute_workflow(workflow, agents, f"run {i}") for i in range(3)]
+    
+    assert list(executor.active_executions) == [result["execution_id"] for result in results[1:]]
+    assert all("initial_input" not in execution for execution in executor.active_executions.values())
@@ -0,0 +1,141 @@
+import httpx
+import pytest
+from datetime import datetime
+from fastapi import FastAPI
+from app.models import Agent, Workflow, WorkflowEdge, WorkflowNode, WorkflowNodeData
+from app.routes import blobs
+from app.services import blob_store
+from app.services.blob_store import BlobStore
+from app.services.llm_service import LLMService
+from app.services.workflow_executor import WorkflowExecutor
+
+TEXT = "".join(f"line {i}: the agent reviewed the report\n" for i in range(2000))
+
+def make_workflow() -> Workflow:
+    """a feeds b and c"""
+    now = datetime.now()
+    return Workflow(
+        id="wf",
+        name="Fan out",
+        description="Test",
+        nodes=[
+            WorkflowNode(
+                id=node_id,
+                type="agent",
+                position={"x": 0, "y": 0},
+                data=WorkflowNodeData(label=node_id, agentId=node_id)
+            )
+            for node_id in "abc"
+        ],
+        edges=[
+            WorkflowEdge(id="e1", source="a", target="b"),
+            WorkflowEdge(id="e2", source="a", target="c"),
+        ],
+        createdAt=now,
+        updatedAt=now
+    )
+
+def make_agent(agent_id: str) -> Agent:
+    now = datetime.now()
+    return Agent(
+        id=agent_id,
+        name=agent_id,
+        role="Tester",
+        description="Test",
+        llmProvider="custom",
+        modelName="model",
+        createdAt=now,
+        updatedAt=now
+    )
+
+@pytest.mark.asyncio
+async def test_large_text_is_stored_once(tmp_path):
+    store = BlobStore(str(tmp_path), threshold=1024, compression="none")
+    
+    assert await store.offload("short") == "short"
+    first = await store.offload(TEXT)
+    second = await store.offload(TEXT)
+    
+    assert first == second == {"blob": first["blob"], "size": len(TEXT.encode("utf-8"))}
+    assert store.stats["stored"] == 1 and store.stats["deduplicated"] == 1
+    assert (await store.get(first["blob"])).decode("utf-8") == TEXT
+    part = b"".join([chunk async for chunk in store.read(first["blob"], 10, 30)])
+    assert part == TEXT.encode("utf-8")[10:30]
+    assert await store.get("0" * 64) is None
+    assert await store.stat("../etc/passwd") is None
+
+@pytest.mark.asyncio
+async def test_compressed_blobs_read_by_range(tmp_path):
+    pytest.importorskip("zstandard")
+    store = BlobStore(str(tmp_path), threshold=1024, compression="zstd")
+    
+    ref = await store.offload(TEXT)
+    
+    assert store.stats["bytes_written"] < ref["size"] / 4
+    assert await store.stat(ref["blob"]) == ref["size"]
+    data = TEXT.encode("utf-8")
+    part = b"".join([chunk async for chunk in store.read(ref["blob"], 70000, 70100)])
+    assert part == data[70000:70100]
+
+@pytest.mark.asyncio
+async def test_results_carry_references(monkeypatch, tmp_path):
+    async def fake_stream(self, prompt, system_prompt=None, **kwargs):
+        yield f"{self.config.modelName} {len(prompt)}\n" + TEXT
+    
+    monkeypatch.setattr(LLMService, "generate_stream", fake_stream)
+    store = BlobStore(str(tmp_path), threshold=1024, compression="none")
+    workflow = make_workflow()
+    agents = {agent_id: make_agent(agent_id) for agent_id in "abc"}
+    
+    result = await WorkflowExecutor(blobs=store).execute_workflow(workflow, agents, "go")
+    
+    assert result["status"] == "completed"
+    assert all(set(ref) == {"blob", "size"} for ref in result["results"].values())
+    final = (await store.get(result["final_output"]["blob"])).decode("utf-8")
+    assert final.startswith("[b]\nmodel") and "[c]\nmodel" in final
+    # b and c got the same input, so their outputs are one blob
+    assert result["results"]["b"] == result["results"]["c"]
+
+@pytest.mark.asyncio
+async def test_blob_endpoint_serves_ranges(monkeypatch, tmp_path):
+    store = BlobStore(str(tmp_path), threshold=1024, compression="none")
+    monkeypatch.setattr(blob_store, "_blob_store", store)
+    ref = await store.offload(TEXT)
+    data = TEXT.encode("utf-8")
+    app = FastAPI()
+    app.include_router(blobs.router, prefix="/api/blobs")
+    
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        url = f"/api/blobs/{ref['blob']}"
+        whole = await client.get(url)
+        partial = await client.get(url, headers={"Range": "bytes=100-199"})
+        suffix = await client.get(url, headers={"Range": "bytes=-10"})
+        past_end = await client.get(url, headers={"Range": f"bytes={len(data)}-"})
+        missing = await client.get("/api/blobs/" + "0" * 64)
+    
+    assert whole.status_code == 200 and whole.content == data
+    assert whole.headers["accept-ranges"] == "bytes"
+    assert partial.status_code == 206
+    assert partial.content == data[100:200]
+    assert partial.headers["content-range"] == f"bytes 100-199/{len(data)}"
+    assert suffix.content == data[-10:]
+    assert past_end.status_code == 416
+    assert past_end.headers["content-range"] == f"bytes */{len(data)}"
+    assert missing.status_code == 404
+
+@pytest.mark.asyncio
+async def test_eviction_keeps_referenced_blobs(tmp_path):
+    referenced = set()
+    
+    async def references():
+        return set(referenced)
+    
+    store = BlobStore(str(tmp_path), threshold=1, max_bytes=2500, compression="none", referenced=references)
+    first = await store.put(b"a" * 1000)
+    referenced.add(first["blob"])
+    second = await store.put(b"b" * 1000)
+    third = await store.put(b"c" * 1000)
+    
+    assert await store.stat(first["blob"]) == 1000
+    assert await store.stat(second["blob"]) is None
+    assert await store.stat(third["blob"]) == 1000
@@ -0,0 +1,174 @@
+import asyncio
+import pytest
+from datetime import datetime
+from app.models import Agent, Workflow, WorkflowNode, WorkflowNodeData
+from app.services.admission import AdmissionRejected
+from app.services.database import Database, agents_table, workflows_table
+from app.services.job_queue import JobQueue
+from app.services.job_worker import JobWorker
+from app.services.llm_service import LLMService
+from app.services.repository import Repository
+from app.services.workflow_executor import WorkflowExecutor
+
+def make_database(tmp_path) -> Database:
+    return Database(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+
+def make_workflow() -> Workflow:
+    now = datetime.now()
+    return Workflow(
+        id="wf",
+        name="Queued",
+        description="A queued workflow",
+        nodes=[
+            WorkflowNode(
+                id="a",
+                type="agent",
+                position={"x": 0, "y": 0},
+                data=WorkflowNodeData(label="a", agentId="a")
+            )
+        ],
+        edges=[],
+        createdAt=now,
+        updatedAt=now
+    )
+
+def make_agent() -> Agent:
+    now = datetime.now()
+    return Agent(
+        id="a",
+        name="a",
+        role="Tester",
+        description="Test",
+        llmProvider="custom",
+        modelName="model",
+        createdAt=now,
+        updatedAt=now
+    )
+
+@pytest.mark.asyncio
+async def test_each_job_is_claimed_once(tmp_path):
+    database = make_database(tmp_path)
+    queue = JobQueue(database)
+    first = await queue.enqueue("wf", "one")
+    second = await queue.enqueue("wf", "two")
+    
+    claims = await asyncio.gather(*(queue.claim(f"w{i}") for i in range(4)))
+    
+    claimed = [job for job in claims if job is not None]
+    assert sorted(job.id for job in claimed) == sorted([first.id, second.id])
+    assert len({job.workerId for job in claimed}) == 2
+    assert all(job.status == "running" and job.attempts == 1 for job in claimed)
+    
+    job = claimed[0]
+    assert await queue.heartbeat(job.id, job.workerId)
+    assert not await queue.heartbeat(job.id, "someone-else")
+    assert await queue.complete(job.id, job.workerId, {"status": "completed", "final_output": "done"})
+    
+    stored = await queue.get(job.id)
+    assert stored.status == "completed"
+    assert stored.result["final_output"] == "done"
+    assert await queue.counts() == {"completed": 1, "running": 1}
+    await database.close()
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_reclaimed_until_max_attempts(tmp_path):
+    database = make_database(tmp_path)
+    queue = JobQueue(database, max_attempts=2)
+    job = await queue.enqueue("wf", "crashy")
+    
+    assert (await queue.claim("w1", lease_seconds=0)).id == job.id
+    await asyncio.sleep(0.01)
+    reclaimed = await queue.claim("w2", lease_seconds=0)
+    
+    assert reclaimed.id == job.id and reclaimed.attempts == 2
+    # The first worker finds out at its next heartbeat
+    assert not await queue.heartbeat(job.id, "w1")
+    
+    await asyncio.sleep(0.01)
+    assert await queue.claim("w3") is None
+    failed = await queue.get(job.id)
+    assert failed.status == "error"
+    assert "Abandoned" in failed.error
+    await database.close()
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_and_interactive_jobs_go_first(tmp_path):
+    database = make_database(tmp_path)
+    queue = JobQueue(database, max_queued=2)
+    batch = await queue.enqueue("wf", "batch", priority="batch")
+    interactive = await queue.enqueue("wf", "interactive")
+    
+    with pytest.raises(AdmissionRejected) as rejected:
+        await queue.enqueue("wf", "extra")
+    assert rejected.value.retry_after >= 1
+    
+    first = await queue.claim("w1")
+    assert first.id == interactive.id
+    assert (await queue.claim("w1")).id == batch.id
+    assert batch.priority == (await queue.get(batch.id)).priority == "batch"
+    await database.close()
+
+@pytest.mark.asyncio
+async def test_blob_references_in_results(tmp_path):
+    database = make_database(tmp_path)
+    queue = JobQueue(database)
+    await queue.enqueue("wf", "go")
+    job = await queue.claim("w1")
+    await queue.complete(job.id, "w1", {
+        "status": "completed",
+        "results": {"a": "short", "b": {"blob": "1" * 64, "size": 70000}},
+        "final_output": {"blob": "2" * 64, "size": 70000},
+    })
+    
+    assert await queue.blob_references() == {"1" * 64, "2" * 64}
+    await database.close()
+
+@pytest.mark.asyncio
+async def test_worker_runs_jobs_and_hands_back_on_stop(tmp_path, monkeypatch):
+    database = make_database(tmp_path)
+    release = asyncio.Event()
+    
+    async def fake_stream(self, prompt, system_prompt=None, **kwargs):
+        if "wait" in prompt:
+            await release.wait()
+        yield "answer"
+    
+    monkeypatch.setattr(LLMService, "generate_stream", fake_stream)
+    workflows = Repository(database, workflows_table, Workflow)
+    agents = Repository(database, agents_table, Agent)
+    await workflows.save(make_workflow())
+    await agents.save(make_agent())
+    
+    queue = JobQueue(database)
+    worker = JobWorker(
+        queue=queue,
+        executor=WorkflowExecutor(),
+        worker_id="w1",
+        concurrency=2,
+        poll_interval=0.01,
+        workflows=workflows,
+        agents=agents
+    )
+    done = await queue.enqueue("wf", "go")
+    stuck = await queue.enqueue("wf", "wait")
+    running = asyncio.create_task(worker.run())
+    
+    for _ in range(200):
+        if (await queue.get(done.id)).status == "completed":
+            break
+        await asyncio.sleep(0.01)
+    
+    finished = await queue.get(done.id)
+    assert finished.status == "completed"
+    assert finished.result["execution_id"] == done.id
+    assert finished.result["final_output"].endswith("answer")
+    assert (await workflows.get("wf")).status == "completed"
+    
+    worker.stop()
+    await running
+    
+    # The unfinished job goes back to the queue for another worker
+    returned = await queue.get(stuck.id)
+    assert returned.status == "queued"
+    assert returned.workerId is None and returned.attempts == 0
+    await database.close()
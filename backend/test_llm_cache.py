@@ -0,0 +1,34 @@
+import pytest
+from app.services.llm_cache import LLMCache
+
+def key_for(prompt: str) -> str:
+    return LLMCache.make_key("ollama", "http://localhost:11434", "llama2", "sys", prompt, 0.0, 100)
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_new_instance(tmp_path):
+    cache = LLMCache(cache_dir=str(tmp_path))
+    assert await cache.get(key_for("q")) is None
+    await cache.set(key_for("q"), "answer")
+    assert await cache.get(key_for("q")) == "answer"
+    assert cache.stats["memory_hits"] == 1 and cache.stats["misses"] == 1
+    
+    reopened = LLMCache(cache_dir=str(tmp_path))
+    assert await reopened.get(key_for("q")) == "answer"
+    assert reopened.stats["disk_hits"] == 1
+
+@pytest.mark.asyncio
+async def test_memory_lru_and_disk_size_bound(tmp_path):
+    cache = LLMCache(cache_dir=str(tmp_path), memory_entries=2, disk_max_bytes=300)
+    for n in range(5):
+        await cache.set(key_for(str(n)), "x" * 100)
+    
+    assert len(cache._memory) == 2
+    assert cache.stats["evictions"] > 0
+    assert sum(cache._disk_sizes.values()) <= 300
+
+@pytest.mark.asyncio
+async def test_expired_entries_miss():
+    cache = LLMCache(cache_dir=None, ttl=1)
+    await cache.set(key_for("q"), "answer")
+    cache._memory[key_for("q")] = (0.0, "answer")
+    assert await cache.get(key_for("q")) is None
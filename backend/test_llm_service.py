@@ -0,0 +1,132 @@
+import asyncio
+import json
+import httpx
+import pytest
+from app.models import LLMConfig
+from app.services import llm_service
+from app.services.llm_errors import LLMHTTPError
+from app.services.llm_service import LLMService
+
+def make_service(provider: str, body: str, **config) -> LLMService:
+    """Create a service whose HTTP client replays a canned response body"""
+    service = LLMService(LLMConfig(provider=provider, modelName="test-model", **config))
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, content=body.encode())
+    
+    service.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return service
+
+async def collect(service: LLMService) -> list:
+    chunks = [chunk async for chunk in service.generate_stream("hi")]
+    await service.close()
+    return chunks
+
+@pytest.mark.asyncio
+async def test_stream_ollama_ndjson():
+    body = "\n".join(json.dumps(line) for line in [
+        {"message": {"content": "Hel"}, "done": False},
+        {"message": {"content": "lo"}, "done": False},
+        {"message": {"content": ""}, "done": True},
+    ])
+    assert await collect(make_service("ollama", body)) == ["Hel", "lo"]
+
+@pytest.mark.asyncio
+async def test_stream_openai_sse():
+    body = (
+        'data: {"choices": [{"delta": {"role": "assistant"}}]}\n\n'
+        'data: {"choices": [{"delta": {"content": "Hel"}}]}\n\n'
+        ': keep-alive\n\n'
+        'data: {"choices": [{"delta": {"content": "lo"}}]}\n\n'
+        'data: [DONE]\n\n'
+    )
+    service = make_service("openai", body, apiKey="sk-test")
+    assert await collect(service) == ["Hel", "lo"]
+
+@pytest.mark.asyncio
+async def test_stream_anthropic_events():
+    body = (
+        'event: message_start\ndata: {"type": "message_start"}\n\n'
+        'event: content_block_delta\n'
+        'data: {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "Hel"}}\n\n'
+        'event: ping\ndata: {"type": "ping"}\n\n'
+        'event: content_block_delta\n'
+        'data: {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "lo"}}\n\n'
+        'event: message_stop\ndata: {"type": "message_stop"}\n\n'
+    )
+    service = make_service("anthropic", body, apiKey="sk-ant-test")
+    assert await collect(service) == ["Hel", "lo"]
+
+@pytest.mark.asyncio
+async def test_services_share_pooled_client():
+    first = LLMService(LLMConfig(provider="ollama", modelName="a"))
+    second = LLMService(LLMConfig(provider="ollama", modelName="b"))
+    remote = LLMService(LLMConfig(provider="ollama", modelName="a", baseUrl="http://gpu-host:11434"))
+    
+    assert first.client is second.client
+    assert first.client is not remote.client
+    await first.close()
+    assert not second.client.is_closed
+
+def test_request_key_separates_api_keys():
+    def key_for(api_key):
+        service = LLMService(LLMConfig(provider="openai", modelName="gpt-4", apiKey=api_key))
+        return service._request_key("hi", None, 0.0, 100)
+    
+    assert key_for("sk-alice") == key_for("sk-alice")
+    assert key_for("sk-alice") != key_for("sk-bob")
+    assert key_for("sk-alice") != key_for(None)
+    assert "sk-alice" not in key_for("sk-alice")
+
+def ollama_reply(content: str) -> httpx.Response:
+    return httpx.Response(200, json={"message": {"content": content}, "done": True})
+
+@pytest.mark.asyncio
+async def test_generate_retries_transient_errors(monkeypatch):
+    monkeypatch.setattr(llm_service, "LLM_RETRY_BASE_DELAY", 0)
+    service = LLMService(LLMConfig(provider="ollama", modelName="retry-model"))
+    statuses = [503, 200]
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        status = statuses.pop(0)
+        return ollama_reply("ok") if status == 200 else httpx.Response(status)
+    
+    service.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    assert await service.generate("retry me") == "ok"
+    assert statuses == []
+
+@pytest.mark.asyncio
+async def test_generate_raises_on_client_error():
+    service = LLMService(LLMConfig(provider="ollama", modelName="auth-model"))
+    calls = []
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(401, text="unauthorized")
+    
+    service.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with pytest.raises(LLMHTTPError) as info:
+        await service.generate("no retry")
+    assert info.value.status_code == 401
+    assert not info.value.retryable
+    assert len(calls) == 1
+
+@pytest.mark.asyncio
+async def test_generate_hedges_slow_requests(monkeypatch):
+    monkeypatch.setattr(llm_service, "LLM_HEDGE_REQUESTS", True)
+    service = LLMService(LLMConfig(provider="ollama", modelName="hedge-model"))
+    for _ in range(llm_service.LLM_HEDGE_MIN_SAMPLES):
+        llm_service._latency_tracker.record(service._latency_key("generate"), 0.01)
+    calls = []
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if len(calls) == 1:
+            await asyncio.sleep(5)
+            return ollama_reply("slow")
+        return ollama_reply("fast")
+    
+    service.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    assert await asyncio.wait_for(service.generate("hedge me"), 1) == "fast"
+    assert len(calls) == 2
@@ -0,0 +1,42 @@
+import pytest
+from datetime import datetime
+from app.models import ExecutionLog
+from app.services.log_broker import LogBroker
+
+def make_log(workflow_id: str, message: str) -> ExecutionLog:
+    return ExecutionLog(
+        id=message,
+        workflowId=workflow_id,
+        timestamp=datetime.now(),
+        level="info",
+        message=message
+    )
+
+@pytest.mark.asyncio
+async def test_subscribers_only_see_their_workflow():
+    broker = LogBroker()
+    subscription = broker.subscribe("wf-1")
+    broker.publish(make_log("wf-2", "other"))
+    event_id = broker.publish(make_log("wf-1", "mine"))
+    
+    assert await subscription.get() == (event_id, broker._buffers["wf-1"][0][1])
+    assert subscription.queue.empty()
+    broker.unsubscribe(subscription)
+    assert broker.subscriber_count() == 0
+
+def test_full_queue_drops_oldest():
+    broker = LogBroker(queue_size=2)
+    subscription = broker.subscribe("wf-1")
+    for message in ("a", "b", "c"):
+        broker.publish(make_log("wf-1", message))
+    
+    assert subscription.dropped == 1
+    assert [subscription.queue.get_nowait()[1].message for _ in range(2)] == ["b", "c"]
+
+def test_resume_replays_after_last_event_id():
+    broker = LogBroker(buffer_size=3)
+    ids = [broker.publish(make_log("wf-1", message)) for message in "abcd"]
+    
+    subscription = broker.subscribe("wf-1", last_event_id=ids[1])
+    replayed = [subscription.queue.get_nowait()[1].message for _ in range(subscription.queue.qsize())]
+    assert replayed == ["c", "d"]
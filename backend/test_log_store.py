@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+from app.models import ExecutionLog
+from app.services.log_store import LogStore
+
+START = datetime(2025, 1, 1)
+
+def make_log(n: int, workflow_id: str = "wf-1", execution_id: str = "ex-1", level: str = "info") -> ExecutionLog:
+    return ExecutionLog(
+        id=str(n),
+        workflowId=workflow_id,
+        executionId=execution_id,
+        timestamp=START + timedelta(seconds=n),
+        level=level,
+        message=f"log {n}"
+    )
+
+def test_cursor_pagination_and_filters():
+    store = LogStore()
+    for n in range(10):
+        store.append(make_log(
+            n,
+            workflow_id="wf-1" if n % 2 == 0 else "wf-2",
+            level="error" if n == 4 else "info"
+        ))
+    
+    page, cursor = store.query(workflow_id="wf-1", limit=2)
+    assert [log.id for log in page] == ["0", "2"]
+    page, cursor = store.query(workflow_id="wf-1", cursor=cursor)
+    assert [log.id for log in page] == ["4", "6", "8"]
+    
+    # Polling with the last cursor only returns new entries
+    store.append(make_log(10))
+    page, _ = store.query(workflow_id="wf-1", cursor=cursor)
+    assert [log.id for log in page] == ["10"]
+    
+    page, _ = store.query(levels=["error"])
+    assert [log.id for log in page] == ["4"]
+    page, _ = store.query(since=START + timedelta(seconds=3), until=START + timedelta(seconds=5))
+    assert [log.id for log in page] == ["3", "4", "5"]
+
+def test_newest_page_then_poll():
+    store = LogStore()
+    for n in range(10):
+        store.append(make_log(n, workflow_id="wf-1" if n % 2 == 0 else "wf-2"))
+    
+    page, cursor = store.query(workflow_id="wf-1", limit=2, newest=True)
+    assert [log.id for log in page] == ["6", "8"]
+    
+    store.append(make_log(10))
+    page, _ = store.query(workflow_id="wf-1", cursor=cursor)
+    assert [log.id for log in page] == ["10"]
+
+def test_retention_cap_evicts_oldest():
+    store = LogStore(max_entries=5)
+    for n in range(12):
+        store.append(make_log(n, execution_id="ex-old" if n < 7 else "ex-new"))
+    
+    assert len(store) == 5
+    assert store.evicted == 7
+    page, _ = store.query()
+    assert [log.id for log in page] == ["7", "8", "9", "10", "11"]
+    assert store.query(execution_id="ex-old")[0] == []
+    assert "ex-old" not in store._by_execution
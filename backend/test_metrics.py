@@ -0,0 +1,41 @@
+import httpx
+import pytest
+from app.models import LLMConfig
+from app.routes.metrics import metrics as metrics_endpoint
+from app.services.llm_service import LLMService
+from app.services.metrics import Counter, Histogram, get_metrics
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("request_seconds", "Request time.", ("provider",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 5):
+        histogram.observe(value, provider='o"llama')
+    counter = Counter("responses_total", "Responses.", ("status",))
+    counter.inc(status="200")
+    counter.inc(2, status="200")
+    
+    lines = histogram.render() + counter.render()
+    assert '# TYPE request_seconds histogram' in lines
+    assert 'request_seconds_bucket{provider="o\\"llama",le="0.1"} 1' in lines
+    assert 'request_seconds_bucket{provider="o\\"llama",le="1"} 3' in lines
+    assert 'request_seconds_bucket{provider="o\\"llama",le="+Inf"} 4' in lines
+    assert 'request_seconds_count{provider="o\\"llama"} 4' in lines
+    assert 'responses_total{status="200"} 3' in lines
+
+@pytest.mark.asyncio
+async def test_llm_calls_are_exported():
+    body = b'{"message": {"content": "Hello there"}, "done": true}'
+    service = LLMService(LLMConfig(provider="ollama", modelName="metrics-model"))
+    service.client = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+    )
+    assert [chunk async for chunk in service.generate_stream("hi")] == ["Hello there"]
+    
+    metrics = get_metrics()
+    labels = {"provider": "ollama", "model": "metrics-model"}
+    assert metrics.llm_request_seconds.count(mode="stream", **labels) == 1
+    assert metrics.llm_ttft_seconds.count(**labels) == 1
+    assert metrics.llm_responses.value(provider="ollama", status="200") >= 1
+    
+    text = (await metrics_endpoint()).body.decode()
+    assert 'llm_time_to_first_token_seconds_count{provider="ollama",model="metrics-model"} 1' in text
+    assert "workflow_active_executions 0" in text
@@ -0,0 +1,57 @@
+import httpx
+import pytest
+from app.models import LLMConfig
+from app.services import llm_service, provider_health
+from app.services.llm_errors import LLMHTTPError
+from app.services.llm_service import LLMService
+from tests.mock_llm_server import MockLLMSettings, create_mock_llm_app
+from app.services.provider_health import ProviderHealthRegistry
+
+def make_service(app, provider: str) -> LLMService:
+    """A service talking to the mock app in-process"""
+    service = LLMService(LLMConfig(
+        provider=provider,
+        modelName=f"mock-{provider}",
+        baseUrl="http://mock",
+        apiKey="test-key",
+        maxTokens=5
+    ))
+    service.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+    return service
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("provider", ["ollama", "openai", "anthropic", "custom"])
+async def test_wire_formats(provider):
+    """Each provider parses the mock's streamed and complete responses"""
+    app = create_mock_llm_app(MockLLMSettings(latency_ms=0, tokens_per_second=0, response_tokens=8))
+    service = make_service(app, provider)
+    
+    chunks = [chunk async for chunk in service.generate_stream(f"hello {provider}")]
+    text = await service.generate(f"hello again {provider}")
+    
+    # maxTokens caps the 8 configured tokens
+    assert len(chunks) == 5
+    assert "".join(chunks) == text == "the agent reviewed input and "
+    assert app.state.stats.requests == 2
+
+@pytest.mark.asyncio
+async def test_injected_errors_are_retried(monkeypatch):
+    monkeypatch.setattr(llm_service, "LLM_RETRY_BASE_DELAY", 0.01)
+    # Keep the circuit these failures open away from other tests
+    monkeypatch.setattr(provider_health, "_provider_health", ProviderHealthRegistry())
+    app = create_mock_llm_app(MockLLMSettings(
+        latency_ms=0, error_rate=1.0, error_status=503, retry_after=0.01
+    ))
+    service = make_service(app, "ollama")
+    
+    with pytest.raises(LLMHTTPError) as error:
+        await service.generate("always fails")
+    
+    assert error.value.status_code == 503
+    assert app.state.stats.errors == app.state.stats.requests == 1 + llm_service.LLM_MAX_RETRIES
+
+def test_latency_distributions_keep_their_mean():
+    for distribution in ("fixed", "uniform", "exponential", "lognormal"):
+        settings = MockLLMSettings(latency_ms=100, latency_distribution=distribution, seed=7)
+        mean = sum(settings.sample_latency() for _ in range(5000)) / 5000
+        assert mean == pytest.approx(0.1, rel=0.1)
@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from app.services.model_scheduler import ModelAffinityScheduler
+
+HOST = "http://ollama"
+
+async def grant_order(scheduler: ModelAffinityScheduler, first: str, queued: list) -> list:
+    """
+    Start order of nodes queued, by model, behind one node of model first
+    that holds the only slot until everything is queued.
+    """
+    order = []
+    release = asyncio.Event()
+    
+    async def hold():
+        async with scheduler.slot((HOST, first)):
+            await release.wait()
+    
+    async def node(model: str):
+        async with scheduler.slot((HOST, model)):
+            order.append(model)
+            await asyncio.sleep(0)
+    
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    tasks = []
+    for model in queued:
+        tasks.append(asyncio.create_task(node(model)))
+        await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(holder, *tasks)
+    return order
+
+@pytest.mark.asyncio
+async def test_loaded_model_goes_first():
+    scheduler = ModelAffinityScheduler(1, enabled=True, max_batch=16, max_wait=30)
+    
+    order = await grant_order(scheduler, "a", ["b", "a", "b", "a"])
+    
+    assert order == ["a", "a", "b", "b"]
+    assert scheduler.switches == 1
+    assert scheduler.active == scheduler.waiting == 0
+
+@pytest.mark.asyncio
+async def test_batch_bound_lets_other_models_in():
+    scheduler = ModelAffinityScheduler(1, enabled=True, max_batch=2, max_wait=30)
+    
+    order = await grant_order(scheduler, "a", ["b", "a", "a", "a", "a"])
+    
+    # b waited through two a's, then got its turn
+    assert order == ["a", "a", "b", "a", "a"]
+
+@pytest.mark.asyncio
+async def test_disabled_is_fifo():
+    scheduler = ModelAffinityScheduler(1, enabled=False)
+    
+    order = await grant_order(scheduler, "a", ["b", "a", "b", "a"])
+    
+    assert order == ["b", "a", "b", "a"]
+    assert scheduler.switches == 0
+
+@pytest.mark.asyncio
+async def test_other_models_wait_for_the_endpoint_to_drain():
+    scheduler = ModelAffinityScheduler(4, enabled=True)
+    running = []
+    release = asyncio.Event()
+    
+    async def node(model: str):
+        async with scheduler.slot((HOST, model)):
+            running.append(model)
+            await release.wait()
+    
+    tasks = [asyncio.create_task(node(model)) for model in ("a", "b", "a")]
+    await asyncio.sleep(0)
+    
+    # Both a's share the endpoint; b waits despite free slots
+    assert running == ["a", "a"]
+    assert scheduler.waiting == 1
+    
+    release.set()
+    await asyncio.gather(*tasks)
+    assert running == ["a", "a", "b"]
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_up_its_place():
+    scheduler = ModelAffinityScheduler(1, enabled=True)
+    release = asyncio.Event()
+    
+    async def node(model: str):
+        async with scheduler.slot((HOST, model)):
+            await release.wait()
+    
+    holder = asyncio.create_task(node("a"))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(node("b"))
+    await asyncio.sleep(0)
+    assert scheduler.waiting == 1
+    
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    assert scheduler.waiting == 0
+    
+    release.set()
+    await holder
+    assert scheduler.active == 0
@@ -0,0 +1,106 @@
+import time
+from datetime import datetime
+
+import pytest
+from app.models import Agent, LLMConfig, Workflow, WorkflowEdge, WorkflowNode, WorkflowNodeData
+from app.services import llm_service, ollama_models
+from app.services.llm_service import ollama_duration
+from tests.mock_llm_server import MockLLMServer, MockLLMSettings
+from app.services.ollama_models import OllamaModelManager
+from app.services.workflow_executor import WorkflowExecutor
+
+@pytest.fixture
+def server(monkeypatch):
+    """A mock Ollama whose cold loads take 200ms"""
+    settings = MockLLMSettings(latency_ms=0, tokens_per_second=0, response_tokens=5, load_ms=200)
+    with MockLLMServer(settings) as server:
+        monkeypatch.setattr(llm_service, "OLLAMA_BASE_URL", server.url)
+        monkeypatch.setattr(ollama_models, "_ollama_models", OllamaModelManager())
+        yield server
+
+def make_agent(agent_id: str, model: str) -> Agent:
+    now = datetime.now()
+    return Agent(
+        id=agent_id,
+        name=agent_id,
+        role="Tester",
+        description="Test agent",
+        llmProvider="ollama",
+        modelName=model,
+        systemPrompt=f"You are {agent_id}",
+        createdAt=now,
+        updatedAt=now
+    )
+
+def test_keep_alive_numbers_are_sent_as_numbers():
+    assert ollama_duration("-1") == -1
+    assert ollama_duration("300") == 300
+    assert ollama_duration("10m") == "10m"
+    assert ollama_duration("") is None
+
+@pytest.mark.asyncio
+async def test_warm_loads_models_concurrently(server):
+    configs = [
+        LLMConfig(provider="ollama", modelName=model)
+        for model in ("alpha", "beta", "gamma", "alpha:latest")
+    ]
+    
+    started = time.monotonic()
+    results = await ollama_models.get_ollama_models().warm(configs, keep_alive="10m")
+    elapsed = time.monotonic() - started
+    
+    # alpha and alpha:latest are the same model
+    assert sorted(result["model"] for result in results) == ["alpha", "beta", "gamma"]
+    assert all(result["loaded"] for result in results)
+    assert server.stats.loads == 3
+    # One load time, not three
+    assert elapsed < 0.5
+    assert set(server.app.state.loaded) == {"alpha:latest", "beta:latest", "gamma:latest"}
+
+@pytest.mark.asyncio
+async def test_workflow_run_pins_its_models(server, monkeypatch):
+    workflow = Workflow(
+        id="pinned-workflow",
+        name="Pinned Workflow",
+        description="Two models, three steps",
+        nodes=[
+            WorkflowNode(
+                id=node_id,
+                type="agent",
+                position={"x": 0, "y": 0},
+                data=WorkflowNodeData(label=node_id, agentId=node_id)
+            )
+            for node_id in ("a", "b", "c")
+        ],
+        edges=[
+            WorkflowEdge(id="e1", source="a", target="b"),
+            WorkflowEdge(id="e2", source="b", target="c")
+        ],
+        createdAt=datetime.now(),
+        updatedAt=datetime.now()
+    )
+    agents = {
+        "a": make_agent("a", "first"),
+        "b": make_agent("b", "second"),
+        "c": make_agent("c", "first"),
+    }
+    manager = ollama_models.get_ollama_models()
+    pinned_during_run = {}
+    
+    original = OllamaModelManager.run_config
+    
+    def observe(self, config):
+        pinned_during_run.update(manager.pinned_models())
+        return original(self, config)
+    
+    monkeypatch.setattr(OllamaModelManager, "run_config", observe)
+    result = await WorkflowExecutor().execute_workflow(workflow, agents, "go")
+    
+    assert result["status"] == "completed", result.get("error")
+    # Each model was loaded once, however many steps used it
+    assert server.stats.loads == 2
+    assert sorted(key.split()[-1] for key in pinned_during_run) == ["first:latest", "second:latest"]
+    # Unpinned afterwards, with Ollama free to unload them again
+    assert manager.pinned_models() == {}
+    assert all(expires is not None for expires in server.app.state.loaded.values())
+    assert set(server.app.state.loaded) == {"first:latest", "second:latest"}
@@ -0,0 +1,105 @@
+import pytest
+from app.services.llm_service import LLMService
+from app.services.prompt_budget import PromptBudget
+from app.services.tokenizer import context_window, get_tokenizer
+from app.services.workflow_executor import WorkflowExecutor
+from test_workflow_executor import make_agent, make_workflow
+
+TEXT = "\n".join(f"Line {n}: the quick brown fox jumps over the lazy dog." for n in range(400))
+
+def test_tokenizer_cuts_to_fit():
+    tokenizer = get_tokenizer("ollama", "llama3:8b")
+    assert tokenizer.family == "llama"
+    assert get_tokenizer("ollama", "llama3:8b") is tokenizer
+    
+    head, tail = tokenizer.head(TEXT, 100), tokenizer.tail(TEXT, 100)
+    assert TEXT.startswith(head) and TEXT.endswith(tail)
+    assert 90 <= tokenizer.count(head) <= 100 and tokenizer.count(tail) <= 100
+    
+    pieces = tokenizer.split(TEXT, 300)
+    assert "".join(pieces) == TEXT
+    assert all(tokenizer.count(piece) <= 300 for piece in pieces)
+    assert all(piece.endswith("\n") for piece in pieces[:-1])
+
+def test_context_windows():
+    assert context_window("openai", "gpt-4o-mini") == 128000
+    assert context_window("openai", "gpt-4") == 8192
+    assert context_window("custom", "llama2:13b") == 4096
+    assert context_window("custom", "unknown-model") == 8192
+    assert context_window("ollama", "llama3.1") == 2048
+    assert context_window("ollama", "llama3.1", override=32768) == 32768
+
+def test_head_tail_truncation_keeps_both_ends():
+    agent = make_agent("a")
+    agent.contextWindow = 1024
+    agent.maxTokens = 256
+    budget = PromptBudget(agent)
+    
+    prompt = budget.truncate(TEXT)
+    assert budget.fits(prompt)
+    assert prompt.startswith("Line 0:") and prompt.endswith("Line 399: the quick brown fox jumps over the lazy dog.")
+    assert "tokens omitted" in prompt
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("strategy", ["chunk", "summarize"])
+async def test_oversized_input_is_chunked_or_summarized(monkeypatch, strategy):
+    prompts = []
+    
+    async def fake_stream(self, prompt, system_prompt=None, **kwargs):
+        prompts.append(prompt)
+        yield TEXT if system_prompt == "a" else "done"
+    
+    async def fake_generate(self, prompt, system_prompt=None, **kwargs):
+        return f"summary of {len(prompt)} chars"
+    
+    monkeypatch.setattr(LLMService, "generate_stream", fake_stream)
+    monkeypatch.setattr(LLMService, "generate", fake_generate)
+    
+    agents = {agent_id: make_agent(agent_id) for agent_id in "ab"}
+    agents["a"].systemPrompt = "a"
+    agents["b"].contextWindow = 1024
+    agents["b"].maxTokens = 256
+    agents["b"].overflowStrategy = strategy
+    workflow = make_workflow(["a", "b"], [("a", "b")])
+    
+    result = await WorkflowExecutor().execute_workflow(workflow, agents, "go")
+    
+    assert result["status"] == "completed"
+    budget = PromptBudget(agents["b"])
+    b_prompts = prompts[1:]
+    assert all(budget.fits(prompt) for prompt in b_prompts)
+    if strategy == "chunk":
+        assert len(b_prompts) > 1 and b_prompts[0].startswith(f"[Part 1 of {len(b_prompts)}]")
+        assert result["results"]["b"] == "\n\n".join(["done"] * len(b_prompts))
+    else:
+        # One pass summarizes each budget-sized piece; the joined summaries fit
+        summaries = b_prompts[0].split("\n\n")
+        assert len(b_prompts) == 1 and len(summaries) > 1
+        assert all(summary.startswith("summary of") for summary in summaries)
+
+@pytest.mark.asyncio
+async def test_default_ollama_agent_gets_whole_input(monkeypatch):
+    """Without a configured window, Ollama's 2048 default doesn't cut inputs"""
+    prompts = []
+    
+    async def fake_stream(self, prompt, system_prompt=None, **kwargs):
+        prompts.append(prompt)
+        yield TEXT if system_prompt == "a" else "done"
+    
+    monkeypatch.setattr(LLMService, "generate_stream", fake_stream)
+    agents = {agent_id: make_agent(agent_id) for agent_id in "ab"}
+    agents["a"].systemPrompt = "a"
+    
+    result = await WorkflowExecutor().execute_workflow(make_workflow(["a", "b"], [("a", "b")]), agents, "go")
+    
+    assert result["status"] == "completed"
+    assert TEXT in prompts[1]
+    assert "tokens omitted" not in prompts[1]
+
+def test_reply_reservation_is_capped_at_half_the_window():
+    agent = make_agent("a")
+    agent.contextWindow = 2048
+    budget = PromptBudget(agent)
+    
+    assert agent.maxTokens == 2000
+    assert budget.limit >= 2048 // 2 - 64
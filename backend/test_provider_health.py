@@ -0,0 +1,95 @@
+import socket
+import time
+import pytest
+from app.models import LLMConfig, LLMFallback
+from app.services import llm_service, provider_health
+from app.services.llm_errors import LLMConnectionError
+from app.services.llm_service import LLMService
+from tests.mock_llm_server import MockLLMServer, MockLLMSettings
+from app.services.provider_health import CircuitBreaker, ProviderHealthRegistry
+
+def dead_url() -> str:
+    """A local port nothing listens on, so connections are refused at once"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+@pytest.fixture
+def registry(monkeypatch) -> ProviderHealthRegistry:
+    registry = ProviderHealthRegistry(interval=0)
+    monkeypatch.setattr(provider_health, "_provider_health", registry)
+    monkeypatch.setattr(llm_service, "LLM_RETRY_BASE_DELAY", 0.01)
+    return registry
+
+@pytest.fixture(scope="module")
+def server():
+    with MockLLMServer(MockLLMSettings(latency_ms=0, tokens_per_second=0, response_tokens=3)) as server:
+        yield server
+
+def test_breaker_opens_then_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    
+    assert not breaker.record_failure()
+    assert breaker.allow()
+    assert breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    
+    time.sleep(0.06)
+    assert breaker.allow()
+    # Only one trial while half-open
+    assert not breaker.allow()
+    
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+@pytest.mark.asyncio
+async def test_generate_fails_over_and_skips_open_endpoints(registry, server):
+    dead = dead_url()
+    service = LLMService(LLMConfig(
+        provider="ollama",
+        modelName="primary",
+        baseUrl=dead,
+        fallbacks=[LLMFallback(provider="ollama", modelName="backup", baseUrl=server.url)]
+    ))
+    
+    text = await service.generate("first")
+    
+    assert text == "the agent reviewed "
+    # The initial attempt and both retries failed, which opens the circuit
+    assert registry.get("ollama", dead).breaker.state == "open"
+    
+    started = time.monotonic()
+    chunks = [chunk async for chunk in service.generate_stream("second")]
+    
+    assert "".join(chunks) == text
+    assert time.monotonic() - started < 0.5
+    assert registry.get("ollama", dead).breaker.failures == 3
+
+@pytest.mark.asyncio
+async def test_last_fallback_error_is_raised(registry):
+    service = LLMService(LLMConfig(
+        provider="ollama",
+        modelName="primary",
+        baseUrl=dead_url(),
+        fallbacks=[LLMFallback(provider="ollama", modelName="backup", baseUrl=dead_url())]
+    ))
+    
+    with pytest.raises(LLMConnectionError):
+        await service.generate("nobody home")
+
+@pytest.mark.asyncio
+async def test_health_check_caches_ollama_models(registry, server):
+    server.app.state.loaded["cached:latest"] = None
+    
+    models = await registry.ollama_models(server.url)
+    
+    assert {"name": "cached:latest", "model": "cached:latest"} in models
+    assert registry.get("ollama", server.url).healthy
+    
+    dead = registry.get("ollama", dead_url())
+    assert not await registry.check(dead)
+    assert dead.breaker.failures == 1
+    assert registry.snapshot()[f"ollama@{dead.base_url}"]["healthy"] is False
@@ -0,0 +1,51 @@
+import asyncio
+import time
+import httpx
+import pytest
+from app.services.rate_limiter import ProviderLimiter
+
+@pytest.mark.asyncio
+async def test_in_flight_cap_queues_requests():
+    limiter = ProviderLimiter(max_in_flight=2)
+    running = 0
+    peak = 0
+    
+    async def request():
+        nonlocal running, peak
+        async with limiter.slot():
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+    
+    await asyncio.gather(*(request() for _ in range(6)))
+    
+    assert peak == 2
+    assert limiter.stats["requests"] == 6
+    assert limiter.stats["queue_wait_seconds_max"] > 0
+
+@pytest.mark.asyncio
+async def test_429_backs_off_and_recovers():
+    limiter = ProviderLimiter(max_in_flight=4)
+    limiter.observe(httpx.Response(429, headers={"retry-after": "0.05"}))
+    
+    assert limiter.semaphore.limit == 2
+    assert limiter.stats["throttled"] == 1
+    started = time.monotonic()
+    async with limiter.slot():
+        pass
+    assert time.monotonic() - started >= 0.04
+    
+    for _ in range(5):
+        limiter.observe(httpx.Response(200))
+    assert limiter.semaphore.limit == 4
+
+@pytest.mark.asyncio
+async def test_request_bucket_paces_bursts():
+    limiter = ProviderLimiter(max_in_flight=10, requests_per_minute=1200)
+    limiter.request_bucket.tokens = 0
+    started = time.monotonic()
+    for _ in range(2):
+        async with limiter.slot():
+            pass
+    assert time.monotonic() - started >= 0.09
@@ -0,0 +1,48 @@
+import asyncio
+import pytest
+from datetime import datetime
+from app.models import Agent
+from app.services.database import Database, agents_table
+from app.services.repository import Repository
+
+def make_agent(agent_id: str, name: str = "Agent") -> Agent:
+    now = datetime.now()
+    return Agent(
+        id=agent_id,
+        name=name,
+        role="Tester",
+        description="Test",
+        llmProvider="ollama",
+        modelName="llama2",
+        createdAt=now,
+        updatedAt=now
+    )
+
+@pytest.mark.asyncio
+async def test_repository_persists_across_instances(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'test.db'}"
+    database = Database(url)
+    repository = Repository(database, agents_table, Agent)
+    await repository.save(make_agent("a1", "First"))
+    await repository.save(make_agent("a2", "Second"))
+    await repository.save(make_agent("a1", "Renamed"))
+    await repository.delete("a2")
+    await database.close()
+    
+    reopened = Database(url)
+    fresh = Repository(reopened, agents_table, Agent)
+    assert [agent.name for agent in await fresh.list()] == ["Renamed"]
+    assert await fresh.get("a2") is None
+    assert set(await fresh.get_many(["a1", "a2"])) == {"a1"}
+    await reopened.close()
+
+@pytest.mark.asyncio
+async def test_concurrent_saves_share_one_commit(tmp_path):
+    database = Database(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    repository = Repository(database, agents_table, Agent)
+    
+    await asyncio.gather(*(repository.save(make_agent(f"a{i}")) for i in range(50)))
+    
+    assert repository.flushes == 1
+    assert len(await repository.list()) == 50
+    await database.close()
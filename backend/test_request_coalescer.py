@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from app.services.request_coalescer import RequestCoalescer
+
+@pytest.mark.asyncio
+async def test_identical_calls_share_one_request():
+    coalescer = RequestCoalescer()
+    started = 0
+    
+    async def generate():
+        nonlocal started
+        started += 1
+        await asyncio.sleep(0.05)
+        return "answer"
+    
+    results = await asyncio.gather(*(coalescer.call("key", generate) for _ in range(5)))
+    
+    assert results == ["answer"] * 5
+    assert started == 1
+    assert coalescer.stats == {"requests": 1, "coalesced": 4}
+    assert coalescer.in_flight() == 0
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_request():
+    coalescer = RequestCoalescer()
+    
+    async def generate():
+        await asyncio.sleep(0.05)
+        return "answer"
+    
+    first = asyncio.create_task(coalescer.call("key", generate))
+    second = asyncio.create_task(coalescer.call("key", generate))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    
+    assert await second == "answer"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+@pytest.mark.asyncio
+async def test_late_stream_joiner_replays_chunks():
+    coalescer = RequestCoalescer()
+    started = 0
+    
+    async def generate():
+        nonlocal started
+        started += 1
+        for chunk in ("a", "b", "c"):
+            await asyncio.sleep(0.01)
+            yield chunk
+    
+    async def collect(delay: float):
+        await asyncio.sleep(delay)
+        return [chunk async for chunk in coalescer.stream("key", generate)]
+    
+    early, late = await asyncio.gather(collect(0), collect(0.015))
+    
+    assert early == late == ["a", "b", "c"]
+    assert started == 1
+
+@pytest.mark.asyncio
+async def test_long_stream_keeps_only_unread_chunks():
+    coalescer = RequestCoalescer(max_replay=2)
+    started = 0
+    kept = []
+    
+    async def generate():
+        nonlocal started
+        started += 1
+        for chunk in ("a", "b", "c", "d"):
+            await asyncio.sleep(0.01)
+            yield chunk
+    
+    async def collect(delay: float):
+        await asyncio.sleep(delay)
+        chunks = []
+        async for chunk in coalescer.stream("key", generate):
+            chunks.append(chunk)
+            kept.extend(len(flight.chunks) for flight in coalescer._streams.values())
+        return chunks
+    
+    # The second caller arrives after the first has streamed past max_replay
+    first, second = await asyncio.gather(collect(0), collect(0.035))
+    
+    assert first == second == ["a", "b", "c", "d"]
+    assert started == 2
+    assert max(kept) <= 2
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import pytest
+from app.services.resource_limits import ResourceLimiter
+from app.services.sandbox_pool import SandboxPool, SandboxTaskError
+from app.services.shared_context import SANDBOX_SHM_DIR, SEGMENT_PREFIX, remove_stale_segments
+
+PID_TASK = "import os\nresult = os.getpid()"
+
+async def run_output(pool: SandboxPool, task: str, **kwargs) -> str:
+    return (await pool.run(task, {}, **kwargs))["output"]
+
+@pytest.mark.asyncio
+async def test_pool_runs_tasks_on_warm_workers():
+    pool = SandboxPool(min_workers=1, max_workers=1)
+    await pool.start()
+    try:
+        first = await pool.run("print('hello', context['name'])", {"name": "sandbox"})
+        second = await run_output(pool, PID_TASK)
+        third = await run_output(pool, PID_TASK)
+        
+        assert first["output"] == "hello sandbox\n"
+        assert first["peak_rss_mb"] > 0
+        assert second == third
+        assert pool.stats["spawned"] == 1
+        with pytest.raises(SandboxTaskError, match="ZeroDivisionError"):
+            await pool.run("1 / 0", {})
+    finally:
+        await pool.close()
+
+@pytest.mark.asyncio
+async def test_pool_replaces_timed_out_and_recycled_workers():
+    pool = SandboxPool(min_workers=1, max_workers=1, max_tasks=2)
+    await pool.start()
+    try:
+        pid = await run_output(pool, PID_TASK)
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run("while True: pass", {}, timeout=0.2)
+        replacement = await run_output(pool, PID_TASK)
+        assert replacement != pid
+        assert pool.stats["timeouts"] == 1
+        
+        # Second task on the replacement hits max_tasks and recycles it
+        assert await run_output(pool, PID_TASK) == replacement
+        assert await run_output(pool, PID_TASK) != replacement
+        assert pool.stats["recycled"] == 1
+    finally:
+        await pool.close()
+
+@pytest.mark.asyncio
+async def test_pool_grows_with_queue_depth():
+    pool = SandboxPool(min_workers=1, max_workers=3)
+    await pool.start()
+    try:
+        task = "import os, time\ntime.sleep(0.2)\nresult = os.getpid()"
+        pids = await asyncio.gather(*(run_output(pool, task) for _ in range(5)))
+        
+        assert pool.stats["spawned"] == 3
+        assert len(set(pids)) == 3
+        assert pool.snapshot()["workers"] == 3
+    finally:
+        await pool.close()
+
+@pytest.mark.asyncio
+async def test_pool_enforces_memory_and_cpu_limits():
+    limiter = ResourceLimiter(max_memory_mb=256, max_cpu_seconds=1, cgroup_root=None)
+    pool = SandboxPool(min_workers=1, max_workers=1, limiter=limiter)
+    await pool.start()
+    try:
+        with pytest.raises(SandboxTaskError, match="MemoryError"):
+            await pool.run("data = bytearray(512 * 1024 * 1024)", {})
+        with pytest.raises(SandboxTaskError, match="CPUTimeExceeded"):
+            await pool.run("while True: pass", {}, timeout=10)
+        
+        # The same worker keeps serving tasks after hitting its limits
+        result = await pool.run("total = sum(range(10 ** 6))\nresult = total", {})
+        assert result["output"] == str(sum(range(10 ** 6)))
+        assert result["cpu_seconds"] > 0
+        assert pool.stats["spawned"] == 1
+    finally:
+        await pool.close()
+
+@pytest.mark.asyncio
+async def test_large_context_values_travel_through_shared_memory():
+    def segments():
+        return [name for name in os.listdir(SANDBOX_SHM_DIR) if name.startswith(SEGMENT_PREFIX)]
+    
+    before = segments()
+    pool = SandboxPool(min_workers=1, max_workers=1)
+    await pool.start()
+    try:
+        document = "word " * 400000
+        task = "result = (len(context['doc']), context['doc'][:4], context['blob'][:3], context['small'])"
+        result = await pool.run(
+            task,
+            {"doc": document, "blob": b"\x00\x01\x02\x03", "small": "inline"}
+        )
+        assert result["output"] == str((len(document), "word", b"\x00\x01\x02", "inline"))
+        assert pool.stats["shared_bytes"] == len(document) + 4
+        assert segments() == before
+    finally:
+        await pool.close()
+
+def test_stale_segments_are_removed(tmp_path):
+    dead_pid = 2 ** 22 + 1
+    (tmp_path / f"{SEGMENT_PREFIX}{dead_pid}-abc").write_bytes(b"x")
+    (tmp_path / f"{SEGMENT_PREFIX}{os.getpid()}-def").write_bytes(b"x")
+    
+    assert remove_stale_segments(str(tmp_path)) == 1
+    assert [path.name for path in tmp_path.iterdir()] == [f"{SEGMENT_PREFIX}{os.getpid()}-def"]
+
+@pytest.mark.asyncio
+async def test_pool_starts_on_first_task_without_server_env(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "secret")
+    pool = SandboxPool(min_workers=1, max_workers=1)
+    try:
+        assert pool.snapshot()["workers"] == 0
+        output = await run_output(pool, "import os\nresult = os.environ.get('OPENAI_API_KEY')")
+        assert output == "None"
+        assert pool.stats["spawned"] == 1
+    finally:
+        await pool.close()
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import httpx
+import pytest
+from app.models import LLMConfig
+from app.services import llm_service, tracing
+from app.services.llm_service import LLMService
+from app.services.tracing import Tracer
+from app.services.workflow_executor import WorkflowExecutor
+from test_workflow_executor import make_agent, make_workflow
+
+@pytest.fixture
+def tracer(monkeypatch, tmp_path):
+    tracer = Tracer(otlp_dir=str(tmp_path))
+    monkeypatch.setattr(tracing, "_tracer", tracer)
+    return tracer
+
+@pytest.mark.asyncio
+async def test_workflow_trace_shows_parallel_nodes(monkeypatch, tmp_path, tracer):
+    """Parallel nodes get separate rows and the slow branch is the critical path"""
+    async def fake_stream(self, prompt, system_prompt=None, **kwargs):
+        await asyncio.sleep(0.05 if system_prompt == "c" else 0.01)
+        yield f"[{system_prompt}]"
+    
+    monkeypatch.setattr(LLMService, "generate_stream", fake_stream)
+    
+    workflow = make_workflow(
+        ["start", "a", "b", "c", "d", "end"],
+        [("start", "a"), ("a", "b"), ("a", "c"), ("b", "d"), ("c", "d"), ("d", "end")]
+    )
+    agents = {agent_id: make_agent(agent_id) for agent_id in "abcd"}
+    for agent_id, agent in agents.items():
+        agent.systemPrompt = agent_id
+    result = await WorkflowExecutor().execute_workflow(workflow, agents, "go")
+    assert result["status"] == "completed"
+    
+    chrome = tracer.get(result["execution_id"]).to_chrome()
+    nodes = {
+        event["args"]["label"]: event for event in chrome["traceEvents"]
+        if event["name"] == "workflow.node"
+    }
+    assert set(nodes) == {"a", "b", "c", "d"}
+    assert nodes["b"]["tid"] != nodes["c"]["tid"]
+    assert nodes["d"]["args"]["input_bytes"] > nodes["d"]["args"]["output_bytes"] > 0
+    assert chrome["otherData"]["critical_path"] == ["a", "c", "d"]
+    
+    otlp = json.loads((tmp_path / f"{result['execution_id']}.json").read_text())
+    spans = otlp["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    root = next(span for span in spans if span["name"] == "workflow.run")
+    assert "parentSpanId" not in root
+    assert all(
+        span["parentSpanId"] == root["spanId"] for span in spans if span["name"] == "workflow.node"
+    )
+
+@pytest.mark.asyncio
+async def test_llm_retries_are_traced(monkeypatch, tracer):
+    monkeypatch.setattr(llm_service, "LLM_RETRY_BASE_DELAY", 0.01)
+    statuses = [503, 200]
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        status = statuses.pop(0)
+        body = b'{"message": {"content": "Hello there"}, "done": true}' if status == 200 else b"busy"
+        return httpx.Response(status, content=body)
+    
+    service = LLMService(LLMConfig(provider="ollama", modelName="tracing-model"))
+    service.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    async with tracer.trace("traced-call", "test") as root:
+        assert [chunk async for chunk in service.generate_stream("hi")] == ["Hello there"]
+    
+    spans = tracer.get("traced-call").spans
+    call = next(span for span in spans if span.name == "llm.stream")
+    assert call.parent_id == root.span_id
+    assert call.attributes["completion_tokens"] == 2
+    children = [span.name for span in spans if span.parent_id == call.span_id]
+    assert children == ["llm.attempt", "llm.retry_backoff", "llm.attempt"]
+    assert spans[spans.index(call) + 1].error.startswith("LLMHTTPError")
+
+def test_spans_outside_a_trace_are_dropped(tracer):
+    with tracer.span("llm.generate") as span:
+        span.set(prompt_tokens=1)
+    assert not span
+
+@pytest.mark.asyncio
+async def test_oldest_otlp_files_are_deleted(tmp_path):
+    tracer = Tracer(otlp_dir=str(tmp_path), max_otlp_files=2)
+    for execution_id in ("one", "two", "three"):
+        async with tracer.trace(execution_id, "workflow.run"):
+            pass
+    
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["three.json", "two.json"]
@@ -0,0 +1,202 @@
+import asyncio
+import pytest
+from datetime import datetime
+from app.models import Agent, BatchInput, Workflow, WorkflowNode, WorkflowNodeData, WorkflowEdge
+from app.services.checkpoint_store import CheckpointStore
+from app.services.database import Database
+from app.services.llm_service import LLMService
+from app.services.workflow_executor import WorkflowExecutor
+
+def make_agent(agent_id: str) -> Agent:
+    now = datetime.now()
+    return Agent(
+        id=agent_id,
+        name=agent_id,
+        role="Tester",
+        description="Test",
+        llmProvider="ollama",
+        modelName="llama2",
+        systemPrompt="",
+        status="idle",
+        createdAt=now,
+        updatedAt=now
+    )
+
+def make_workflow(node_ids: list, edges: list) -> Workflow:
+    now = datetime.now()
+    nodes = [
+        WorkflowNode(
+            id=node_id,
+            type="agent" if node_id not in ("start", "end") else "input",
+            position={"x": 0, "y": 0},
+            data=WorkflowNodeData(
+                label=node_id,
+                agentId=node_id if node_id not in ("start", "end") else None
+            )
+        )
+        for node_id in node_ids
+    ]
+    return Workflow(
+        id="test-workflow",
+        name="Test Workflow",
+        description="A test workflow",
+        nodes=nodes,
+        edges=[
+            WorkflowEdge(id=f"e{i}", source=source, target=target)
+            for i, (source, target) in enumerate(edges)
+        ],
+        createdAt=now,
+        updatedAt=now
+    )
+
+def test_execution_plan_orders_diamond():
+    """Plan follows edges and collapses non-agent nodes"""
+    workflow = make_workflow(
+        ["end", "d", "c", "b", "a", "start"],
+        [("start", "a"), ("a", "b"), ("a", "c"), ("b", "d"), ("c", "d"), ("d", "end")]
+    )
+    plan = WorkflowExecutor()._create_execution_plan(workflow)
+    
+    order = [step["node_id"] for step in plan]
+    assert order.index("a") < order.index("b") < order.index("d")
+    assert order.index("a") < order.index("c") < order.index("d")
+    depends_on = {step["node_id"]: step["depends_on"] for step in plan}
+    assert depends_on["a"] == []
+    assert sorted(depends_on["d"]) == ["b", "c"]
+
+def test_execution_plan_rejects_cycles():
+    """Cyclic workflows are rejected before anything runs"""
+    workflow = make_workflow(["a", "b"], [("a", "b"), ("b", "a")])
+    with pytest.raises(ValueError, match="cycle"):
+        WorkflowExecutor()._create_execution_plan(workflow)
+
+@pytest.mark.asyncio
+async def test_fan_out_runs_in_parallel(monkeypatch):
+    """Independent agents overlap and joins see every parent's output"""
+    running = 0
+    peak = 0
+    
+    async def fake_stream(self, prompt, system_prompt=None, **kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        yield f"{self.config.modelName}<{prompt}>"
+    
+    monkeypatch.setattr(LLMService, "generate_stream", fake_stream)
+    
+    workflow = make_workflow(
+        ["a", "b", "c", "d"],
+        [("a", "b"), ("a", "c"), ("b", "d"), ("c", "d")]
+    )
+    agents = {agent_id: make_agent(agent_id) for agent_id in "abcd"}
+    
+    result = await WorkflowExecutor().execute_workflow(
+        workflow=workflow,
+        agents=agents,
+        initial_input="go"
+    )
+    
+    assert result["status"] == "completed"
+    assert peak == 2
+    assert "[b]" in result["final_output"] and "[c]" in result["final_output"]
+    assert set(result["results"]) == {"a", "b", "c", "d"}
+
+@pytest.mark.asyncio
+async def test_execute_batch_streams_every_input(monkeypatch):
+    """Batch runs report each input once with running totals"""
+    async def fake_stream(self, prompt, system_prompt=None, **kwargs):
+        await asyncio.sleep(0.01 if prompt == "slow" else 0)
+        yield prompt.upper()
+    
+    monkeypatch.setattr(LLMService, "generate_stream", fake_stream)
+    
+    workflow = make_workflow(["a"], [])
+    inputs = [BatchInput(id=str(n), input="slow" if n == 0 else f"in{n}") for n in range(5)]
+    
+    lines = [
+        line async for line in WorkflowExecutor().execute_batch(
+            workflow, {"a": make_agent("a")}, inputs, concurrency=2
+        )
+    ]
+    
+    assert sorted(line["id"] for line in lines) == ["0", "1", "2", "3", "4"]
+    assert lines[-1]["completed"] == 5 and lines[-1]["failed"] == 0
+    assert lines[0]["id"] != "0"
+    assert {line["id"]: line["final_output"] for line in lines}["0"] == "SLOW"
+
+@pytest.mark.asyncio
+async def test_incremental_runs_reuse_clean_nodes(monkeypatch, tmp_path):
+    """Only edited nodes, their dependents and failed nodes rerun"""
+    calls = []
+    failing = {"c"}
+    
+    async def fake_stream(self, prompt, system_prompt=None, **kwargs):
+        node = system_prompt.split(":")[0]
+        calls.append(node)
+        if node in failing:
+            raise RuntimeError(f"{node} failed")
+        yield f"{system_prompt}<{prompt}>"
+    
+    monkeypatch.setattr(LLMService, "generate_stream", fake_stream)
+    
+    database = Database(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    executor = WorkflowExecutor(checkpoints=CheckpointStore(database))
+    workflow = make_workflow(["a", "b", "c"], [("a", "b"), ("b", "c")])
+    agents = {agent_id: make_agent(agent_id) for agent_id in "abc"}
+    for agent_id, agent in agents.items():
+        agent.systemPrompt = f"{agent_id}:v1"
+    
+    async def run():
+        calls.clear()
+        return await executor.execute_workflow(workflow, agents, "go", incremental=True)
+    
+    assert (await run())["status"] == "error"
+    assert calls == ["a", "b", "c"]
+    
+    failing.clear()
+    assert (await run())["status"] == "completed"
+    assert calls == ["c"]
+    
+    assert (await run())["status"] == "completed"
+    assert calls == []
+    
+    agents["b"].systemPrompt = "b:v2"
+    result = await run()
+    assert calls == ["b", "c"]
+    assert result["final_output"] == "c:v1<b:v2<a:v1<go>>>"
+    await database.close()
+
+@pytest.mark.asyncio
+async def test_failed_default_run_resumes_from_last_good_node(monkeypatch, tmp_path):
+    """A run that wasn't incremental still checkpoints, so resuming skips finished nodes"""
+    calls = []
+    failing = {"c"}
+    
+    async def fake_stream(self, prompt, system_prompt=None, **kwargs):
+        calls.append(system_prompt)
+        if system_prompt in failing:
+            raise RuntimeError(f"{system_prompt} failed")
+        yield f"{system_prompt}<{prompt}>"
+    
+    monkeypatch.setattr(LLMService, "generate_stream", fake_stream)
+    
+    database = Database(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    executor = WorkflowExecutor(checkpoints=CheckpointStore(database))
+    workflow = make_workflow(["a", "b", "c", "d"], [("a", "b"), ("b", "c"), ("c", "d")])
+    agents = {agent_id: make_agent(agent_id) for agent_id in "abcd"}
+    for agent_id, agent in agents.items():
+        agent.systemPrompt = agent_id
+    
+    assert (await executor.execute_workflow(workflow, agents, "go"))["status"] == "error"
+    assert calls == ["a", "b", "c"]
+    
+    calls.clear()
+    failing.clear()
+    # Resume reruns incrementally with the same input
+    result = await executor.execute_workflow(workflow, agents, "go", incremental=True)
+    assert result["status"] == "completed"
+    assert calls == ["c", "d"]
+    assert result["final_output"] == "d<c<b<a<go>>>>"
+    await database.close()
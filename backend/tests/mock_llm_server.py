@@ -0,0 +1,405 @@
+"""
+Mock LLM provider server for offline tests and benchmarks.
+Speaks the Ollama, OpenAI and Anthropic chat wire formats, streaming or not,
+with configurable latency, token rate, injected errors and Ollama model loads.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+MOCK_LLM_LATENCY_MS = float(os.getenv("MOCK_LLM_LATENCY_MS", "50"))
+# fixed, uniform, exponential or lognormal around MOCK_LLM_LATENCY_MS
+MOCK_LLM_LATENCY_DISTRIBUTION = os.getenv("MOCK_LLM_LATENCY_DISTRIBUTION", "lognormal")
+MOCK_LLM_LATENCY_SIGMA = float(os.getenv("MOCK_LLM_LATENCY_SIGMA", "0.5"))
+# 0 sends every token at once
+MOCK_LLM_TOKENS_PER_SECOND = float(os.getenv("MOCK_LLM_TOKENS_PER_SECOND", "100"))
+MOCK_LLM_RESPONSE_TOKENS = int(os.getenv("MOCK_LLM_RESPONSE_TOKENS", "50"))
+MOCK_LLM_ERROR_RATE = float(os.getenv("MOCK_LLM_ERROR_RATE", "0"))
+MOCK_LLM_ERROR_STATUS = int(os.getenv("MOCK_LLM_ERROR_STATUS", "503"))
+MOCK_LLM_SEED = os.getenv("MOCK_LLM_SEED")
+# Time an Ollama request waits when its model isn't loaded yet
+MOCK_LLM_LOAD_MS = float(os.getenv("MOCK_LLM_LOAD_MS", "0"))
+# Ollama's keep_alive when a request doesn't send one
+OLLAMA_DEFAULT_KEEP_ALIVE_SECONDS = 300
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+_WORDS = (
+    "the agent reviewed input and produced a short answer with several "
+    "plain words so every response has a predictable size"
+).split()
+
+class MockLLMSettings:
+    """Behaviour of the mock server; attributes may be changed while it runs"""
+    
+    def __init__(
+        self,
+        latency_ms: float = MOCK_LLM_LATENCY_MS,
+        latency_distribution: str = MOCK_LLM_LATENCY_DISTRIBUTION,
+        latency_sigma: float = MOCK_LLM_LATENCY_SIGMA,
+        tokens_per_second: float = MOCK_LLM_TOKENS_PER_SECOND,
+        response_tokens: int = MOCK_LLM_RESPONSE_TOKENS,
+        error_rate: float = MOCK_LLM_ERROR_RATE,
+        error_status: int = MOCK_LLM_ERROR_STATUS,
+        retry_after: Optional[float] = None,
+        load_ms: float = MOCK_LLM_LOAD_MS,
+        seed: Optional[int] = int(MOCK_LLM_SEED) if MOCK_LLM_SEED else None
+    ):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {latency_distribution}")
+        self.latency_ms = latency_ms
+        self.latency_distribution = latency_distribution
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.load_ms = load_ms
+        self.random = random.Random(seed)
+    
+    def sample_latency(self) -> float:
+        """Seconds before the first token, drawn from the configured distribution"""
+        mean = self.latency_ms / 1000
+        if mean <= 0:
+            return 0.0
+        if self.latency_distribution == "fixed":
+            return mean
+        if self.latency_distribution == "uniform":
+            return self.random.uniform(0, 2 * mean)
+        if self.latency_distribution == "exponential":
+            return self.random.expovariate(1 / mean)
+        # Parameterised so the mean stays latency_ms whatever the spread
+        mu = math.log(mean) - self.latency_sigma ** 2 / 2
+        return self.random.lognormvariate(mu, self.latency_sigma)
+    
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and self.random.random() < self.error_rate
+
+class MockLLMStats:
+    """Request counts, for asserting on what a test or benchmark sent"""
+    
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.by_format: Dict[str, int] = {}
+        # Cold Ollama model loads
+        self.loads = 0
+
+def create_mock_llm_app(settings: Optional[MockLLMSettings] = None) -> FastAPI:
+    """
+    Build the mock server.
+    
+    Routes: Ollama POST /api/chat, POST /api/generate (model loading only),
+    GET /api/tags and GET /api/ps, OpenAI POST /v1/chat/completions (also
+    /chat/completions, as custom providers call it) and Anthropic
+    POST /v1/messages. Settings and stats are on app.state, as are the
+    loaded Ollama models with their expiry (None for never).
+    """
+    app = FastAPI(title="Mock LLM Server")
+    app.state.settings = settings or MockLLMSettings()
+    app.state.stats = MockLLMStats()
+    app.state.loaded = {}
+    load_locks: Dict[str, asyncio.Lock] = {}
+    
+    async def begin(request: Request, wire_format: str) -> Dict[str, Any]:
+        stats: MockLLMStats = app.state.stats
+        stats.requests += 1
+        stats.by_format[wire_format] = stats.by_format.get(wire_format, 0) + 1
+        return await request.json()
+    
+    async def load_model(name: str, keep_alive: Any):
+        """Load a model like Ollama: once, with concurrent requests waiting on the load"""
+        loaded: Dict[str, Optional[float]] = app.state.loaded
+        name = name if ":" in name else f"{name}:latest"
+        now = time.monotonic()
+        for model, expires in list(loaded.items()):
+            if expires is not None and expires <= now:
+                del loaded[model]
+        async with load_locks.setdefault(name, asyncio.Lock()):
+            if name not in loaded:
+                app.state.stats.loads += 1
+                await asyncio.sleep(app.state.settings.load_ms / 1000)
+            seconds = _keep_alive_seconds(keep_alive)
+            if seconds == 0:
+                loaded.pop(name, None)
+            else:
+                loaded[name] = None if seconds < 0 else time.monotonic() + seconds
+    
+    def error_response(settings: MockLLMSettings, body: Dict[str, Any]) -> JSONResponse:
+        app.state.stats.errors += 1
+        headers = {}
+        if settings.retry_after is not None:
+            headers["Retry-After"] = str(settings.retry_after)
+        return JSONResponse(body, status_code=settings.error_status, headers=headers)
+    
+    @app.post("/api/chat")
+    async def ollama_chat(request: Request):
+        body = await begin(request, "ollama")
+        settings: MockLLMSettings = app.state.settings
+        if settings.should_fail():
+            return error_response(settings, {"error": "mock failure"})
+        model = body.get("model", "mock")
+        await load_model(model, body.get("keep_alive"))
+        limit = (body.get("options") or {}).get("num_predict")
+        tokens = _response_tokens(settings, limit)
+        
+        if not body.get("stream", True):
+            await asyncio.sleep(settings.sample_latency() + _generation_seconds(settings, tokens))
+            return {
+                "model": model,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "done": True,
+                "eval_count": len(tokens),
+            }
+        
+        async def lines() -> AsyncIterator[str]:
+            async for token in _paced(settings, tokens):
+                yield json.dumps({
+                    "model": model,
+                    "message": {"role": "assistant", "content": token},
+                    "done": False,
+                }) + "\n"
+            yield json.dumps({
+                "model": model,
+                "message": {"role": "assistant", "content": ""},
+                "done": True,
+                "eval_count": len(tokens),
+            }) + "\n"
+        
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+    
+    @app.post("/api/generate")
+    async def ollama_generate(request: Request):
+        # Loads aren't counted as requests; see stats.loads
+        body = await request.json()
+        if body.get("prompt"):
+            return JSONResponse({"error": "the mock server only loads models here"}, status_code=400)
+        model = body.get("model", "mock")
+        started = time.monotonic()
+        await load_model(model, body.get("keep_alive"))
+        return {
+            "model": model,
+            "response": "",
+            "done": True,
+            "done_reason": "unload" if _keep_alive_seconds(body.get("keep_alive")) == 0 else "load",
+            "load_duration": int((time.monotonic() - started) * 1e9),
+        }
+    
+    @app.get("/api/tags")
+    async def ollama_tags():
+        return {"models": [{"name": model, "model": model} for model in app.state.loaded]}
+    
+    @app.get("/api/ps")
+    async def ollama_ps():
+        now = time.monotonic()
+        return {"models": [
+            {"name": model, "model": model, "expires_in": None if expires is None else expires - now}
+            for model, expires in app.state.loaded.items()
+            if expires is None or expires > now
+        ]}
+    
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def openai_chat(request: Request):
+        body = await begin(request, "openai")
+        settings: MockLLMSettings = app.state.settings
+        if settings.should_fail():
+            return error_response(
+                settings, {"error": {"message": "mock failure", "type": "server_error"}}
+            )
+        model = body.get("model", "mock")
+        tokens = _response_tokens(settings, body.get("max_tokens"))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        
+        if not body.get("stream"):
+            await asyncio.sleep(settings.sample_latency() + _generation_seconds(settings, tokens))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"completion_tokens": len(tokens)},
+            }
+        
+        def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+            return _sse(None, {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            })
+        
+        async def events() -> AsyncIterator[str]:
+            yield chunk({"role": "assistant"})
+            async for token in _paced(settings, tokens):
+                yield chunk({"content": token})
+            yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+        
+        return StreamingResponse(events(), media_type="text/event-stream")
+    
+    @app.post("/v1/messages")
+    async def anthropic_messages(request: Request):
+        body = await begin(request, "anthropic")
+        settings: MockLLMSettings = app.state.settings
+        if settings.should_fail():
+            return error_response(
+                settings, {"type": "error", "error": {"type": "api_error", "message": "mock failure"}}
+            )
+        model = body.get("model", "mock")
+        tokens = _response_tokens(settings, body.get("max_tokens"))
+        message_id = f"msg_{uuid.uuid4().hex[:12]}"
+        
+        if not body.get("stream"):
+            await asyncio.sleep(settings.sample_latency() + _generation_seconds(settings, tokens))
+            return {
+                "id": message_id,
+                "type": "message",
+                "role": "assistant",
+                "model": model,
+                "content": [{"type": "text", "text": "".join(tokens)}],
+                "stop_reason": "end_turn",
+                "usage": {"output_tokens": len(tokens)},
+            }
+        
+        async def events() -> AsyncIterator[str]:
+            yield _sse("message_start", {
+                "type": "message_start",
+                "message": {"id": message_id, "type": "message", "role": "assistant", "model": model},
+            })
+            yield _sse("content_block_start", {
+                "type": "content_block_start",
+                "index": 0,
+                "content_block": {"type": "text", "text": ""},
+            })
+            async for token in _paced(settings, tokens):
+                yield _sse("content_block_delta", {
+                    "type": "content_block_delta",
+                    "index": 0,
+                    "delta": {"type": "text_delta", "text": token},
+                })
+            yield _sse("content_block_stop", {"type": "content_block_stop", "index": 0})
+            yield _sse("message_delta", {
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn"},
+                "usage": {"output_tokens": len(tokens)},
+            })
+            yield _sse("message_stop", {"type": "message_stop"})
+        
+        return StreamingResponse(events(), media_type="text/event-stream")
+    
+    return app
+
+class MockLLMServer:
+    """
+    Run the mock app on a local port in a background thread.
+    
+    Usable as a context manager; `url` is the base URL to give providers.
+    A thread keeps the server's work off the event loop being measured.
+    """
+    
+    def __init__(self, settings: Optional[MockLLMSettings] = None, host: str = "127.0.0.1"):
+        self.app = create_mock_llm_app(settings)
+        self.host = host
+        self.url = ""
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def settings(self) -> MockLLMSettings:
+        return self.app.state.settings
+    
+    @property
+    def stats(self) -> MockLLMStats:
+        return self.app.state.stats
+    
+    def start(self):
+        import uvicorn
+        
+        config = uvicorn.Config(self.app, host=self.host, port=0, log_level="warning", lifespan="off")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, name="mock-llm-server", daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if not self._thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("Mock LLM server failed to start")
+            time.sleep(0.01)
+        port = self._server.servers[0].sockets[0].getsockname()[1]
+        self.url = f"http://{self.host}:{port}"
+    
+    def stop(self):
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join(timeout=10)
+            self._server = None
+    
+    def __enter__(self) -> "MockLLMServer":
+        self.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+
+def _keep_alive_seconds(value: Any) -> float:
+    """Ollama keep_alive in seconds: a number, or a duration like "5m"; negative is forever"""
+    if value is None or value == "":
+        return OLLAMA_DEFAULT_KEEP_ALIVE_SECONDS
+    if isinstance(value, (int, float)):
+        return float(value)
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    for unit in sorted(units, key=len, reverse=True):
+        if value.endswith(unit):
+            return float(value[:-len(unit)]) * units[unit]
+    return float(value)
+
+def _response_tokens(settings: MockLLMSettings, limit: Optional[int]) -> List[str]:
+    count = settings.response_tokens
+    if limit:
+        count = min(count, int(limit))
+    return [_WORDS[i % len(_WORDS)] + " " for i in range(count)]
+
+def _generation_seconds(settings: MockLLMSettings, tokens: List[str]) -> float:
+    if settings.tokens_per_second <= 0:
+        return 0.0
+    return len(tokens) / settings.tokens_per_second
+
+async def _paced(settings: MockLLMSettings, tokens: List[str]) -> AsyncIterator[str]:
+    """Yield tokens after the first-token latency, then at the configured rate"""
+    await asyncio.sleep(settings.sample_latency())
+    started = time.monotonic()
+    for index, token in enumerate(tokens):
+        if settings.tokens_per_second > 0:
+            # Sleep against a schedule so timer overshoot doesn't accumulate
+            ahead = started + index / settings.tokens_per_second - time.monotonic()
+            if ahead > 0.001:
+                await asyncio.sleep(ahead)
+        yield token
+
+def _sse(event: Optional[str], data: Dict[str, Any]) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+if __name__ == "__main__":
+    import uvicorn
+    
+    parser = argparse.ArgumentParser(description="Run the mock LLM provider server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    args = parser.parse_args()
+    uvicorn.run(create_mock_llm_app(), host=args.host, port=args.port)
@@ -0,0 +1,38 @@
+import argparse
+import asyncio
+import logging
+import signal
+from typing import Optional
+from app.services.database import get_database
+from app.services import llm_service
+from app.services.http_pool import get_client_pool
+from app.services.job_worker import WORKER_CONCURRENCY, JobWorker
+from app.services.provider_health import get_provider_health
+from app.services.sandbox_pool import get_sandbox_pool
+
+async def main(concurrency: int, worker_id: Optional[str]):
+    database = get_database()
+    await database.init()
+    await get_provider_health().start([("ollama", llm_service.OLLAMA_BASE_URL)])
+    
+    worker = JobWorker(worker_id=worker_id, concurrency=concurrency)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        await get_provider_health().close()
+        await get_sandbox_pool().close()
+        await get_client_pool().close()
+        await database.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run queued workflow executions (start the API with EXECUTION_MODE=queue)"
+    )
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY)
+    parser.add_argument("--worker-id", default=None, help="defaults to host, PID and a random suffix")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(main(args.concurrency, args.worker_id))
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import type { Agent, Workflow, Team, ExecutionLog, LLMConfig, OllamaModel } from '@/types';
+import type { Agent, Workflow, Team, ExecutionLog, ExecutionJob, LLMConfig, NodeOutput, OllamaModel } from '@/types';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
@@ -89,6 +89,12 @@ export const logsApi = {
     const response = await apiClient.get('/api/logs', { params });
     return response.data;
   },
+  // Newest logs without a cursor; pass the returned cursor to get only later ones
+  poll: async (workflowId?: string, cursor?: string): Promise<{ logs: ExecutionLog[]; cursor?: string }> => {
+    const params = { ...(workflowId ? { workflowId } : {}), ...(cursor ? { cursor } : {}) };
+    const response = await apiClient.get('/api/logs', { params });
+    return { logs: response.data, cursor: response.headers['x-next-cursor'] ?? cursor };
+  },
   stream: (workflowId: string, onMessage: (log: ExecutionLog) => void) => {
     const eventSource = new EventSource(`${API_BASE_URL}/api/logs/stream/${workflowId}`);
     eventSource.onmessage = (event) => {
@@ -99,6 +105,30 @@ export const logsApi = {
   },
 };
 
+// Execution API
+export const executionApi = {
+  getJob: async (id: string): Promise<ExecutionJob> => {
+    const response = await apiClient.get(`/api/executions/jobs/${id}`);
+    return response.data;
+  },
+  cancel: async (id: string): Promise<void> => {
+    await apiClient.post(`/api/executions/${id}/cancel`);
+  },
+};
+
+// Blob API
+export const blobApi = {
+  get: async (hash: string, range?: { start: number; end: number }): Promise<string> => {
+    const headers = range ? { Range: `bytes=${range.start}-${range.end - 1}` } : {};
+    const response = await apiClient.get(`/api/blobs/${hash}`, { headers, responseType: 'text' });
+    return response.data;
+  },
+  // Node outputs are inline strings or references to a stored blob
+  resolve: async (output: NodeOutput): Promise<string> => {
+    return typeof output === 'string' ? output : blobApi.get(output.blob);
+  },
+};
+
 // LLM Provider API
 export const llmApi = {
   listOllamaModels: async (): Promise<OllamaModel[]> => {
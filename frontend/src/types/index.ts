@@ -9,6 +9,10 @@ export interface Agent {
   systemPrompt: string;
   temperature: number;
   maxTokens: number;
+  cacheResponses?: boolean | null;
+  contextWindow?: number | null;
+  overflowStrategy?: OverflowStrategy | null;
+  fallbacks?: LLMFallback[];
   status: AgentStatus;
   createdAt: string;
   updatedAt: string;
@@ -16,9 +20,17 @@ export interface Agent {
 
 export type AgentStatus = 'idle' | 'running' | 'paused' | 'error' | 'completed';
 
+export type OverflowStrategy = 'head' | 'tail' | 'head_tail' | 'chunk' | 'summarize';
+
 // LLM Provider Types
 export type LLMProvider = 'ollama' | 'openai' | 'anthropic' | 'custom';
 
+export interface LLMFallback {
+  provider: LLMProvider;
+  modelName: string;
+  baseUrl?: string | null;
+}
+
 export interface LLMConfig {
   provider: LLMProvider;
   apiKey?: string;
@@ -65,6 +77,7 @@ export interface Workflow {
   description: string;
   nodes: WorkflowNode[];
   edges: WorkflowEdge[];
+  maxConcurrentRuns?: number | null;
   status: WorkflowStatus;
   createdAt: string;
   updatedAt: string;
@@ -76,6 +89,7 @@ export type WorkflowStatus = 'draft' | 'active' | 'paused' | 'completed' | 'erro
 export interface ExecutionLog {
   id: string;
   workflowId: string;
+  executionId?: string;
   agentId?: string;
   timestamp: string;
   level: LogLevel;
@@ -87,6 +101,7 @@ export type LogLevel = 'debug' | 'info' | 'warning' | 'error';
 
 export interface ExecutionMetrics {
   workflowId: string;
+  executionId?: string;
   startTime: string;
   endTime?: string;
   duration?: number;
@@ -95,6 +110,44 @@ export interface ExecutionMetrics {
   status: WorkflowStatus;
 }
 
+export interface ExecutionJob {
+  id: string;
+  workflowId: string;
+  status: ExecutionJobStatus;
+  initialInput: string;
+  incremental: boolean;
+  priority: ExecutionPriority;
+  attempts: number;
+  workerId?: string | null;
+  leaseExpiresAt?: string | null;
+  createdAt: string;
+  startedAt?: string | null;
+  finishedAt?: string | null;
+  result?: ExecutionResult | null;
+  error?: string | null;
+}
+
+export interface ExecutionResult {
+  execution_id: string;
+  status: 'completed' | 'error' | 'cancelled';
+  results?: Record<string, NodeOutput>;
+  final_output?: NodeOutput;
+  duration?: number;
+  error?: string;
+}
+
+// Large node outputs are stored out of band and fetched from /api/blobs/{blob}
+export interface BlobRef {
+  blob: string;
+  size: number;
+}
+
+export type NodeOutput = string | BlobRef;
+
+export type ExecutionJobStatus = 'queued' | 'running' | 'completed' | 'error';
+
+export type ExecutionPriority = 'interactive' | 'batch';
+
 // Team Types
 export interface Team {
   id: string;